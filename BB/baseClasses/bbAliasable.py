@@ -1,6 +1,6 @@
 # Typing imports
 from __future__ import annotations
-from typing import List
+from typing import Any, Dict, List, Tuple
 from . import bbSerializable
 
 from abc import abstractmethod, abstractclassmethod
@@ -15,6 +15,8 @@ class Aliasable (bbSerializable.bbSerializable):
     :vartype name: str
     :var aliases: A list of alternative identifiers for the object
     :vartype aliases: list[str]
+    :var aliasIndexes: The AliasIndexes containing this object, and the value stored for this object in each of them. These are updated as aliases are added and removed.
+    :vartype aliasIndexes: list[tuple[AliasIndex, Any]]
     """
 
     def __init__(self, name : str, aliases : List[str], forceAllowEmpty : bool = False):
@@ -35,6 +37,8 @@ class Aliasable (bbSerializable.bbSerializable):
 
         if name.lower() not in aliases:
             self.aliases += [name.lower()]
+
+        self.aliasIndexes : List[Tuple[AliasIndex, Any]] = []
     
 
     def __eq__(self, other : Aliasable) -> bool:
@@ -63,6 +67,10 @@ class Aliasable (bbSerializable.bbSerializable):
         """
         if name.lower() in self.aliases:
             self.aliases.remove(name.lower())
+            # The object can always be found by its main name
+            if name.lower() != self.name.lower():
+                for index, value in self.aliasIndexes:
+                    index.unindexName(name, value)
 
 
     def addAlias(self, name : str):
@@ -72,6 +80,8 @@ class Aliasable (bbSerializable.bbSerializable):
         """
         if name.lower() not in self.aliases:
             self.aliases.append(name.lower())
+            for index, value in self.aliasIndexes:
+                index.indexName(name, value)
 
 
     @abstractmethod
@@ -93,3 +103,107 @@ class Aliasable (bbSerializable.bbSerializable):
         :rtype: bbAliasable
         """
         pass
+
+
+class AliasIndex:
+    """A case-insensitive index of names, for looking up objects by any of their names or aliases in constant time.
+    Aliasables added to the index with add keep it up to date as their aliases change.
+    Other values can be indexed under any names with indexName, but must then be kept up to date manually.
+
+    If multiple values are indexed under the same name, the most recently indexed value is found.
+    This matches searching a collection of objects in order, and keeping the last one which isCalled the name.
+
+    :var values: Maps lower case names to the values indexed under them, in the order they were indexed
+    :vartype values: dict[str, list]
+    """
+
+    def __init__(self):
+        self.values : Dict[str, list] = {}
+
+
+    def __contains__(self, name : str) -> bool:
+        """Decide whether any value is indexed under the given name.
+
+        :param str name: The name to look up, in any casing
+        :return: True if a value is indexed under name, False otherwise
+        :rtype: bool
+        """
+        return name.lower() in self.values
+
+
+    def __len__(self) -> int:
+        """Get the number of names in the index.
+
+        :return: The number of distinct names which values are indexed under
+        :rtype: int
+        """
+        return len(self.values)
+
+
+    def get(self, name : str, default : Any = None) -> Any:
+        """Look up the value indexed under the given name.
+
+        :param str name: The name to look up, in any casing
+        :param default: The value to return if nothing is indexed under name (Default None)
+        :return: The most recently indexed value under name, or default if there is none
+        """
+        values = self.values.get(name.lower())
+        return values[-1] if values else default
+
+
+    def names(self) -> List[str]:
+        """Get every name in the index, in lower case.
+
+        :return: A list of all names which values are indexed under
+        :rtype: list[str]
+        """
+        return list(self.values)
+
+
+    def indexName(self, name : str, value : Any):
+        """Index a value under the given name. Does nothing if the value is already indexed under name.
+
+        :param str name: The name to index value under, in any casing
+        :param value: The value to index
+        """
+        values = self.values.setdefault(name.lower(), [])
+        if not any(existing is value for existing in values):
+            values.append(value)
+
+
+    def unindexName(self, name : str, value : Any):
+        """Stop indexing a value under the given name. Does nothing if the value is not indexed under name.
+
+        :param str name: The name to stop indexing value under, in any casing
+        :param value: The value to unindex
+        """
+        values = self.values.get(name.lower(), [])
+        for valueIndex in range(len(values)):
+            if values[valueIndex] is value:
+                values.pop(valueIndex)
+                break
+        if not values:
+            self.values.pop(name.lower(), None)
+
+
+    def add(self, obj : Aliasable, value : Any = None):
+        """Index a value under the name and every alias of an Aliasable, and keep it indexed under the object's aliases as they are added and removed.
+
+        :param Aliasable obj: The object whose names to index
+        :param value: The value to index, or None to index obj itself (Default None)
+        """
+        value = obj if value is None else value
+        for name in [obj.name] + obj.aliases:
+            self.indexName(name, value)
+        obj.aliasIndexes.append((self, value))
+
+
+    def remove(self, obj : Aliasable):
+        """Remove an Aliasable added with add from the index.
+
+        :param Aliasable obj: The object to remove
+        """
+        for indexEntry in [indexEntry for indexEntry in obj.aliasIndexes if indexEntry[0] is self]:
+            for name in [obj.name] + obj.aliases:
+                self.unindexName(name, indexEntry[1])
+            obj.aliasIndexes.remove(indexEntry)
@@ -32,6 +32,25 @@ includedCommandModules = (  "usr_misc", "usr_homeguilds", "usr_gof2-info", "usr_
 maxCommandsPerHelpPage = 5
 helpEmbedTimeout = {"minutes": 5}
 
+# Commands taking longer than this many seconds to complete are logged in the slowCommands log category
+slowCommandThresholdSeconds = 3
+
+# The number of most recent calls of each command to keep timings for, when calculating percentiles in the command-stats dev command
+commandMetricsSamples = 500
+
+# Command rate limiting. Every command call costs tokens (1 unless given a different cost when registered), which are paid from
+# the calling user's token bucket, the bucket of the guild it was called in, and a single global bucket.
+# Each bucket holds up to its capacity in tokens, and refills at a constant rate. Calls which cannot be paid for from every bucket are refused.
+# Developers are exempt.
+commandRateLimitUserCapacity = 10
+commandRateLimitUserRefillPerSecond = 0.5
+commandRateLimitGuildCapacity = 40
+commandRateLimitGuildRefillPerSecond = 2
+commandRateLimitGlobalCapacity = 200
+commandRateLimitGlobalRefillPerSecond = 20
+# How often to free the buckets of users and guilds which have stopped calling commands, in seconds
+commandRateLimitEvictionSeconds = 300
+
 
 
 ##### DUELS #####
@@ -56,6 +75,14 @@ duelCloakChance = 20
 # Amount of time to wait between refreshing stock of all shops
 shopRefreshStockPeriod = {"days":0, "hours":6, "minutes":0, "seconds":0}
 
+# Shops are refreshed in this many groups of guilds, spread evenly over shopRefreshStockPeriod, rather than all at once.
+# Each guild is always in the same group, so every shop is still refreshed once per shopRefreshStockPeriod, at the same time each period.
+# 1 refreshes every shop at once.
+shopRefreshBuckets = 60
+
+# The maximum number of shop refresh announcements to send per second. Announcements are sent in the background.
+shopRefreshAnnouncementsPerSecond = 2
+
 # The number of ranks to use when randomly picking shop stock
 numShipRanks = 10
 numWeaponRanks = 10
@@ -258,13 +285,57 @@ bbcHTTPErrRetryDelaySeconds = 1
 ##### SAVING #####
 
 # The time to wait inbetween database autosaves.
-savePeriod = {"hours":1}
+# Changes made between saves are recorded in the journal, so this can be long without risking data loss.
+savePeriod = {"hours":6}
 
 # path to JSON files for database saves
 userDBPath = "saveData/users.json"
 guildDBPath = "saveData/guilds.json"
 bountyDBPath = "saveData/bounties.json"
 reactionMenusDBPath = "saveData/reactionMenus.json"
+# path to JSON file to save the schedules of timed tasks to: bounty spawning, shop refreshing, database saving and duel requests
+timedTasksDBPath = "saveData/timedTasks.json"
+# path to JSON file to cache the table of shortest routes between systems in. The table is rebuilt if the star map has changed since it was cached.
+# Give "" to rebuild the table on every startup without caching it.
+routeTableCachePath = "saveData/routeTable.json"
+
+# path to folders of per-record JSON files for incremental database saves. Each user/guild is saved to its own file, named after its ID.
+# If these folders do not exist on startup, the users and guilds are loaded from userDBPath and guildDBPath instead, and every record is written on the next save.
+userDBRecordsDir = "saveData/users"
+guildDBRecordsDir = "saveData/guilds"
+
+# The format to save the users, guilds and reaction menus databases in.
+# "json" saves human-readable JSON files. "binary" saves compact binary snapshots, with the extension .bbs in place of .json.
+# Users and guilds are saved one record per file, where each binary snapshot carries its own header and string table. On a synthetic 100k user database,
+# binary snapshots are only around 1.5-2x smaller than JSON, and take around 2x as long to save and 2-3x as long to load, as they are encoded in pure python.
+# The single-file reaction menus database is around 5x smaller as a binary snapshot. Compare the formats with python -m BB.tools.snapshotBenchmark
+# Files saved in either format can always be loaded, so this can be changed at any time. Files can also be converted with python -m BB.tools.snapshotConverter
+dbSaveFormat = "json"
+# The compression to apply to binary snapshots; "none", "zlib" or "lzma". lzma gives the smallest files, but is the slowest to save.
+dbSnapshotCompression = "zlib"
+
+# Which storage backend to use for the users database.
+# "json" loads every user on startup, and saves each user to its own file in userDBRecordsDir.
+# "sqlite" stores users in the SQLite database file at userDBSQLitePath, and only loads users into memory when they are first accessed.
+# When switching to "sqlite", existing users are imported from userDBRecordsDir (or userDBPath) the first time the bot starts.
+userDBBackend = "json"
+userDBSQLitePath = "saveData/users.sqlite3"
+# The maximum number of recently used users to keep loaded in memory when using the sqlite backend. Users with unsaved changes are always kept loaded.
+userDBSQLiteCacheSize = 2000
+
+# The number of worker processes to read and parse user and guild record files with on startup. 0 uses one worker per CPU core, and 1 parses records in the main process.
+# Parsed records must be sent back from worker processes, which costs most of the time saved, so workers only help for very large databases.
+# Measure with tools/recordLoadBenchmark before raising this.
+dbLoadWorkers = 1
+# The number of record files to send to a worker process at a time on startup
+dbLoadChunkSize = 256
+
+# path to folder to save the write-ahead journal of database changes to. Journaled changes are replayed on top of the saved databases on startup.
+journalDir = "saveData/journal"
+# Whether or not to wait for each batch of journal entries to reach the disk before continuing. Disabling this is faster, but changes may be lost on power failure.
+journalFsync = True
+# Changes are written to the journal in batches, at most this many seconds after they are made. Changes made within this time of a crash may be lost.
+journalFlushSeconds = 1
 
 # path to folder to save log txts to
 loggingFolderPath = "saveData/logs"
@@ -289,13 +360,31 @@ skinRenderShowmeHDResolution = [1920, 1080]
 ##### SCHEDULING #####
 
 # Whether to execute timedtask checks every timedTaskLatenessThresholdSeconds ("fixed"), or to calculate the delay to wait until the next TimedTask is schedule to expire ("dynamic")
+# "dynamic" checks tasks as soon as they expire, and does not wake up while no tasks are due.
 timedTaskCheckingType = "fixed"
 
+# When using "dynamic" timedTaskCheckingType, the longest time in seconds to wait before rechecking task expiry times, even if no task is due.
+timedTaskDynamicMaxSleepSeconds = 600
+
 # How late a timed task may acceptably be in seconds.
 # I.e a scheduled task may expire up to timedTaskLatenessThresholdSeconds seconds after their intended expiration time.
 # replaces the depracated 'delayFactor' variable
 timedTaskLatenessThresholdSeconds = 10
 
+# The maximum number of expired tasks' expiry functions to run at once, for each of the newBounties, duelRequests and reactionMenus TimedTaskHeaps.
+# Expiry functions run in the background, so that one slow discord request does not delay the expiry of every other task. 0 runs them one at a time.
+timedTaskMaxConcurrentCallbacks = 16
+
+# The number of seconds an expiry function may run for before it is cancelled and logged. None for no limit.
+timedTaskCallbackTimeoutSeconds = 120
+
+# How to restore saved timed tasks whose expiry time passed while the bot was offline.
+# "fire" expires them all as soon as the bot starts. "skip" moves repeating tasks, such as bounty spawning and shop refreshing, on to their next
+# expiry time without expiring them. "spread" expires them at random times over the next timedTaskCatchUpSpreadSeconds seconds,
+# to avoid a burst of bounty spawns and announcements after a restart.
+timedTaskCatchUpPolicy = "spread"
+timedTaskCatchUpSpreadSeconds = 300
+
 
 
 ##### MISC #####
@@ -5,6 +5,7 @@ from discord import Colour
 # Used for importing items
 import os
 import json
+from ..baseClasses import bbAliasable
 
 shipsDir = "items" + os.sep + "ships"
 skinsDir = "items" + os.sep + "ship skins"
@@ -528,13 +529,35 @@ builtInSecondariesData = {
 # This is primarily for use in their relevent fromDict functions.
 builtInSystemObjs = {}
 builtInCriminalObjs = {}
-# Ships are now stored as keys (names) rather than objects, as ships are no longer shared - every user has a unique ship object to allow for customisation
-# builtInShipObjs = {}
+# Ships are not shared between users, as every user's ship can be customised. builtInShipObjs instead holds frozen prototype ships,
+# which may be inspected directly, but must be cloned with bbShip.clone before being given to a user.
+builtInShipObjs = {}
 builtInModuleObjs = {}
 builtInWeaponObjs = {}
 builtInUpgradeObjs = {}
 builtInTurretObjs = {}
 
+# Case-insensitive indexes of the names and aliases of the above objects, for looking them up by name in constant time.
+# Also populated during package init. shipAliasIndex maps names to the frozen prototypes in builtInShipObjs.
+systemAliasIndex = bbAliasable.AliasIndex()
+criminalAliasIndex = bbAliasable.AliasIndex()
+shipAliasIndex = bbAliasable.AliasIndex()
+moduleAliasIndex = bbAliasable.AliasIndex()
+weaponAliasIndex = bbAliasable.AliasIndex()
+upgradeAliasIndex = bbAliasable.AliasIndex()
+turretAliasIndex = bbAliasable.AliasIndex()
+toolAliasIndex = bbAliasable.AliasIndex()
+# All of the above indexes combined. Values are tuples of the object type name (e.g "system") and the value from the type's own index.
+builtInAliasIndex = bbAliasable.AliasIndex()
+# A lib.ngramSearch.NGramIndex of every name in builtInAliasIndex and builtInShipSkins, for suggesting objects similar to unrecognised names.
+# Values are tuples of the object type name (e.g "system", or "skin") and the object's main name. Created during package init.
+builtInNameSearch = None
+
+# A lib.pathfinding.RouteTable of the shortest routes between every pair of builtIn systems. Built or loaded from cache during package init.
+routeTable = None
+# A lib.starMap.StarMap indexing the coordinates and jump gate systems of builtInSystemObjs. Built during package init.
+starMap = None
+
 # References to the above item objects, sorted by techLevel.
 shipKeysByTL = []
 moduleObjsByTL = []
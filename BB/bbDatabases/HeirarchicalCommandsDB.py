@@ -1,8 +1,30 @@
 # Typing imports
 from types import FunctionType
 from discord import Message, Embed, Colour
-from typing import List
+from typing import Coroutine, Dict, List, Tuple
 from ..bbConfig import bbConfig, bbData
+from ..logging import bbLogger
+from ..lib import rateLimiting
+from ..scheduling.TimedTaskMetrics import RollingHistogram
+import cProfile
+import math
+import time
+import traceback
+
+def tokenizeCommand(content : str, prefix : str) -> Tuple[str, str]:
+    """Split a message calling a command into the called command and its arguments, replacing special apostrophe characters with the universal '.
+    The content after the prefix is sliced out once and split once at its first space. It is only copied to replace apostrophes if it contains any.
+
+    :param str content: The content of a message starting with prefix
+    :param str prefix: The command prefix the message starts with
+    :return: The text between the prefix and the first space, and the text after the first space, which is empty if there is no space
+    :rtype: Tuple[str, str]
+    """
+    body = content[len(prefix):]
+    if "‘" in body or "’" in body:
+        body = body.replace("‘", "'").replace("’", "'")
+    command, _, args = body.partition(" ")
+    return command, args
 
 
 class IncorrectCommandCallContext(Exception):
@@ -32,8 +54,12 @@ class CommandRegistry:
     :vartype shortHelp: str
     :var longHelp: A longer help string describing in full parameters and command usage
     :vartype longHelp: str
+    :var accessLevel: The level of access required to call this command
+    :vartype accessLevel: int
+    :var cost: The number of rate limiting tokens it costs to call this command
+    :vartype cost: float
     """
-    def __init__(self, ident : str, func: FunctionType, forceKeepArgsCasing : bool, forceKeepCommandCasing : bool, allowDM : bool, allowHelp : bool, aliases : List[str] = [], signatureStr : str = "", shortHelp : str = "", longHelp : str = "", helpSection : str = "miscellaneous"):
+    def __init__(self, ident : str, func: FunctionType, forceKeepArgsCasing : bool, forceKeepCommandCasing : bool, allowDM : bool, allowHelp : bool, aliases : List[str] = [], signatureStr : str = "", shortHelp : str = "", longHelp : str = "", helpSection : str = "miscellaneous", accessLevel : int = 0, cost : float = 1):
         """
         :param str ident: The string command name by which this command is identified and called
         :param FunctionType func: A reference to the function to call upon calling this CommandRegistry
@@ -46,6 +72,8 @@ class CommandRegistry:
         :param str shortHelp: A short string describing the command (Default "")
         :param str longHelp: A longer help string describing in full parameters and command usage (Default "")
         :param str helpSection: The name of the help section containing this command (Default "miscellaneous")
+        :param int accessLevel: The level of access required to call this command (Default 0)
+        :param float cost: The number of rate limiting tokens it costs to call this command (Default 1)
         """
         self.ident = ident
         self.func = func
@@ -58,6 +86,8 @@ class CommandRegistry:
         self.shortHelp = shortHelp
         self.longHelp = longHelp
         self.helpSection = helpSection
+        self.accessLevel = accessLevel
+        self.cost = cost
 
 
     async def call(self, message : Message, args : str, isDM : bool):
@@ -73,6 +103,122 @@ class CommandRegistry:
         await self.func(message, args if self.forceKeepArgsCasing else args.lower(), isDM)
 
 
+class CommandMetrics:
+    """Rolling timings of the calls of a single command.
+    Time spent running the command's own code is recorded separately from time spent suspended, awaiting Discord requests and other I/O.
+
+    :var calls: The number of times the command has been called
+    :vartype calls: int
+    :var errors: The number of calls which raised an exception
+    :vartype errors: int
+    :var slowCalls: The number of calls which took longer than bbConfig.slowCommandThresholdSeconds
+    :vartype slowCalls: int
+    :var wallSeconds: How long calls took to complete, in seconds
+    :vartype wallSeconds: RollingHistogram
+    :var runningSeconds: How long calls spent running the command's code, in seconds
+    :vartype runningSeconds: RollingHistogram
+    :var awaitingSeconds: How long calls spent suspended, awaiting I/O, in seconds
+    :vartype awaitingSeconds: RollingHistogram
+    """
+
+    def __init__(self, maxSamples : int = 500):
+        """
+        :param int maxSamples: The number of most recent calls to keep timings for (Default 500)
+        """
+        self.calls = 0
+        self.errors = 0
+        self.slowCalls = 0
+        bucketBounds = [0.01, 0.1, 0.5, 1, 3, 10, 30]
+        self.wallSeconds = RollingHistogram(bucketBounds, maxSamples=maxSamples)
+        self.runningSeconds = RollingHistogram(bucketBounds, maxSamples=maxSamples)
+        self.awaitingSeconds = RollingHistogram(bucketBounds, maxSamples=maxSamples)
+
+
+    def record(self, wallSeconds : float, runningSeconds : float, failed : bool):
+        """Record the timings of a single call of the command.
+
+        :param float wallSeconds: How long the call took to complete, in seconds
+        :param float runningSeconds: How long the call spent running the command's code, in seconds
+        :param bool failed: Whether the call raised an exception
+        """
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        if wallSeconds > bbConfig.slowCommandThresholdSeconds:
+            self.slowCalls += 1
+        self.wallSeconds.record(wallSeconds)
+        self.runningSeconds.record(runningSeconds)
+        self.awaitingSeconds.record(wallSeconds - runningSeconds)
+
+
+    def toDict(self) -> dict:
+        """Take a JSON-serializable snapshot of these metrics.
+
+        :return: The call, error and slow call counts, and a summary of each histogram
+        :rtype: dict
+        """
+        return {"calls": self.calls, "errors": self.errors, "slowCalls": self.slowCalls, "wallSeconds": self.wallSeconds.toDict(),
+                "runningSeconds": self.runningSeconds.toDict(), "awaitingSeconds": self.awaitingSeconds.toDict()}
+
+
+class TimedCommandCall:
+    """Awaits a command's coroutine, measuring the time spent running its code between suspensions.
+    The coroutine is stepped manually rather than with await, so that each step can be timed, and optionally profiled.
+
+    :var coro: The coroutine being awaited
+    :vartype coro: Coroutine
+    :var profiler: A profiler to enable only while the coroutine is running, or None not to profile the coroutine
+    :vartype profiler: cProfile.Profile
+    :var runningSeconds: The total time spent running the coroutine's code so far
+    :vartype runningSeconds: float
+    """
+
+    def __init__(self, coro : Coroutine, profiler : cProfile.Profile = None):
+        """
+        :param Coroutine coro: The coroutine to await
+        :param cProfile.Profile profiler: A profiler to enable only while the coroutine is running, or None not to profile the coroutine (Default None)
+        """
+        self.coro = coro
+        self.profiler = profiler
+        self.runningSeconds = 0
+
+
+    def step(self, method : FunctionType, value):
+        """Run the coroutine up to its next suspension, timing it.
+
+        :param FunctionType method: The coroutine's send or throw method
+        :param value: The value to send, or the exception to throw, into the coroutine
+        :return: The value yielded by the coroutine when it suspended
+        :raise StopIteration: When the coroutine returns
+        """
+        if self.profiler is not None:
+            self.profiler.enable()
+        startTime = time.perf_counter()
+        try:
+            return method(value)
+        finally:
+            self.runningSeconds += time.perf_counter() - startTime
+            if self.profiler is not None:
+                self.profiler.disable()
+
+
+    def __await__(self):
+        method, value = self.coro.send, None
+        while True:
+            try:
+                yielded = self.step(method, value)
+            except StopIteration as e:
+                return e.value
+            try:
+                value = yield yielded
+                method = self.coro.send
+            except GeneratorExit:
+                self.coro.close()
+                raise
+            except BaseException as e:
+                method, value = self.coro.throw, e
+
+
 class HeirarchicalCommandsDB:
     """Class that stores, categorises, and calls commands based on a text name and caller permissions.
     
@@ -84,6 +230,16 @@ class HeirarchicalCommandsDB:
     :vartype helpSections: List[Dict[str, List[CommandRegistry]]]
     :var helpSectionEmbeds:  A list, where indices correspond to access levels, and elements are dictionaries mapping help section names to a list of discord.Embeds describing each command in the section by their shortHelp strings
     :vartype helpSectionEmbeds: List[Dict[str, List[Embed]]]
+    :var dispatchTable: Maps every registered command identifier and alias to a tuple, where indices correspond to caller access levels, and elements are the
+                        CommandRegistry called by that identifier at that access level, or None if there is none. Built from commands by compileDispatchTable,
+                        or None if commands have been registered since it was last built.
+    :vartype dispatchTable: Dict[str, Tuple[CommandRegistry]]
+    :var commandMetrics: Timings of every command called so far
+    :vartype commandMetrics: Dict[CommandRegistry, CommandMetrics]
+    :var pendingProfiles: Commands whose next call should be profiled, mapped to async functions to pass the profiler to once the call finishes
+    :vartype pendingProfiles: Dict[CommandRegistry, FunctionType]
+    :var rateLimiter: Limits the rate at which users and guilds can call commands, according to each command's cost
+    :vartype rateLimiter: CommandRateLimiter
     """
 
     def __init__(self, numAccessLevels : int):
@@ -95,11 +251,17 @@ class HeirarchicalCommandsDB:
         self.helpSectionEmbeds = [{"miscellaneous" : [Embed(title="BB " + bbConfig.accessLevelNames[accessLevel] + " Commands", description=bbData.helpIntro + "\n__Miscellaneous__", colour=Colour.blue())]} for accessLevel in range(self.numAccessLevels)]
         self.helpSectionEmbeds[0]["miscellaneous"][0].set_footer(text="Page 1 of 1")
         self.totalEmbeds = [1 for level in range(numAccessLevels)]
+        self.commandMetrics = {}
+        self.pendingProfiles = {}
+        self.rateLimiter = rateLimiting.CommandRateLimiter(bbConfig.commandRateLimitUserCapacity, bbConfig.commandRateLimitUserRefillPerSecond,
+                                                            bbConfig.commandRateLimitGuildCapacity, bbConfig.commandRateLimitGuildRefillPerSecond,
+                                                            bbConfig.commandRateLimitGlobalCapacity, bbConfig.commandRateLimitGlobalRefillPerSecond,
+                                                            evictionIntervalSeconds=bbConfig.commandRateLimitEvictionSeconds)
         
     
     def register(self, command : str, function : FunctionType, accessLevel : int, aliases : List[str] = [],
             forceKeepArgsCasing : bool = False, forceKeepCommandCasing : bool = False, allowDM : bool = True, noHelp : bool = False,
-            signatureStr : str = "", shortHelp : str = "", longHelp : str = "", useDoc : bool = False, helpSection : str = "miscellaneous"):
+            signatureStr : str = "", shortHelp : str = "", longHelp : str = "", useDoc : bool = False, helpSection : str = "miscellaneous", cost : float = 1):
         """Register a command in the database.
 
         :param str command: the text name users should call the function by. Commands are case sensitive.
@@ -115,6 +277,7 @@ class HeirarchicalCommandsDB:
         :param str longHelp: A longer help string describing in full parameters and command usage (Default "")
         :param bool useDoc: If no help strings are given, fall back on the docstring of function. (Default False)
         :param str helpSection: The name of the help section that this command should be displayed under (Default "miscellaneous")
+        :param float cost: The number of rate limiting tokens it costs to call this command. Give a higher cost for commands which are expensive to run. (Default 1)
         :raise IndexError: When attempting to register at an unsupported access level
         :raise NameError: When attempting to register a command identifier or alias that already exists at the requested access level
         :raise ValueError: When an unknown help section name is requested
@@ -171,9 +334,11 @@ class HeirarchicalCommandsDB:
                 raise ValueError("Unrecognised help section name '" + helpSection + "'")
 
         # Register all identifiers for this command to the same command registry
-        newRegistry = CommandRegistry(cmdIdent, function, forceKeepArgsCasing, forceKeepCommandCasing, allowDM, not noHelp, aliases=aliases, signatureStr=signatureStr, shortHelp=shortHelp, longHelp=longHelp, helpSection=helpSection)
+        newRegistry = CommandRegistry(cmdIdent, function, forceKeepArgsCasing, forceKeepCommandCasing, allowDM, not noHelp, aliases=aliases, signatureStr=signatureStr, shortHelp=shortHelp, longHelp=longHelp, helpSection=helpSection, accessLevel=accessLevel, cost=cost)
         for currentIdent in allIdents:
             self.commands[accessLevel][currentIdent] = newRegistry
+        # The dispatch table will be rebuilt on the next call
+        self.dispatchTable = None
 
         if not noHelp:
             # Add the command to help
@@ -199,25 +364,128 @@ class HeirarchicalCommandsDB:
         :return: True if the command call was successful, False otherwise
         :rtype: bool
         """
-        commandLower = command.lower()
-        # Search upper access levels first
-        for requiredAccess in range(accessLevel, -1, -1):
-            # Search casing matches (forceKeepCommandCasing) first
-            if command in self.commands[requiredAccess]:
-                await self.commands[requiredAccess][command].call(message, args, isDM)
-                # Return true if a command was found
-                return True
-            elif commandLower in self.commands[requiredAccess]:
-                await self.commands[requiredAccess][commandLower].call(message, args, isDM)
-                return True
+        registry = self.getCommand(command, accessLevel)
         # Return false if no command could be matched
-        return False
+        if registry is None:
+            return False
+
+        # Developers are exempt from rate limiting
+        if registry.cost > 0 and message.author.id not in bbConfig.developers:
+            waitSeconds, limitingBucket = self.rateLimiter.tryCall(message.author.id, None if message.guild is None else message.guild.id, registry.cost)
+            if waitSeconds > 0:
+                # Only tell the user once per cooldown, so that spamming commands does not also spam cooldown messages
+                if self.rateLimiter.shouldNotify(message.author.id, waitSeconds):
+                    # Only blame the user if it was their own bucket which refused the call
+                    if limitingBucket == "user":
+                        await message.channel.send(":hourglass: Slow down, " + bbConfig.accessLevelTitles[accessLevel] + "! You can use `" + \
+                                                    bbConfig.commandPrefix + registry.ident + "` again in " + str(math.ceil(waitSeconds)) + "s.")
+                    else:
+                        await message.channel.send(":hourglass: The bot is busy " + ("in this server" if limitingBucket == "guild" else "right now") + \
+                                                    ", please try `" + bbConfig.commandPrefix + registry.ident + "` again in " + str(math.ceil(waitSeconds)) + "s.")
+                return True
+
+        profileCallback = self.pendingProfiles.pop(registry, None)
+        timedCall = TimedCommandCall(registry.call(message, args, isDM), profiler=None if profileCallback is None else cProfile.Profile())
+        startTime = time.perf_counter()
+        try:
+            await timedCall
+        except Exception:
+            await self.finishCall(registry, args, time.perf_counter() - startTime, timedCall, profileCallback, True)
+            raise
+        await self.finishCall(registry, args, time.perf_counter() - startTime, timedCall, profileCallback, False)
+        # Return true if a command was found
+        return True
+
+
+    async def finishCall(self, registry : CommandRegistry, args : str, wallSeconds : float, timedCall : TimedCommandCall, profileCallback : FunctionType, failed : bool):
+        """Record the timings of a finished command call, log it if it was slow, and pass its profiler to profileCallback if it was profiled.
+
+        :param CommandRegistry registry: The command which was called
+        :param str args: The arguments the command was called with
+        :param float wallSeconds: How long the call took to complete, in seconds
+        :param TimedCommandCall timedCall: The finished call
+        :param FunctionType profileCallback: An async function to pass timedCall's profiler to, or None if the call was not profiled
+        :param bool failed: Whether the call raised an exception
+        """
+        if registry not in self.commandMetrics:
+            self.commandMetrics[registry] = CommandMetrics(maxSamples=bbConfig.commandMetricsSamples)
+        self.commandMetrics[registry].record(wallSeconds, timedCall.runningSeconds, failed)
+
+        if wallSeconds > bbConfig.slowCommandThresholdSeconds:
+            bbLogger.log("CommandsDB", "call", "Command '" + registry.ident + "' took " + str(round(wallSeconds, 2)) + "s (" + str(round(timedCall.runningSeconds, 2)) + \
+                            "s running, " + str(round(wallSeconds - timedCall.runningSeconds, 2)) + "s awaiting) with args '" + args[:100] + "'",
+                            category="slowCommands", eventType="SLOW_CMD" if not failed else "SLOW_CMD_ERR")
+
+        if profileCallback is not None:
+            try:
+                await profileCallback(timedCall.profiler)
+            except Exception as e:
+                bbLogger.log("CommandsDB", "call", "Failed to report profile of command '" + registry.ident + "': " + e.__class__.__name__,
+                                category="slowCommands", eventType="PROFILE_ERR", trace=traceback.format_exc())
+
+
+    def getCommand(self, command : str, accessLevel : int) -> CommandRegistry:
+        """Find the command that would be called by the given identifier at the given access level.
+
+        :param str command: the text name of the command. Commands may be case sensitive, depending on their forceKeepCommandCasing option
+        :param int accessLevel: The access level of the caller
+        :return: The command called by command at accessLevel, or None if there is no such command
+        :rtype: CommandRegistry
+        """
+        if self.dispatchTable is None:
+            self.compileDispatchTable()
+        # Casing matches (forceKeepCommandCasing) take priority, and already account for lower case matches
+        callers = self.dispatchTable.get(command) or self.dispatchTable.get(command.lower())
+        return None if callers is None else callers[accessLevel]
+
+
+    def profileNextCall(self, registry : CommandRegistry, profileCallback : FunctionType):
+        """Capture a cProfile profile of the next call of the given command.
+        The profiler is only enabled while the command's code is running, not while it is awaiting I/O.
+
+        :param CommandRegistry registry: The command to profile
+        :param FunctionType profileCallback: An async function to pass the cProfile.Profile to once the call has finished
+        """
+        self.pendingProfiles[registry] = profileCallback
+
+
+    def metricsSnapshot(self) -> Dict[str, dict]:
+        """Take a JSON-serializable snapshot of the timings of every command called so far.
+
+        :return: A dictionary mapping command names to their metrics, as given by CommandMetrics.toDict.
+                    Commands above access level 0 have the access level name appended to their names.
+        :rtype: dict[str, dict]
+        """
+        return {registry.ident + ("" if registry.accessLevel == 0 else " (" + bbConfig.accessLevelNames[registry.accessLevel] + ")"): metrics.toDict() \
+                for registry, metrics in self.commandMetrics.items()}
+
+
+    def compileDispatchTable(self):
+        """Build dispatchTable from the registered commands, so that calling a command needs at most two dictionary lookups,
+        rather than a search through every access level.
+        This is done automatically on the first call after any command is registered, but can be called in advance to avoid delaying that call.
+        """
+        dispatchTable = {}
+        for ident in set(ident for levelCommands in self.commands for ident in levelCommands):
+            identLower = ident.lower()
+            callers = []
+            found = None
+            for requiredAccess in range(self.numAccessLevels):
+                # A caller finds the command at the highest access level it can call, searching casing matches first at each level
+                if ident in self.commands[requiredAccess]:
+                    found = self.commands[requiredAccess][ident]
+                elif identLower in self.commands[requiredAccess]:
+                    found = self.commands[requiredAccess][identLower]
+                callers.append(found)
+            dispatchTable[ident] = tuple(callers)
+        self.dispatchTable = dispatchTable
 
 
     def clear(self):
         """Remove all command registrations from the database.
         """
         self.commands = [{} for i in range(self.numAccessLevels)]
+        self.dispatchTable = None
 
     
     def addHelpSection(self, accessLevel : int, sectionName : str):
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 from ..bbObjects.bounties import bbBounty
-from typing import List
-from ..baseClasses import bbSerializable
+from typing import Dict, List, Set, Tuple
+from ..baseClasses import bbSerializable, bbAliasable
 from ..bbConfig import bbConfig
 
 
@@ -19,6 +19,12 @@ class bbBountyDB(bbSerializable.bbSerializable):
     :vartype factions: list
     :var latestBounty: The most recent bounty to be added to this db.As of writing, this is only used when scaling new bounty delays by the most recent length
     :vartype latestBounty: bbObjects.bounties.bbBounty.Bounty
+    :var systemBounties: An index from system names to the bounties whose routes contain the system, and the position of the system in each route
+    :vartype systemBounties: dict[str, list[tuple[bbObjects.bounties.bbBounty.Bounty, int]]]
+    :var bountyAliasIndex: A case-insensitive index of the bounties in this db, by the names and aliases of their criminals
+    :vartype bountyAliasIndex: bbAliasable.AliasIndex
+    :var factionNames: The names of the criminals wanted by each faction
+    :vartype factionNames: dict[str, set[str]]
     """
 
     def __init__(self, factions: str):
@@ -31,10 +37,14 @@ class bbBountyDB(bbSerializable.bbSerializable):
 
         # Useable faction names for this bbBountyDB
         self.factions = factions
+        self.factionNames : Dict[str, Set[str]] = {}
         for fac in factions:
             self.bounties[fac] = []
+            self.factionNames[fac] = set()
 
         self.latestBounty = None
+        self.systemBounties : Dict[str, List[Tuple[bbBounty.Bounty, int]]] = {}
+        self.bountyAliasIndex = bbAliasable.AliasIndex()
 
     
     def addFaction(self, faction: str):
@@ -48,6 +58,7 @@ class bbBountyDB(bbSerializable.bbSerializable):
             raise KeyError("Attempted to add a faction that already exists: " + faction)
         # Initialise faction's database to empty
         self.bounties[faction] = []
+        self.factionNames[faction] = set()
 
     
     def removeFaction(self, faction: str):
@@ -60,7 +71,9 @@ class bbBountyDB(bbSerializable.bbSerializable):
         if not self.factionExists(faction):
             raise KeyError("Unrecognised faction: " + faction)
         # Remove the faction name from the DB
-        self.bounties.pop(faction)
+        for bounty in self.bounties.pop(faction):
+            self.unindexBounty(bounty)
+        self.factionNames.pop(faction)
 
     
     def clearBounties(self, faction : str = None):
@@ -74,6 +87,8 @@ class bbBountyDB(bbSerializable.bbSerializable):
             if not self.factionExists(faction):
                 raise KeyError("Unrecognised faction: " + faction)
             # Empty the faction's bounties
+            for bounty in self.bounties[faction]:
+                self.unindexBounty(bounty)
             self.bounties[faction] = []
         # If no faction is given
         else:
@@ -128,34 +143,76 @@ class bbBountyDB(bbSerializable.bbSerializable):
     
     def getBounty(self, name : str, faction : str = None) -> bbBounty.Bounty:
         """Get the bbBounty object for a given bbCriminal name or alias.
-        This process is much more efficient when given the faction that the criminal is wanted by.
+        Bounties are looked up in bountyAliasIndex, so this takes constant time whether or not the faction is given.
 
-        :param str name: A name or alias for the bbCriminal whose bbBounty is to be fetched.
+        :param str name: A name or alias for the bbCriminal whose bbBounty is to be fetched, in any casing.
         :param str faction: The faction by which the bbCriminal is wanted. Give None if this is not known, to search all factions. (default None)
         
         :return: the bbBounty object tracking the named criminal
         :rtype: bbObjects.bounties.bbBounty.Bounty
 
-        :raise KeyError: If the requested criminal name does not exist in this DB
+        :raise KeyError: If the requested criminal name does not exist in this DB, or is not wanted by the given faction
         """
-        # If the criminal's faction is known
-        if faction is not None:
-            # Search the given faction's bounties
-            for bounty in self.bounties[faction]:
-                # Return the named criminal's bbBounty if the name is found
-                if bounty.criminal.isCalled(name):
-                    return bounty
+        bounty = self.bountyAliasIndex.get(name)
+        if bounty is None or (faction is not None and bounty.faction != faction):
+            # The criminal was not recognised, raise an error
+            raise KeyError("Bounty not found: " + name)
+        return bounty
 
-        # If the criminal's faction is not known, search all factions
-        else:
-            for fac in self.getFactions():
-                # Return the named criminal's bbBounty if the name is found
-                for bounty in self.bounties[fac]:
-                    if bounty.criminal.isCalled(name):
-                        return bounty
-        
-        # The criminal was not recognised, raise an error
-        raise KeyError("Bounty not found: " + name)
+
+    def getFreeBountyNames(self, faction : str, names : List[str]) -> List[str]:
+        """Filter a list of criminal names down to those which are not already wanted in this DB, for picking the name of a new bounty.
+
+        :param str faction: The faction which the new bounty will belong to
+        :param list[str] names: The criminal names to choose from, e.g bbData.bountyNames[faction]
+        :return: The names in names which are not the name or alias of any criminal in the DB. Names in use by faction are ruled out first, without case folding.
+        :rtype: list[str]
+        """
+        return [name for name in names if name not in self.factionNames[faction] and name not in self.bountyAliasIndex]
+
+
+    def getSystemBounties(self, system : str) -> List[Tuple[bbBounty.Bounty, int]]:
+        """Get all bounties whose routes contain the given system, without searching every bounty.
+
+        :param str system: The name of the system to look up
+        :return: Pairs of each bounty whose route contains system, and the position of system in the bounty's route. ⚠ Muteable, and can alter the DB!
+        :rtype: list[tuple[bbObjects.bounties.bbBounty.Bounty, int]]
+        """
+        return self.systemBounties.get(system, [])
+
+
+    def indexBounty(self, bounty : bbBounty.Bounty):
+        """Add a bounty to the systemBounties entries of every system in its route, to bountyAliasIndex, and to its faction's factionNames.
+        If a system appears in the route more than once, only its first position is indexed, matching route.index.
+
+        The bounty is indexed under its criminal's names directly with indexName, rather than with AliasIndex.add, so that criminals shared
+        between guilds, such as builtIn criminals, never hold references to this db's index.
+
+        :param bbBounty.Bounty bounty: The bounty to index
+        """
+        for name in [bounty.criminal.name] + bounty.criminal.aliases:
+            self.bountyAliasIndex.indexName(name, bounty)
+        self.factionNames[bounty.faction].add(bounty.criminal.name)
+        indexedSystems = set()
+        for routePos, system in enumerate(bounty.route):
+            if system not in indexedSystems:
+                indexedSystems.add(system)
+                self.systemBounties.setdefault(system, []).append((bounty, routePos))
+
+
+    def unindexBounty(self, bounty : bbBounty.Bounty):
+        """Remove a bounty from the systemBounties entries of every system in its route, from bountyAliasIndex, and from its faction's factionNames.
+
+        :param bbBounty.Bounty bounty: The bounty to unindex
+        """
+        for name in [bounty.criminal.name] + bounty.criminal.aliases:
+            self.bountyAliasIndex.unindexName(name, bounty)
+        self.factionNames[bounty.faction].discard(bounty.criminal.name)
+        for system in set(bounty.route):
+            if system in self.systemBounties:
+                self.systemBounties[system] = [entry for entry in self.systemBounties[system] if entry[0] is not bounty]
+                if not self.systemBounties[system]:
+                    del self.systemBounties[system]
 
 
     def canMakeBounty(self) -> bbBounty.Bounty:
@@ -186,8 +243,7 @@ class bbBountyDB(bbSerializable.bbSerializable):
 
     
     def bountyNameExists(self, name : str, faction : str = None) -> bool:
-        """Check whether a criminal with the given name or alias exists in the DB
-        The process is much more efficient if the faction where the bbCriminal should reside is known.
+        """Check whether a criminal with the given name or alias exists in the DB, in constant time.
 
         :param str name: The name or alias to check for bbCriminal existence against
         :param str faction: The faction whose bounties to check for the named criminal. Use None if the faction is not known. (default None)
@@ -195,13 +251,8 @@ class bbBountyDB(bbSerializable.bbSerializable):
         :return: True if a bbBounty is found for a bbCriminal with the given name, False if the given name does not correspond to an active bounty in this DB
         :rtype: bool
         """
-        # Search for a bbBounty object under the given name
-        try:
-            self.getBounty(name, faction)
-        # Return False if the name was not found, True otherwise
-        except KeyError:
-            return False
-        return True
+        bounty = self.bountyAliasIndex.get(name)
+        return bounty is not None and (faction is None or bounty.faction == faction)
 
     
     def bountyObjExists(self, bounty : bbBounty.Bounty) -> bool:
@@ -241,10 +292,11 @@ class bbBountyDB(bbSerializable.bbSerializable):
 
         # ensure the given bounty does not already exist
         if self.bountyNameExists(bounty.criminal.name):
-            raise ValueError("Attempted to add a bounty whose name already exists: " + bounty.name)
+            raise ValueError("Attempted to add a bounty whose name already exists: " + bounty.criminal.name)
 
         # Add the bounty to the database
         self.bounties[bounty.faction].append(bounty)
+        self.indexBounty(bounty)
         self.latestBounty = bounty
 
     
@@ -266,6 +318,7 @@ class bbBountyDB(bbSerializable.bbSerializable):
         if bounty is self.latestBounty:
             self.latestBounty = None
         self.bounties[bounty.faction].remove(bounty)
+        self.unindexBounty(bounty)
 
 
     def hasBounties(self, faction : str = None) -> bool:
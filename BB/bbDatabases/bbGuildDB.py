@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from ..bbObjects import bbGuild
-from typing import List
+from typing import Iterable, List, Tuple
 from . import bbBountyDB
 from ..bbConfig import bbData
 from .. import bbGlobals
@@ -14,11 +14,25 @@ class bbGuildDB(bbSerializable.bbSerializable):
     
     :var guilds: Dictionary of guild.id to guild, where guild is a bbGuild
     :vartype guilds: dict[int, bbGuild]
+    :var dirtyIDs: The IDs of guilds which may have changed since the database was last saved
+    :vartype dirtyIDs: set[int]
+    :var savedDigests: Digests of the serialised state of each guild when it was last saved, by string guild ID.
+                        Maintained by the save functions, so that guilds which were fetched but not changed are not rewritten.
+    :vartype savedDigests: dict[str, int]
+    :var removedIDs: The IDs of guilds which have been removed from the database since it was last saved
+    :vartype removedIDs: set[int]
+    :var unjournaledIDs: The IDs of guilds which may have changed or been removed since their states were last recorded in the journal
+    :vartype unjournaledIDs: set[int]
     """
 
     def __init__(self):
         # Store guilds as a dict of guild.id: guild
         self.guilds = {}
+        # Track which records need to be rewritten or deleted on the next save
+        self.dirtyIDs = set()
+        self.removedIDs = set()
+        self.unjournaledIDs = set()
+        self.savedDigests = {}
 
 
     
@@ -44,12 +58,50 @@ class bbGuildDB(bbSerializable.bbSerializable):
     
     def getGuild(self, id : int) -> bbGuild.bbGuild:
         """Get the bbGuild object with the specified ID.
+        Commands may modify bbGuilds directly after fetching them, so the guild is marked as accessed.
 
         :param str id: integer discord ID for the requested guild
         :return: bbGuild having the requested ID
         :rtype: bbGuild
         """
-        return self.guilds[id]
+        guild = self.guilds[id]
+        self.markAccessed(id)
+        return guild
+
+
+    def markAccessed(self, id : int):
+        """Mark the guild with the given ID as possibly changed.
+        On the next incremental save, the guild is serialised and only written if it differs from its last saved state.
+
+        :param int id: integer discord ID for the guild which may have changed
+        """
+        self.dirtyIDs.add(id)
+        self.unjournaledIDs.add(id)
+
+
+    def markDirty(self, id : int):
+        """Mark the guild with the given ID as changed, so that it is written on the next incremental save
+        whether or not it differs from its last saved state.
+
+        :param int id: integer discord ID for the guild which has changed
+        """
+        self.markAccessed(id)
+        self.savedDigests.pop(str(id), None)
+
+
+    def markAllDirty(self):
+        """Mark every guild in the database as changed, forcing all of them to be written on the next incremental save.
+        """
+        self.dirtyIDs.update(self.guilds.keys())
+
+
+    def hasDirtyRecords(self) -> bool:
+        """Decide whether or not any guilds have changed or been removed since the database was last saved.
+
+        :return: True if at least one guild needs to be written or deleted, False otherwise
+        :rtype: bool
+        """
+        return len(self.dirtyIDs) > 0 or len(self.removedIDs) > 0
 
 
     
@@ -60,14 +112,8 @@ class bbGuildDB(bbSerializable.bbSerializable):
         :return: True if a bbGuild is stored in the database with the requested ID, False otherwise
         :rtype: bool
         """
-        # Search the DB for the requested ID
-        try:
-            self.getGuild(id)
-        # No bbGuild found, return False
-        except KeyError:
-            return False
-        # Return True otherwise
-        return True
+        # Check the guilds dict directly, rather than with getGuild, to avoid marking the guild as accessed
+        return id in self.guilds
 
     
     
@@ -94,6 +140,8 @@ class bbGuildDB(bbSerializable.bbSerializable):
         if self.guildObjExists(guild):
             raise KeyError("Attempted to add a guild that already exists: " + guild.id)
         self.guilds[guild.id] = guild
+        self.removedIDs.discard(guild.id)
+        self.markDirty(guild.id)
 
     
     
@@ -111,6 +159,8 @@ class bbGuildDB(bbSerializable.bbSerializable):
             raise KeyError("Attempted to add a guild that already exists: " + id)
         # Create and return a bbGuild for the requested ID
         self.guilds[id] = bbGuild.bbGuild(id, bbBountyDB.bbBountyDB(bbData.bountyFactions), bbGlobals.client.get_guild(id))
+        self.removedIDs.discard(id)
+        self.markDirty(id)
         return self.guilds[id]
 
     
@@ -121,6 +171,9 @@ class bbGuildDB(bbSerializable.bbSerializable):
         :param int id: integer discord ID to remove from the database
         """
         self.guilds.pop(id)
+        self.dirtyIDs.discard(id)
+        self.removedIDs.add(id)
+        self.unjournaledIDs.add(id)
 
 
     
@@ -140,6 +193,27 @@ class bbGuildDB(bbSerializable.bbSerializable):
         for guild in self.guilds.values():
             if not guild.shopDisabled:
                 guild.shop.refreshStock()
+                self.markDirty(guild.id)
+
+
+    def refreshShopStocksInBucket(self, bucket : int, numBuckets : int) -> List[bbGuild.bbGuild]:
+        """Generate new stock for the shops of the stored bbGuilds in the given refresh bucket.
+        Guilds are split into numBuckets buckets by the creation timestamp in their ID, so each guild is always in the same bucket.
+        The lowest bits of a snowflake ID are a per-process counter which is almost always 0 or 1 for guilds, so bucketing on the
+        whole ID would leave some buckets nearly empty whenever numBuckets is even.
+
+        :param int bucket: The index of the bucket to refresh, from 0 to numBuckets - 1
+        :param int numBuckets: The number of buckets that guilds are split into
+        :return: The guilds whose shops were refreshed
+        :rtype: List[bbGuild]
+        """
+        refreshed = []
+        for guild in self.guilds.values():
+            if (guild.id >> 22) % numBuckets == bucket and not guild.shopDisabled:
+                guild.shop.refreshStock()
+                self.markDirty(guild.id)
+                refreshed.append(guild)
+        return refreshed
 
     
     
@@ -159,6 +233,48 @@ class bbGuildDB(bbSerializable.bbSerializable):
 
 
     
+    def dirtyRecordsToDict(self, **kwargs) -> dict:
+        """Serialise only the guilds which have changed since the last save, and clear the set of dirty guilds.
+        The result is in the same format as toDict, but only contains dirty guilds.
+
+        :return: A dictionary mapping string guild IDs to the serialised representations of the changed bbGuilds
+        :rtype: dict
+        """
+        data = {}
+        for id in self.dirtyIDs:
+            # Guilds may have been removed after being marked dirty
+            if id in self.guilds:
+                data[str(id)] = self.guilds[id].toDict(**kwargs)
+        self.dirtyIDs.clear()
+        return data
+
+
+    def unjournaledRecordsToDict(self, **kwargs) -> dict:
+        """Serialise all guilds which have changed or been removed since they were last journaled, and clear the set of unjournaled guilds.
+        Removed guilds are represented by None.
+
+        :return: A dictionary mapping string guild IDs to the serialised representations of the changed bbGuilds, or None for removed guilds
+        :rtype: dict
+        """
+        data = {}
+        for id in self.unjournaledIDs:
+            data[str(id)] = self.guilds[id].toDict(**kwargs) if id in self.guilds else None
+        self.unjournaledIDs.clear()
+        return data
+
+
+    def popRemovedIDs(self) -> List[str]:
+        """Get the IDs of all guilds removed since the last save, and clear the set of removed guilds.
+
+        :return: A list of string guild IDs whose saved records should be deleted
+        :rtype: list[str]
+        """
+        removed = [str(id) for id in self.removedIDs]
+        self.removedIDs.clear()
+        return removed
+
+
+    
     def __str__(self) -> str:
         """Fetch summarising information about the database, as a string
         Currently only the number of guilds stored
@@ -178,18 +294,37 @@ class bbGuildDB(bbSerializable.bbSerializable):
         :return: The new bbGuildDB
         :rtype: bbGuildDB
         """
+        return bbGuildDB.fromRecords(guildsDBDict.items(), **kwargs)
+
+
+    @classmethod
+    def fromRecords(cls, records : Iterable[Tuple[str, dict]], **kwargs) -> bbGuildDB:
+        """Construct a bbGuildDB from a stream of dictionary-serialised guilds, such as that given by lib.jsonHandler.iterJSONRecords.
+        Each guild is constructed as soon as it is received, so the serialised guilds never all need to be held in memory at once.
+
+        :param records: An iterable of (string guild ID, dictionary-serialised bbGuild) pairs
+        :type records: Iterable[tuple[str, dict]]
+        :param bool dbReload: Whether or not this DB is being created during the initial database loading phase of bountybot. This is used to toggle name checking in bbBounty contruction.
+        :return: The new bbGuildDB
+        :rtype: bbGuildDB
+        """
         dbReload = kwargs["dbReload"] if "dbReload" in kwargs else False
         
         # Instance the new bbGuildDB
         newDB = bbGuildDB()
-        # Iterate over all IDs to add to the DB
-        for id in guildsDBDict.keys():
+        # Iterate over all guilds to add to the DB
+        for id, guildDict in records:
             # Instance new bbGuilds for each ID, with the provided data
             # JSON stores properties as strings, so ids must be converted to int first.
             try:
-                newDB.addGuildObj(bbGuild.bbGuild.fromDict(guildsDBDict[id], id=int(id), dbReload=dbReload))
+                newDB.addGuildObj(bbGuild.bbGuild.fromDict(guildDict, id=int(id), dbReload=dbReload))
             # Ignore guilds that don't have a corresponding dcGuild
             except bbGuild.NoneDCGuildObj:
-                bbLogger.log("bbGuildDB", "fromDict", "no corresponding discord guild found for ID " + id + ", guild removed from database",
+                bbLogger.log("bbGuildDB", "fromRecords", "no corresponding discord guild found for ID " + id + ", guild removed from database",
                     category="guildsDB", eventType="NULL_GLD")
+                # Delete the guild's saved record on the next save
+                newDB.removedIDs.add(int(id))
+        # Freshly loaded guilds match what is already saved
+        newDB.dirtyIDs.clear()
+        newDB.unjournaledIDs.clear()
         return newDB
@@ -0,0 +1,158 @@
+from __future__ import annotations
+import json
+import os
+import traceback
+from typing import Dict, List, Set
+from ..logging import bbLogger
+
+
+class bbJournal:
+    """A write-ahead log of changes to database records, used to recover changes made since the last database save after a crash.
+
+    Each entry in the journal is a single line of JSON, recording the full serialised state of one database record after it was changed,
+    or null if the record was removed. Records are only journaled when their serialised state differs from the last time they were journaled.
+    Entries are appended to numbered segment files in the journal directory, in batches.
+    When a database save begins, the journal is rotated onto a new segment. Once the save has finished writing, every segment up to
+    the rotated one is covered by the saved records, and can be discarded.
+    On startup, all remaining segments are replayed in order on top of the saved records.
+
+    :var journalDir: Path to the directory containing the journal's segment files
+    :vartype journalDir: str
+    :var fsync: Whether or not to wait for appended entries to be flushed to disk before continuing
+    :vartype fsync: bool
+    :var currentSegment: The number of the segment file which entries are currently appended to
+    :vartype currentSegment: int
+    :var segmentFile: The open file of the current segment, or None if no entries have been appended to it yet
+    :vartype segmentFile: io.TextIOWrapper
+    :var journaledDigests: The digest of the serialised state of each record as it was last journaled, by (database name, string record ID)
+    :vartype journaledDigests: dict[tuple[str, str], int]
+    """
+
+    def __init__(self, journalDir : str, fsync : bool = True):
+        """
+        :param str journalDir: Path to the directory containing the journal's segment files. This is created if it does not exist.
+        :param bool fsync: Whether or not to wait for appended entries to be flushed to disk before continuing (Default True)
+        """
+        self.journalDir = journalDir
+        self.fsync = fsync
+        if not os.path.isdir(journalDir):
+            os.makedirs(journalDir)
+        existingSegments = self.getSegments()
+        # Never append to segments left over from a previous run
+        self.currentSegment = existingSegments[-1] + 1 if existingSegments else 0
+        self.segmentFile = None
+        self.journaledDigests = {}
+
+
+    def segmentPath(self, segment : int) -> str:
+        """Get the path to the file for the segment with the given number.
+
+        :param int segment: The number of the segment
+        :return: The path to the segment's file
+        :rtype: str
+        """
+        return self.journalDir + os.sep + str(segment) + ".jsonl"
+
+
+    def getSegments(self) -> List[int]:
+        """Get the numbers of all segment files currently in the journal directory, in ascending order.
+
+        :return: A sorted list of segment numbers
+        :rtype: list[int]
+        """
+        segments = []
+        for fileName in os.listdir(self.journalDir):
+            if fileName.endswith(".jsonl") and fileName[:-len(".jsonl")].isdigit():
+                segments.append(int(fileName[:-len(".jsonl")]))
+        return sorted(segments)
+
+
+    def append(self, batch : Dict[str, Dict[str, dict]]) -> int:
+        """Record the new states of the given records of one or more databases, with a single flush (and fsync, if enabled) for the whole batch.
+        Records whose serialised state is identical to their last journaled state are skipped.
+        This does not touch the event loop, and so may be called from an executor. Calls must not overlap with each other or with rotate.
+
+        :param dict batch: A dictionary mapping database names, e.g "users", to dictionaries mapping string record IDs to the serialised records,
+                            or to None for records which have been removed
+        :return: The number of entries written
+        :rtype: int
+        """
+        lines = []
+        newDigests = {}
+        for dbName in batch:
+            for id, record in batch[dbName].items():
+                data = json.dumps(record)
+                digest = hash(data)
+                if self.journaledDigests.get((dbName, id)) != digest:
+                    newDigests[(dbName, id)] = digest
+                    lines.append('{"db": ' + json.dumps(dbName) + ', "id": ' + json.dumps(id) + ', "data": ' + data + '}\n')
+        if not lines:
+            return 0
+        if self.segmentFile is None:
+            self.segmentFile = open(self.segmentPath(self.currentSegment), "a")
+        self.segmentFile.write("".join(lines))
+        self.segmentFile.flush()
+        if self.fsync:
+            os.fsync(self.segmentFile.fileno())
+        # Only remember entries once they have been written, so that a failed write is retried in full
+        self.journaledDigests.update(newDigests)
+        return len(lines)
+
+
+    def rotate(self) -> int:
+        """Close the current segment, and start appending new entries to a new segment.
+        This should be called just before the databases are snapshotted for saving.
+
+        :return: The number of the segment which was just closed. Once the save has finished, all segments up to and including this one may be discarded.
+        :rtype: int
+        """
+        if self.segmentFile is not None:
+            self.segmentFile.close()
+            self.segmentFile = None
+        self.currentSegment += 1
+        return self.currentSegment - 1
+
+
+    def discardUpTo(self, segment : int):
+        """Delete all segment files up to and including the given segment number.
+        This should be called once the records journaled in these segments have been saved.
+
+        :param int segment: The number of the last segment to delete
+        """
+        for currentSegment in self.getSegments():
+            if currentSegment <= segment:
+                os.remove(self.segmentPath(currentSegment))
+
+
+    def replayOnto(self, dbName : str, records : Dict[str, dict]) -> Set[str]:
+        """Apply all journaled changes to the named database onto the given dictionary of saved records, in the order they were made.
+        Lines which cannot be parsed, such as a partly written final line after a crash, are logged and skipped.
+
+        :param str dbName: The name of the database whose changes to replay, e.g "users"
+        :param dict records: A dictionary mapping string record IDs to serialised records, as loaded from the database save. This is modified in place.
+        :return: The IDs of all records which were changed or removed by the replay
+        :rtype: set[str]
+        """
+        changedIDs = set()
+        for segment in self.getSegments():
+            if segment >= self.currentSegment:
+                continue
+            f = open(self.segmentPath(segment), "r")
+            for line in f:
+                if line.strip() == "":
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError as e:
+                    bbLogger.log("bbJournal", "replayOnto", "Skipping unreadable journal entry in segment " + str(segment) + ": " + e.__class__.__name__,
+                                    category="journal", eventType="BAD_ENTRY", trace=traceback.format_exc())
+                    continue
+                if entry["db"] != dbName:
+                    continue
+                if entry["data"] is None:
+                    records.pop(entry["id"], None)
+                else:
+                    records[entry["id"]] = entry["data"]
+                changedIDs.add(entry["id"])
+            f.close()
+        return changedIDs
@@ -3,7 +3,7 @@ from ..bbObjects import bbUser
 from .. import lib
 from ..logging import bbLogger
 import traceback
-from typing import List
+from typing import Iterable, List, Tuple
 from ..baseClasses import bbSerializable
 
 
@@ -12,11 +12,25 @@ class bbUserDB(bbSerializable.bbSerializable):
     
     :var users: Dictionary of users in the database, where values are the bbUser objects and keys are the ids of their respective bbUser
     :vartype users: dict[int, bbUser]
+    :var dirtyIDs: The IDs of users which may have changed since the database was last saved
+    :vartype dirtyIDs: set[int]
+    :var savedDigests: Digests of the serialised state of each user when it was last saved, by string user ID.
+                        Maintained by the save functions, so that users which were fetched but not changed are not rewritten.
+    :vartype savedDigests: dict[str, int]
+    :var removedIDs: The IDs of users which have been removed from the database since it was last saved
+    :vartype removedIDs: set[int]
+    :var unjournaledIDs: The IDs of users which may have changed or been removed since their states were last recorded in the journal
+    :vartype unjournaledIDs: set[int]
     """
 
     def __init__(self):
         # Store users as a dict of user.id: user
         self.users = {}
+        # Track which records need to be rewritten or deleted on the next save
+        self.dirtyIDs = set()
+        self.removedIDs = set()
+        self.unjournaledIDs = set()
+        self.savedDigests = {}
 
 
     def userIDExists(self, id : int) -> bool:
@@ -72,6 +86,7 @@ class bbUserDB(bbSerializable.bbSerializable):
             raise KeyError("user not found: " + str(id))
         # Reset the user
         self.users[id].resetUser()
+        self.markDirty(id)
 
 
     def addUser(self, id : int) -> bbUser.bbUser:
@@ -90,6 +105,8 @@ class bbUserDB(bbSerializable.bbSerializable):
         # Create and return a new user
         newUser = bbUser.bbUser.fromDict(bbUser.defaultUserDict, id=id)
         self.users[id] = newUser
+        self.removedIDs.discard(id)
+        self.markDirty(id)
         return newUser
 
     def addUserObj(self, userObj : bbUser.bbUser):
@@ -103,6 +120,8 @@ class bbUserDB(bbSerializable.bbSerializable):
             raise KeyError("Attempted to add a user that is already in this bbUserDB: " + str(userObj))
         # Store the passed bbUser
         self.users[userObj.id] = userObj
+        self.removedIDs.discard(userObj.id)
+        self.markDirty(userObj.id)
 
 
     def getOrAddID(self, id : int) -> bbUser.bbUser:
@@ -126,17 +145,58 @@ class bbUserDB(bbSerializable.bbSerializable):
         if not self.userIDExists(id):
             raise KeyError("user not found: " + str(id))
         del self.users[id]
+        self.dirtyIDs.discard(id)
+        self.removedIDs.add(id)
+        self.unjournaledIDs.add(id)
 
     
     def getUser(self, id : int) -> bbUser.bbUser:
         """Fetch the bbUser from the database with the given ID.
+        Commands may modify bbUsers directly after fetching them, so the user is marked as accessed.
 
         :param int ID: integer discord ID for the user to fetch
         :return: the stored bbUser with the given ID
         :rtype: bbUser
         """
         id = self.validateID(id)
-        return self.users[id]
+        user = self.users[id]
+        self.markAccessed(id)
+        return user
+
+
+    def markAccessed(self, id : int):
+        """Mark the user with the given ID as possibly changed.
+        On the next incremental save, the user is serialised and only written if it differs from its last saved state.
+
+        :param int id: integer discord ID for the user which may have changed
+        """
+        self.dirtyIDs.add(id)
+        self.unjournaledIDs.add(id)
+
+
+    def markDirty(self, id : int):
+        """Mark the user with the given ID as changed, so that it is written on the next incremental save
+        whether or not it differs from its last saved state.
+
+        :param int id: integer discord ID for the user which has changed
+        """
+        self.markAccessed(id)
+        self.savedDigests.pop(str(id), None)
+
+
+    def markAllDirty(self):
+        """Mark every user in the database as changed, forcing all of them to be written on the next incremental save.
+        """
+        self.dirtyIDs.update(self.users.keys())
+
+
+    def hasDirtyRecords(self) -> bool:
+        """Decide whether or not any users have changed or been removed since the database was last saved.
+
+        :return: True if at least one user needs to be written or deleted, False otherwise
+        :rtype: bool
+        """
+        return len(self.dirtyIDs) > 0 or len(self.removedIDs) > 0
 
 
     def getUsers(self) -> List[bbUser.bbUser]:
@@ -175,6 +235,54 @@ class bbUserDB(bbSerializable.bbSerializable):
         return data
 
     
+    def dirtyRecordsToDict(self, **kwargs) -> dict:
+        """Serialise only the users which have changed since the last save, and clear the set of dirty users.
+        The result is in the same format as toDict, but only contains dirty users.
+
+        :return: A dictionary mapping string user IDs to the serialised representations of the changed bbUsers
+        :rtype: dict
+        """
+        data = {}
+        for id in self.dirtyIDs:
+            # Users may have been removed after being marked dirty
+            if id not in self.users:
+                continue
+            try:
+                data[str(id)] = self.users[id].toDict(**kwargs)
+            except Exception as e:
+                bbLogger.log("UserDB", "dirtyRecordsToDict", "Error serialising bbUser: " + e.__class__.__name__, trace=traceback.format_exc(), eventType="USERERR")
+        self.dirtyIDs.clear()
+        return data
+
+
+    def unjournaledRecordsToDict(self, **kwargs) -> dict:
+        """Serialise all users which have changed or been removed since they were last journaled, and clear the set of unjournaled users.
+        Removed users are represented by None.
+
+        :return: A dictionary mapping string user IDs to the serialised representations of the changed bbUsers, or None for removed users
+        :rtype: dict
+        """
+        data = {}
+        for id in self.unjournaledIDs:
+            try:
+                data[str(id)] = self.users[id].toDict(**kwargs) if id in self.users else None
+            except Exception as e:
+                bbLogger.log("UserDB", "unjournaledRecordsToDict", "Error serialising bbUser: " + e.__class__.__name__, trace=traceback.format_exc(), eventType="USERERR")
+        self.unjournaledIDs.clear()
+        return data
+
+
+    def popRemovedIDs(self) -> List[str]:
+        """Get the IDs of all users removed since the last save, and clear the set of removed users.
+
+        :return: A list of string user IDs whose saved records should be deleted
+        :rtype: list[str]
+        """
+        removed = [str(id) for id in self.removedIDs]
+        self.removedIDs.clear()
+        return removed
+
+    
     def __str__(self) -> str:
         """Get summarising information about this bbUserDB in string format.
         Currently only the number of users stored.
@@ -193,11 +301,27 @@ class bbUserDB(bbSerializable.bbSerializable):
         :return: the new bbUserDB
         :rtype: bbUserDB
         """
+        return bbUserDB.fromRecords(userDBDict.items(), **kwargs)
+
+
+    @classmethod
+    def fromRecords(cls, records : Iterable[Tuple[str, dict]], **kwargs) -> bbUserDB:
+        """Construct a bbUserDB from a stream of dictionary-serialised users, such as that given by lib.jsonHandler.iterJSONRecords.
+        Each user is constructed as soon as it is received, so the serialised users never all need to be held in memory at once.
+
+        :param records: An iterable of (string user ID, dictionary-serialised bbUser) pairs
+        :type records: Iterable[tuple[str, dict]]
+        :return: the new bbUserDB
+        :rtype: bbUserDB
+        """
         # Instance the new bbUserDB
         newDB = bbUserDB()
-        # iterate over all user IDs to spawn
-        for id in userDBDict.keys():
+        # iterate over all users to spawn
+        for id, userDict in records:
             # Construct new bbUsers for each ID in the database
             # JSON stores properties as strings, so ids must be converted to int first.
-            newDB.addUserObj(bbUser.bbUser.fromDict(userDBDict[id], id=int(id)))
+            newDB.addUserObj(bbUser.bbUser.fromDict(userDict, id=int(id)))
+        # Freshly loaded users match what is already saved
+        newDB.dirtyIDs.clear()
+        newDB.unjournaledIDs.clear()
         return newDB
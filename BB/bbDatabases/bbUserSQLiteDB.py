@@ -0,0 +1,397 @@
+from __future__ import annotations
+from ..bbObjects import bbUser
+from . import bbUserDB
+from ..logging import bbLogger
+from collections import OrderedDict
+from typing import List, Dict, Tuple
+import sqlite3
+import threading
+import weakref
+import json
+import time
+import traceback
+
+
+class bbUserSQLiteDB(bbUserDB.bbUserDB):
+    """A bbUserDB which stores users in an SQLite database file, rather than holding every bbUser in memory.
+    bbUsers are only constructed ('hydrated') from their stored records when they are first accessed.
+
+    The most recently accessed users are kept in memory in a bounded LRU cache. Users with unsaved changes are pinned in memory
+    until they have been snapshotted for saving. Any bbUser which is still referenced elsewhere (e.g by a DuelRequest or ReactionMenu)
+    is tracked weakly, so that the same object is always returned for the same ID while it is alive.
+
+    Changed users are written back in a single transaction per save with writeRecords, which is safe to call from another thread.
+    Users are read on the event loop through a separate connection. As the database is in WAL mode, these reads do not wait for a save to commit.
+
+    :var users: LRU cache of recently accessed bbUsers, ordered from least to most recently used
+    :vartype users: OrderedDict[int, bbUser]
+    :var dbPath: Path to the SQLite database file
+    :vartype dbPath: str
+    :var cacheSize: The maximum number of users to hold in the LRU cache
+    :vartype cacheSize: int
+    :var hydratedUsers: Weak references to every bbUser currently in memory
+    :vartype hydratedUsers: weakref.WeakValueDictionary[int, bbUser]
+    :var pinnedUsers: Users with unsaved changes, which must not be dropped from memory
+    :vartype pinnedUsers: dict[int, bbUser]
+    :var pendingRecords: Serialised users which have been snapshotted for saving, but not yet committed to the database
+    :vartype pendingRecords: dict[int, dict]
+    :var pendingRemovals: IDs of users which have been snapshotted for removal, but not yet deleted from the database
+    :vartype pendingRemovals: set[int]
+    :var connection: The connection used to write to the SQLite database, from the saving thread
+    :vartype connection: sqlite3.Connection
+    :var writeLock: Lock guarding connection, so that only one write transaction is made at a time
+    :vartype writeLock: threading.Lock
+    :var readConnection: The connection used to read from the SQLite database, only from the event loop
+    :vartype readConnection: sqlite3.Connection
+    :var connectionLock: Lock guarding pendingRecords and pendingRemovals, which are shared with the saving thread.
+                            This is never held while waiting on the database.
+    :vartype connectionLock: threading.Lock
+    """
+
+    def __init__(self, dbPath : str, cacheSize : int = 1000):
+        """
+        :param str dbPath: Path to the SQLite database file. This is created if it does not exist.
+        :param int cacheSize: The maximum number of users to hold in the LRU cache (Default 1000)
+        """
+        super().__init__()
+        self.users = OrderedDict()
+        self.dbPath = dbPath
+        self.cacheSize = cacheSize
+        self.hydratedUsers = weakref.WeakValueDictionary()
+        self.pinnedUsers = {}
+        self.pendingRecords = {}
+        self.pendingRemovals = set()
+
+        self.connection = sqlite3.connect(dbPath, check_same_thread=False)
+        self.writeLock = threading.Lock()
+        self.connectionLock = threading.Lock()
+        with self.writeLock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+            self.connection.commit()
+        self.readConnection = sqlite3.connect(dbPath, check_same_thread=False)
+
+
+    def cacheUser(self, user : bbUser.bbUser):
+        """Mark the given user as the most recently used, evicting the least recently used users if the cache is full.
+        Evicted users are only dropped from memory if they are not pinned or referenced elsewhere.
+
+        :param bbUser user: The user to cache
+        """
+        self.users[user.id] = user
+        self.users.move_to_end(user.id)
+        while len(self.users) > self.cacheSize:
+            self.users.popitem(last=False)
+
+
+    def hydrateUser(self, id : int) -> bbUser.bbUser:
+        """Get the bbUser object for the given ID, constructing it from its stored record if it is not already in memory.
+
+        :param int id: integer discord ID for the user to fetch
+        :raise KeyError: If no user is stored with the given ID
+        :return: The bbUser with the given ID
+        :rtype: bbUser
+        """
+        if id in self.removedIDs or id in self.pendingRemovals:
+            raise KeyError("user not found: " + str(id))
+        user = self.hydratedUsers.get(id)
+        if user is None:
+            # Records waiting to be written are newer than those in the database.
+            # Pending records are only cleared once they have been committed, so a record missing here is already in the database.
+            with self.connectionLock:
+                userDict = self.pendingRecords.get(id)
+            if userDict is None:
+                row = self.readConnection.execute("SELECT data FROM users WHERE id = ?", (id,)).fetchone()
+                if row is None:
+                    raise KeyError("user not found: " + str(id))
+                userDict = json.loads(row[0])
+            user = bbUser.bbUser.fromDict(userDict, id=id)
+            self.hydratedUsers[id] = user
+        self.cacheUser(user)
+        return user
+
+
+    def userIDExists(self, id : int) -> bool:
+        """Check if a user is stored in the database with the given ID.
+
+        :param int id: integer discord ID for the bbUser to search for
+        :return: True if id corresponds to a user in the database, false if no user is found with the id
+        :rtype: bool
+        """
+        if id in self.removedIDs or id in self.pendingRemovals:
+            return False
+        if id in self.hydratedUsers:
+            return True
+        with self.connectionLock:
+            if id in self.pendingRecords:
+                return True
+        return self.readConnection.execute("SELECT 1 FROM users WHERE id = ?", (id,)).fetchone() is not None
+
+
+    def reinitUser(self, id : int):
+        """Reset the stats for the user with the specified ID.
+
+        :param int ID: The ID of the user to reset. Can be integer or a string of digits.
+        :raise KeyError: If no user is found with the requested ID
+        """
+        self.getUser(id).resetUser()
+
+
+    def addUser(self, id : int) -> bbUser.bbUser:
+        """
+        Create a new bbUser object with the specified ID and add it to the database
+
+        :param int id: integer discord ID for the user to add
+        :raise KeyError: If a bbUser already exists in the database with the specified ID
+        :return: the newly created bbUser
+        :rtype: bbUser
+        """
+        id = self.validateID(id)
+        newUser = bbUser.bbUser.fromDict(bbUser.defaultUserDict, id=id)
+        self.addUserObj(newUser)
+        return newUser
+
+
+    def addUserObj(self, userObj : bbUser.bbUser):
+        """Store the given bbUser object in the database
+
+        :param bbUser userObj: bbUser to store
+        :raise KeyError: If a bbUser already exists in the database with the same ID as the given bbUser
+        """
+        if self.userIDExists(userObj.id):
+            raise KeyError("Attempted to add a user that is already in this bbUserDB: " + str(userObj))
+        self.removedIDs.discard(userObj.id)
+        self.pendingRemovals.discard(userObj.id)
+        self.hydratedUsers[userObj.id] = userObj
+        self.cacheUser(userObj)
+        self.markDirty(userObj.id)
+
+
+    def removeUser(self, id : int):
+        """Remove the new bbUser object with the specified ID from the database
+        The user's record is deleted from the SQLite database on the next save.
+
+        :param int id: integer discord ID for the user to remove
+        :raise KeyError: If no bbUser exists in the database with the specified ID
+        """
+        id = self.validateID(id)
+        if not self.userIDExists(id):
+            raise KeyError("user not found: " + str(id))
+        self.users.pop(id, None)
+        self.pinnedUsers.pop(id, None)
+        self.hydratedUsers.pop(id, None)
+        self.dirtyIDs.discard(id)
+        self.removedIDs.add(id)
+        self.unjournaledIDs.add(id)
+
+
+    def getUser(self, id : int) -> bbUser.bbUser:
+        """Fetch the bbUser from the database with the given ID, loading it from the SQLite database if necessary.
+        Commands may modify bbUsers directly after fetching them, so the user is marked as accessed.
+
+        :param int ID: integer discord ID for the user to fetch
+        :raise KeyError: If no user is stored with the given ID
+        :return: the stored bbUser with the given ID
+        :rtype: bbUser
+        """
+        id = self.validateID(id)
+        user = self.hydrateUser(id)
+        self.markAccessed(id)
+        return user
+
+
+    def markAccessed(self, id : int):
+        """Mark the user with the given ID as possibly changed, so that it is compared against its last saved state on the next save.
+        The user is pinned in memory until then.
+
+        :param int id: integer discord ID for the user which may have changed
+        """
+        super().markAccessed(id)
+        if id not in self.pinnedUsers:
+            try:
+                self.pinnedUsers[id] = self.hydrateUser(id)
+            except KeyError:
+                pass
+
+
+    def markAllDirty(self):
+        """Mark every user currently in memory as changed.
+        Users which are not in memory are already up to date in the SQLite database, so there is no need to rewrite them.
+        """
+        for id in list(self.hydratedUsers.keys()):
+            self.markDirty(id)
+
+
+    def getUsers(self) -> List[bbUser.bbUser]:
+        """Get a list of all bbUser objects stored in the database.
+        ⚠ This loads every user into memory, at least for as long as the returned list is held.
+
+        :return: list containing all bbUser objects in the db
+        :rtype: list[bbUser]
+        """
+        users = []
+        for id in self.getIds():
+            try:
+                user = self.hydratedUsers.get(id)
+                if user is None:
+                    user = self.hydrateUser(id)
+                users.append(user)
+            except KeyError:
+                pass
+        return users
+
+
+    def getIds(self) -> List[int]:
+        """Get a list of all user IDs stored in the database
+
+        :return: list containing all int discord IDs for which bbUsers are stored in the database
+        :rtype: list[int]
+        """
+        # Pending records are read before the database, as they are only cleared once they have been committed
+        with self.connectionLock:
+            ids = set(self.pendingRecords.keys())
+            pendingRemovals = set(self.pendingRemovals)
+        ids.update(row[0] for row in self.readConnection.execute("SELECT id FROM users"))
+        ids.update(self.hydratedUsers.keys())
+        ids.difference_update(self.removedIDs)
+        ids.difference_update(pendingRemovals)
+        return list(ids)
+
+
+    def toDict(self, **kwargs) -> dict:
+        """Serialise every user in this database into dictionary format.
+        ⚠ This loads every user into memory.
+
+        :return: A dictionary containing all data needed to recreate this bbUserDB
+        :rtype: dict
+        """
+        data = {}
+        for user in self.getUsers():
+            try:
+                data[str(user.id)] = user.toDict(**kwargs)
+            except Exception as e:
+                bbLogger.log("UserDB", "toDict", "Error serialising bbUser: " + e.__class__.__name__, trace=traceback.format_exc(), eventType="USERERR")
+        return data
+
+
+    def dirtyRecordsToDict(self, **kwargs) -> dict:
+        """Serialise only the users which have changed since the last save, and clear the set of dirty users.
+        The serialised users are held as pending records until they are committed by writeRecords, and are unpinned from memory.
+
+        :return: A dictionary mapping string user IDs to the serialised representations of the changed bbUsers
+        :rtype: dict
+        """
+        data = {}
+        for id in self.dirtyIDs:
+            if id not in self.pinnedUsers:
+                continue
+            try:
+                data[str(id)] = self.pinnedUsers[id].toDict(**kwargs)
+            except Exception as e:
+                bbLogger.log("UserDB", "dirtyRecordsToDict", "Error serialising bbUser: " + e.__class__.__name__, trace=traceback.format_exc(), eventType="USERERR")
+        with self.connectionLock:
+            for id in data:
+                self.pendingRecords[int(id)] = data[id]
+        self.dirtyIDs.clear()
+        self.pinnedUsers.clear()
+        return data
+
+
+    def unjournaledRecordsToDict(self, **kwargs) -> dict:
+        """Serialise all users which have changed or been removed since they were last journaled, and clear the set of unjournaled users.
+        Removed users are represented by None.
+
+        :return: A dictionary mapping string user IDs to the serialised representations of the changed bbUsers, or None for removed users
+        :rtype: dict
+        """
+        data = {}
+        for id in self.unjournaledIDs:
+            user = self.pinnedUsers.get(id, self.hydratedUsers.get(id))
+            try:
+                if user is not None:
+                    data[str(id)] = user.toDict(**kwargs)
+                elif not self.userIDExists(id):
+                    data[str(id)] = None
+            except Exception as e:
+                bbLogger.log("UserDB", "unjournaledRecordsToDict", "Error serialising bbUser: " + e.__class__.__name__, trace=traceback.format_exc(), eventType="USERERR")
+        self.unjournaledIDs.clear()
+        return data
+
+
+    def popRemovedIDs(self) -> List[str]:
+        """Get the IDs of all users removed since the last save, and clear the set of removed users.
+        The IDs are held as pending removals until they are committed by writeRecords.
+
+        :return: A list of string user IDs whose saved records should be deleted
+        :rtype: list[str]
+        """
+        self.pendingRemovals.update(self.removedIDs)
+        return super().popRemovedIDs()
+
+
+    def writeRecords(self, records : Dict[str, dict], removedKeys : List[str]) -> Tuple[float, float]:
+        """Write the given serialised users to the SQLite database, and delete the users with the given IDs, in a single transaction.
+        This is safe to call from a thread other than the event loop's, and is the SQLite counterpart to lib.jsonHandler.writeJSONRecords.
+        Users whose serialised state is unchanged since they were last written, according to savedDigests, are not rewritten.
+
+        :param dict records: A dictionary mapping string user IDs to serialised users, as returned by dirtyRecordsToDict
+        :param list[str] removedKeys: The string IDs of users to delete, as returned by popRemovedIDs
+        :return: The time taken in seconds to serialise the records to JSON, and the time taken in seconds to commit the transaction
+        :rtype: tuple[float, float]
+        """
+        serialiseStart = time.perf_counter()
+        rows = []
+        for id in records:
+            data = json.dumps(records[id])
+            digest = hash(data)
+            if self.savedDigests.get(id) != digest:
+                self.savedDigests[id] = digest
+                rows.append((int(id), data))
+        for id in removedKeys:
+            self.savedDigests.pop(id, None)
+        writeStart = time.perf_counter()
+        with self.writeLock:
+            with self.connection:
+                self.connection.executemany("INSERT OR REPLACE INTO users (id, data) VALUES (?, ?)", rows)
+                self.connection.executemany("DELETE FROM users WHERE id = ?", [(int(id),) for id in removedKeys])
+        # Pending records are cleared only after the commit, so that the event loop reads them from here until the database has them
+        with self.connectionLock:
+            # Only clear pending records which have not been replaced by a newer snapshot in the meantime
+            for id in records:
+                if self.pendingRecords.get(int(id)) is records[id]:
+                    del self.pendingRecords[int(id)]
+            for id in removedKeys:
+                self.pendingRemovals.discard(int(id))
+        return writeStart - serialiseStart, time.perf_counter() - writeStart
+
+
+    def importRecords(self, records : Dict[str, dict], removedKeys : List[str] = None):
+        """Write the given serialised users straight into the SQLite database, without constructing any bbUser objects.
+        Used for migrating from a JSON users database, and for replaying the journal on startup.
+
+        :param dict records: A dictionary mapping string user IDs to serialised users
+        :param list[str] removedKeys: The string IDs of users to delete, or None to delete no users (Default None)
+        """
+        with self.writeLock:
+            with self.connection:
+                self.connection.executemany("INSERT OR REPLACE INTO users (id, data) VALUES (?, ?)",
+                                            [(int(id), json.dumps(records[id])) for id in records])
+                self.connection.executemany("DELETE FROM users WHERE id = ?", [(int(id),) for id in removedKeys or []])
+
+
+    def numStoredUsers(self) -> int:
+        """Get the number of users stored in the SQLite database file, not including unsaved changes.
+
+        :return: The number of rows in the users table
+        :rtype: int
+        """
+        return self.readConnection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+    def __str__(self) -> str:
+        """Get summarising information about this bbUserDB in string format.
+
+        :return: A string containing summarising info about this db
+        :rtype: str
+        """
+        return "<bbUserSQLiteDB: " + str(self.numStoredUsers()) + " users, " + str(len(self.hydratedUsers)) + " loaded>"
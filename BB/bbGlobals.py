@@ -7,6 +7,9 @@ botLoggedIn = False
 usersDB = None
 guildsDB = None
 
+# Write-ahead log of changes to usersDB and guildsDB
+journal = None
+
 
 # Timed tasks
 newBountiesTTDB = None
@@ -16,6 +19,9 @@ dbSaveTT = None
 
 duelRequestTTDB = None
 
+# Drives all of the above when using the "dynamic" timedTaskCheckingType
+taskScheduler = None
+
 
 # Reaction Menus
 reactionMenusDB = None
@@ -1,3 +1,4 @@
+from __future__ import annotations
 from ... import lib, bbGlobals
 from ...bbConfig import bbConfig
 from discord import Embed, User, Message
@@ -62,6 +63,37 @@ class DuelRequest:
         self.menus = []
 
 
+    def toDict(self, **kwargs) -> dict:
+        """Serialize this duel request into dictionary format, to be saved to file.
+        The challenge menus are not included, as they cannot be saved.
+
+        :return: A dictionary containing the IDs of the users and guild involved in this challenge, the stakes, and the timeout task's schedule
+        :rtype: dict
+        """
+        return {"source": self.sourceBBUser.id, "target": self.targetBBUser.id, "stakes": self.stakes, "guild": self.sourceBBGuild.id,
+                "timeout": self.duelTimeoutTask.toDict(**kwargs)}
+
+
+    @classmethod
+    def fromDict(cls, duelReqDict : dict, **kwargs) -> DuelRequest:
+        """Reconstruct a DuelRequest from its dictionary-serialized representation - the opposite of DuelRequest.toDict
+        The users and guild are fetched from bbGlobals.usersDB and bbGlobals.guildsDB. The new request's timeout task expires it with expireAndAnnounceDuelReq,
+        but is not scheduled, and the request is not added to the source user.
+
+        :param dict duelReqDict: A dictionary containing all information needed to reconstruct the duel request, as given by toDict
+        :param str catchUpPolicy: How to handle a timeout which has already passed, from TimedTask.CATCH_UP_POLICIES (Default "fire")
+        :param float catchUpSpreadSeconds: The length in seconds of the period to spread overdue timeouts over, with the "spread" policy (Default 0)
+        :return: A new DuelRequest as described by duelReqDict
+        :rtype: DuelRequest
+        :raise KeyError: When the source user, target user or guild of the duel request no longer exists
+        """
+        newDuelReq = DuelRequest(bbGlobals.usersDB.getUser(duelReqDict["source"]), bbGlobals.usersDB.getUser(duelReqDict["target"]),
+                                    duelReqDict["stakes"], None, bbGlobals.guildsDB.getGuild(duelReqDict["guild"]))
+        newDuelReq.duelTimeoutTask = TimedTask.TimedTask.fromDict(duelReqDict["timeout"], expiryFunction=expireAndAnnounceDuelReq,
+                                                                    expiryFunctionArgs={"duelReq": newDuelReq}, **kwargs)
+        return newDuelReq
+
+
 # ⚠⚠⚠ THIS FUNCTION IS MARKED FOR CHANGE
 def fightShips(ship1 : bbShip.bbShip, ship2 : bbShip.bbShip, variancePercent : float) -> dict:
     """Simulate a duel between two ships.
@@ -430,6 +430,8 @@ class bbGuild(bbSerializable.bbSerializable):
             newBounty = bbBounty.Bounty(bountyDB=self.bountiesDB)
             # activate and announce the bounty
             self.bountiesDB.addBounty(newBounty)
+            # This is called from a TimedTask rather than a command, so the guild must be marked for saving manually
+            bbGlobals.guildsDB.markDirty(self.id)
             await self.announceNewBounty(newBounty)
 
 
@@ -575,7 +577,7 @@ class bbGuild(bbSerializable.bbSerializable):
         """
         data = {"announceChannel":self.announceChannel.id if self.hasAnnounceChannel() else -1,
                     "playChannel":self.playChannel.id if self.hasPlayChannel() else -1, 
-                    "alertRoles": self.alertRoles,
+                    "alertRoles": dict(self.alertRoles),
                     "ownedRoleMenus": self.ownedRoleMenus,
                     "bountiesDisabled": self.bountiesDisabled,
                     "shopDisabled": self.shopDisabled
@@ -76,10 +76,12 @@ class bbInventoryListing(bbSerializable.bbSerializable):
     def toDict(self, **kwargs) -> dict:
         """Return a dictionary description of this inventory listing.
 
+        Catalog items are identified by name only, see bbItem.toCompactForm.
+
         :return: A dictionary identifying the object stored, and the amount
         :rtype: int
         """
-        return {"item": self.item.toDict(**kwargs), "count": self.count}
+        return {"item": self.item.toCompactForm(**kwargs), "count": self.count}
 
     
     @classmethod
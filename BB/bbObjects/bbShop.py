@@ -105,7 +105,7 @@ class bbShop(bbSerializable.bbSerializable):
         for i in range(self.maxShips):
             itemTL = bbConfig.pickRandomItemTL(self.currentTechLevel)
             if len(bbData.shipKeysByTL[itemTL - 1]) != 0:
-                self.shipsStock.addItem(bbShip.bbShip.fromDict(bbData.builtInShipData[random.choice(bbData.shipKeysByTL[itemTL - 1])]))
+                self.shipsStock.addItem(bbData.builtInShipObjs[random.choice(bbData.shipKeysByTL[itemTL - 1])].clone())
 
         for i in range(self.maxModules):
             itemTL = bbConfig.pickRandomItemTL(self.currentTechLevel)
@@ -29,6 +29,8 @@ class Bounty(bbSerializable.bbSerializable):
     :vartype checked: dict[str, int]
     :var answer: The name of the system where the criminal is located
     :vartype answer: str
+    :var answerRoutePos: The position of answer in route
+    :vartype answerRoutePos: int
     """
 
     def __init__(self, criminalObj : bbCriminal = None, config : bbBountyConfig = None, bountyDB : bbBountyDB.bbBountyDB = None, dbReload : bool = False):
@@ -74,6 +76,7 @@ class Bounty(bbSerializable.bbSerializable):
         self.reward = config.reward
         self.checked = config.checked
         self.answer = config.answer
+        self.answerRoutePos = self.route.index(self.answer)
 
         
     # return 0 => system not in route
@@ -139,7 +142,7 @@ class Bounty(bbSerializable.bbSerializable):
         :return: A dictionary representation of this bounty.
         :rtype: dict
         """
-        return {"faction": self.faction, "route": self.route, "answer": self.answer, "checked": self.checked, "reward": self.reward, "issueTime": self.issueTime, "endTime": self.endTime, "criminal": self.criminal.toDict(**kwargs)}
+        return {"faction": self.faction, "route": list(self.route), "answer": self.answer, "checked": dict(self.checked), "reward": self.reward, "issueTime": self.issueTime, "endTime": self.endTime, "criminal": self.criminal.toDict(**kwargs)}
 
 
     @classmethod
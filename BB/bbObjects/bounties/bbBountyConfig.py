@@ -123,7 +123,7 @@ class BountyConfig:
         :param bool forceKeepChecked: If this is False, a blank checked dictionary will be used. This should only be set to be True when using a pre-made checked dictionary; e.g for custom bounties or for bounties loaded from file. (Default False)
         :param bool forceNoDBCheck: If this is False, do not check if the bounty already exists. This should only be used as a performance and compatibility measure when loading in a bounty from file. (Default False)
         :raise ValueError: When requesting an invalid faction, or when requesting an invalid reward amount
-        :raise IndexError: When no space is available for a new bounty
+        :raise IndexError: When no space is available for a new bounty, or when all of the faction's criminal names are in use
         :raise KeyError: When the requested criminal name already exists in a bounty, or when requesting an unknown system name
         """
         doDBCheck = not forceNoDBCheck
@@ -144,9 +144,10 @@ class BountyConfig:
 
                 if self.name == "":
                     self.builtIn = True
-                    self.name = random.choice(bbData.bountyNames[self.faction])
-                    while doDBCheck and bountyDB.bountyNameExists(self.name):
-                        self.name = random.choice(bbData.bountyNames[self.faction])
+                    freeNames = bountyDB.getFreeBountyNames(self.faction, bbData.bountyNames[self.faction]) if doDBCheck else bbData.bountyNames[self.faction]
+                    if not freeNames:
+                        raise IndexError("BOUCONF_CONS_NONAMES: Attempted to generate new bounty config when all criminal names are in use for faction: '" + self.faction + "'")
+                    self.name = random.choice(freeNames)
                 else:
                     if doDBCheck and bountyDB.bountyNameExists(self.name):
                         raise KeyError("BountyConfig: attempted to create config for pre-existing bounty: " + self.name)
@@ -160,19 +161,18 @@ class BountyConfig:
         
         if self.route == []:
             if self.start == "":
-                self.start = random.choice(list(bbData.builtInSystemObjs.keys()))
-                while self.start == self.end or not bbData.builtInSystemObjs[self.start].hasJumpGate():
-                    self.start = random.choice(list(bbData.builtInSystemObjs.keys()))
+                self.start = random.choice(bbData.starMap.jumpGateSystems)
+                while self.start == self.end:
+                    self.start = random.choice(bbData.starMap.jumpGateSystems)
             elif self.start not in bbData.builtInSystemObjs:
                 raise KeyError("BountyConfig: Invalid start system requested '" + self.start + "'")
             if self.end == "":
-                self.end = random.choice(list(bbData.builtInSystemObjs.keys()))
-                while self.start == self.end or not bbData.builtInSystemObjs[self.end].hasJumpGate():
-                    self.end = random.choice(list(bbData.builtInSystemObjs.keys()))
+                self.end = random.choice(bbData.starMap.jumpGateSystems)
+                while self.start == self.end:
+                    self.end = random.choice(bbData.starMap.jumpGateSystems)
             elif self.end not in bbData.builtInSystemObjs:
                 raise KeyError("BountyConfig: Invalid end system requested '" + self.end + "'")
-            # self.route = makeRoute(self.start, self.end)
-            self.route = lib.pathfinding.bbAStar(self.start, self.end, bbData.builtInSystemObjs)
+            self.route = lib.pathfinding.makeRoute(self.start, self.end)
         else:
             for system in self.route:
                 if system not in bbData.builtInSystemObjs:
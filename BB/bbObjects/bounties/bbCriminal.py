@@ -138,7 +138,7 @@ class Criminal (bbAliasable.Aliasable):
         if self.builtIn:
             return {"builtIn":True, "name":self.name}
         else:
-            return {"builtIn":False, "isPlayer": self.isPlayer, "name":self.name, "icon":self.icon, "faction":self.faction, "aliases":self.aliases, "wiki":self.wiki}
+            return {"builtIn":False, "isPlayer": self.isPlayer, "name":self.name, "icon":self.icon, "faction":self.faction, "aliases":list(self.aliases), "wiki":self.wiki}
 
 
     @classmethod
@@ -26,7 +26,7 @@ def makeBountyEmbed(bounty : bbBounty.Bounty) -> Embed:
     for system in bounty.route:
         if bounty.systemChecked(system):
             routeStr += "~~"
-            if 0 < bounty.route.index(bounty.answer) - bounty.route.index(system) < bbConfig.closeBountyThreshold:
+            if 0 < bounty.answerRoutePos - bounty.route.index(system) < bbConfig.closeBountyThreshold:
                 routeStr += "**" + system + "**"
             else:
                 routeStr += system
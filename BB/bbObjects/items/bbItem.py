@@ -1,6 +1,6 @@
 # Typing imports
 from __future__ import annotations
-from typing import List, Type
+from typing import List, Type, Union
 
 from ...baseClasses import bbAliasable
 from abc import abstractmethod
@@ -109,6 +109,28 @@ class bbItem(bbAliasable.Aliasable):
         return self.value
 
 
+    def isCatalogItem(self) -> bool:
+        """Decide whether this item is identical to the builtIn item of the same name, and so can be saved as just its name.
+
+        :return: True if this item is builtIn, False otherwise
+        :rtype: bool
+        """
+        return self.builtIn
+
+
+    def toCompactForm(self, **kwargs) -> Union[str, dict]:
+        """Serialize this item into the most compact format that can be loaded by the item's fromDict.
+        Catalog items (see isCatalogItem) are saved as only their name, which is their key in the relevant bbData.builtIn*Objs dictionary.
+        All other items are saved with toDict.
+
+        :return: This item's name if it is a catalog item, or a dictionary containing all information needed to reconstruct this item otherwise
+        :rtype: str or dict
+        """
+        if self.isCatalogItem():
+            return self.name
+        return self.toDict(**kwargs)
+
+
     @abstractmethod
     def toDict(self, **kwargs) -> dict:
         """Serialize this item into dictionary format, for saving to file.
@@ -54,10 +54,14 @@ def fromDict(moduleDict):
     If implemented correctly, this should act as the opposite to the original object's toDict method.
     If the requested module is builtIn, return the builtIn module object of the same name.
 
-    :param dict moduleDict: A dictionary containg all information necessary to create the desired bbModule object
+    :param moduleDict: A dictionary containg all information necessary to create the desired bbModule object, or the name of a builtIn module
+    :type moduleDict: dict or str
     :return: The bbModule object described in moduleDict
     :rtype: bbModule
     """
+    # Catalog modules are saved as only their name
+    if type(moduleDict) == str:
+        return bbData.builtInModuleObjs[moduleDict]
     if "builtIn" in moduleDict and moduleDict["builtIn"]:
         return bbData.builtInModuleObjs[moduleDict["name"]]
     else:
@@ -42,8 +42,12 @@ class bbShip(bbItem):
     :vartype upgradesApplied: list[bbShipUpgrade]
     :var skin: The name of the skin applied to this ship
     :vartype skin: str
+    :var frozen: Whether this ship is a shared prototype which may not be modified, such as those in bbData.builtInShipObjs. Frozen ships should be cloned before being given to a user.
+    :vartype frozen: bool
     """
 
+    frozen = False
+
     def __init__(self, name : str, maxPrimaries : int, maxTurrets : int,
                     maxModules : int, manufacturer : str = "", armour : int = 0,
                     cargo : int = 0, numSecondaries : int = 0, handling : int = 0,
@@ -118,6 +122,44 @@ class bbShip(bbItem):
         self.isSkinned = skin != ""
 
 
+    def __setattr__(self, name : str, value):
+        """Set an attribute of this ship, unless it is frozen.
+
+        :param str name: The name of the attribute to set
+        :param value: The new value for the attribute
+        :raise AttributeError: If this ship is frozen
+        """
+        if self.frozen:
+            raise AttributeError("Attempted to modify frozen ship '" + self.name + "'. Clone the ship first.")
+        super(bbShip, self).__setattr__(name, value)
+
+
+    def freeze(self):
+        """Prevent this ship from being modified, so that it can be safely shared as a prototype.
+        Attempting to set any of the ship's attributes, or to equip or unequip any items, will raise an AttributeError.
+        """
+        self.weapons = tuple(self.weapons)
+        self.modules = tuple(self.modules)
+        self.turrets = tuple(self.turrets)
+        self.upgradesApplied = tuple(self.upgradesApplied)
+        self.frozen = True
+
+
+    def clone(self) -> bbShip:
+        """Create a new, unfrozen ship identical to this one. Much cheaper than reconstructing the ship with toDict and fromDict.
+        The new ship shares this ship's equipped item objects, but not the lists containing them,
+        so items can be equipped and unequipped on either ship without affecting the other.
+
+        :return: A new bbShip with the same attributes and equipped items as this one
+        :rtype: bbShip
+        """
+        return bbShip(self.name, self.maxPrimaries, self.maxTurrets, self.maxModules, manufacturer=self.manufacturer, armour=self.armour,
+                        cargo=self.cargo, numSecondaries=self.numSecondaries, handling=self.handling, value=self.value,
+                        aliases=list(self.aliases), weapons=list(self.weapons), modules=list(self.modules), turrets=list(self.turrets),
+                        wiki=self.wiki, upgradesApplied=list(self.upgradesApplied), nickname=self.nickname, icon=self.icon, emoji=self.emoji,
+                        techLevel=self.techLevel, shopSpawnRate=self.shopSpawnRate, builtIn=self.builtIn, skin=self.skin)
+
+
     def getNumWeaponsEquipped(self) -> int:
         """Fetch the number of weapons this ship currently has equipped
 
@@ -730,6 +772,16 @@ class bbShip(bbItem):
         return bbShip
 
 
+    def isCatalogItem(self) -> bool:
+        """Decide whether this ship is identical to a freshly spawned builtIn ship of the same name, and so can be saved as just its name.
+        Unlike other builtIn items, ships are not shared between users, so this is only the case if nothing is equipped and the ship has no upgrades, nickname or skin.
+
+        :return: True if this ship is builtIn and unmodified, False otherwise
+        :rtype: bool
+        """
+        return self.builtIn and not (self.weapons or self.modules or self.turrets or self.upgradesApplied or self.hasNickname or self.isSkinned)
+
+
     def toDict(self, **kwargs) -> dict:
         """Serialize this bbShip into dictionary format, for saving to file. Includes all equiped items and upgrades
 
@@ -741,19 +793,19 @@ class bbShip(bbItem):
 
         weaponsList = []
         for weapon in self.weapons:
-            weaponsList.append(weapon.toDict(**kwargs))
+            weaponsList.append(weapon.toCompactForm(**kwargs))
         
         modulesList = []
         for module in self.modules:
-            modulesList.append(module.toDict(**kwargs))
+            modulesList.append(module.toCompactForm(**kwargs))
 
         turretsList = []
         for turret in self.turrets:
-            turretsList.append(turret.toDict(**kwargs))
+            turretsList.append(turret.toCompactForm(**kwargs))
         
         upgradesList = []
         for upgrade in self.upgradesApplied:
-            upgradesList.append(upgrade.toDict(**kwargs))
+            upgradesList.append(upgrade.name if upgrade.builtIn else upgrade.toDict(**kwargs))
 
         itemDict["weapons"] = weaponsList
         itemDict["modules"] = modulesList
@@ -790,10 +842,15 @@ class bbShip(bbItem):
         """Factory function constructing a new bbShip object from the given dictionary representation - the opposite of bbShip.toDict
         As with most other item fromDict functions, all missing information for builtIn ships is replaced by data from the corresponding bbData entry.
 
-        :param dict shipDict: A dictionary containing all information required to construct the requested ship
+        :param shipDict: A dictionary containing all information required to construct the requested ship, or the name of a builtIn ship
+        :type shipDict: dict or str
         :return: A new bbShip object as described in shipDict
         :rtype: bbShip
         """
+        # Catalog ships are saved as only their name
+        if type(shipDict) == str:
+            shipDict = {"name": shipDict, "builtIn": True}
+
         weapons = []
         if "weapons" in shipDict:
             for weapon in shipDict["weapons"]:
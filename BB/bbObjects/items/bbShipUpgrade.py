@@ -254,6 +254,9 @@ class bbShipUpgrade(bbSerializable.bbSerializable):
         :return: A bbShipUpgrade object as described by upgradeDict
         :rtype: bbShipUpgrade
         """
+        # builtIn upgrades may be saved as only their name
+        if type(upgradeDict) == str:
+            return bbData.builtInUpgradeObjs[upgradeDict]
         if upgradeDict["builtIn"]:
             return bbData.builtInUpgradeObjs[upgradeDict["name"]]
         else:
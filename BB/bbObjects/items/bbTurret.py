@@ -69,10 +69,14 @@ class bbTurret(bbItem):
     def fromDict(cls, turretDict : dict, **kwargs) -> bbTurret:
         """Factory function constructing a new bbTurret object from a dictionary serialised representation - the opposite of bbTurret.toDict.
         
-        :param dict turretDict: A dictionary containing all information needed to construct the desired bbTurret
+        :param turretDict: A dictionary containing all information needed to construct the desired bbTurret, or the name of a builtIn turret
+        :type turretDict: dict or str
         :return: A new bbTurret object as described in turretDict
         :rtype: bbTurret
         """
+        # Catalog turrets are saved as only their name
+        if type(turretDict) == str:
+            return bbData.builtInTurretObjs[turretDict]
         if turretDict["builtIn"]:
             return bbData.builtInTurretObjs[turretDict["name"]]
         else:
@@ -68,10 +68,14 @@ class bbWeapon(bbItem):
     def fromDict(cls, weaponDict, **kwargs):
         """Factory function constructing a new bbWeapon object from a dictionary serialised representation - the opposite of bbWeapon.toDict.
         
-        :param dict weaponDict: A dictionary containing all information needed to construct the desired bbWeapon
+        :param weaponDict: A dictionary containing all information needed to construct the desired bbWeapon, or the name of a builtIn weapon
+        :type weaponDict: dict or str
         :return: A new bbWeapon object as described in weaponDict
         :rtype: bbWeapon
         """
+        # Catalog weapons are saved as only their name
+        if type(weaponDict) == str:
+            return bbData.builtInWeaponObjs[weaponDict]
         if weaponDict["builtIn"]:
             return bbData.builtInWeaponObjs[weaponDict["name"]]
         else:
@@ -1,6 +1,7 @@
 from .. import bbItem
 from abc import abstractmethod
 from .... import lib
+from ....bbConfig import bbData
 from discord import Message
 from typing import List
 
@@ -66,6 +67,16 @@ class bbToolItem(bbItem.bbItem):
         return bbItem
 
     
+    def isCatalogItem(self) -> bool:
+        """Decide whether this tool is the builtIn tool of the same name, and so can be saved as just its name.
+        Unlike other item types, builtIn tools are not guaranteed to be stored in bbData.builtInToolObjs under their own name, so this is checked.
+
+        :return: True if this tool is the object stored under its name in bbData.builtInToolObjs, False otherwise
+        :rtype: bool
+        """
+        return self.builtIn and self.name in bbData.builtInToolObjs and bbData.builtInToolObjs[self.name] is self
+
+
     @abstractmethod
     def toDict(self, **kwargs) -> dict:
         """Serialize this tool into dictionary format.
@@ -1,17 +1,22 @@
 from . import bbToolItem, bbShipSkinTool, bbCrate
 from .. import bbShip, bbWeapon, bbModuleFactory, bbTurret
 from .... import lib
+from ....bbConfig import bbData
 
 
 def fromDict(toolDict : dict) -> bbToolItem.bbToolItem:
     """Construct a bbToolItem from its dictionary-serialized representation.
     This method decodes which tool constructor is appropriate based on the 'type' attribute of the given dictionary.
 
-    :param dict toolDict: A dictionary containing all information needed to construct the required bbToolItem. Critically, a name, type, and builtIn specifier.
+    :param toolDict: A dictionary containing all information needed to construct the required bbToolItem. Critically, a name, type, and builtIn specifier. Alternatively, the name of a builtIn tool.
+    :type toolDict: dict or str
     :return: A new bbToolItem object as described in toolDict
     :rtype: bbToolItem.bbToolItem
     :raise NameError: When toolDict does not contain a 'type' attribute.
     """
+    # Catalog tools are saved as only their name
+    if type(toolDict) == str:
+        return bbData.builtInToolObjs[toolDict]
 
     itemConstructors = {"bbShip": bbShip.bbShip.fromDict,
                     "bbWeapon": bbWeapon.bbWeapon.fromDict,
@@ -5,21 +5,32 @@ from discord.ext.commands import Bot as ClientBaseClass
 
 # Utility Imports
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import List
 import asyncio
+from collections import deque
 import traceback
 import os
+import time
+import functools
+import sys
+# resource is only available on unix platforms, and is used to report peak memory usage after loading the databases
+try:
+    import resource
+except ImportError:
+    resource = None
 
 # BountyBot Imports
 
 from .bbConfig import bbConfig, bbData, bbPRIVATE
-from .bbObjects import bbShipSkin
+from .bbObjects import bbGuild, bbShipSkin
 from .bbObjects.bounties import bbCriminal, bbSystem
-from .bbObjects.items import bbModuleFactory, bbShipUpgrade, bbTurret, bbWeapon
+from .bbObjects.battles import DuelRequest
+from .bbObjects.items import bbModuleFactory, bbShip, bbShipUpgrade, bbTurret, bbWeapon
 from .bbObjects.items.tools import bbShipSkinTool, bbToolItemFactory
 from .scheduling import TimedTask
-from .bbDatabases import bbGuildDB, bbUserDB, HeirarchicalCommandsDB, reactionMenuDB
-from .scheduling import TimedTaskHeap
+from .bbDatabases import bbGuildDB, bbUserDB, bbUserSQLiteDB, HeirarchicalCommandsDB, reactionMenuDB, bbJournal
+from .scheduling import TimedTaskHeap, TimedTaskScheduler, TimedTaskWheel
 from . import lib, bbGlobals
 from .logging import bbLogger
 
@@ -33,23 +44,99 @@ class bbClient(ClientBaseClass):
     
     :var bb_loggedIn: Tracks whether or not the bot is currently logged in
     :type bb_loggedIn: bool
+    :var bb_saveLock: Prevents database saves from overlapping, so that older snapshots can never overwrite newer ones
+    :type bb_saveLock: asyncio.Lock
+    :var bb_journalLock: Prevents journal flushes from overlapping with each other and with journal rotation
+    :type bb_journalLock: asyncio.Lock
+    :var bb_lastSaveTimes: The time taken in seconds by each phase of the most recent save, for each database
+    :type bb_lastSaveTimes: dict[str, dict[str, float]]
     """
     def __init__(self):
         super().__init__(command_prefix="‎")
         self.bb_loggedIn = False
+        self.bb_saveLock = asyncio.Lock()
+        self.bb_journalLock = asyncio.Lock()
+        self.bb_lastSaveTimes = {}
 
     
-    def bb_saveAllDBs(self):
+    async def bb_saveAllDBs(self):
         """Save all of the bot's savedata to file.
         This currently saves:
         - the users database
         - the bounties database
         - the guilds database
         - the reaction menus database
+        - the schedules of timed tasks
+
+        The users and guilds databases are saved incrementally. Only records which were accessed since the last save are serialised,
+        and of those, only records whose serialised state differs from when they were last saved are written.
+
+        Saving happens in two phases. First, each database is snapshotted into dictionaries on the event loop, so no other task can modify it part-way through.
+        The snapshots are then serialised to JSON and written to disk in the event loop's default executor, leaving the event loop free to handle other events.
+        The time taken by each phase for each database is stored in bb_lastSaveTimes.
+        Once all databases have been written, the journal segments covered by the save are discarded.
         """
-        lib.jsonHandler.saveDB(bbConfig.userDBPath, bbGlobals.usersDB)
-        lib.jsonHandler.saveDB(bbConfig.guildDBPath, bbGlobals.guildsDB)
-        lib.jsonHandler.saveDB(bbConfig.reactionMenusDBPath, bbGlobals.reactionMenusDB)
+        async with self.bb_saveLock:
+            saveTimes = {}
+            writeJobs = {}
+            # The record snapshots taken from each incrementally saved database, in case they need to be marked dirty again
+            snapshots = {}
+
+            snapshotCompression = bbConfig.dbSnapshotCompression if bbConfig.dbSaveFormat == "binary" else None
+
+            # Any changes made after the journal is rotated are not covered by this save, and so must be kept in the new journal segment
+            savedJournalSegment = await flushJournal(rotate=True)
+
+            # Snapshot phase. This blocks the event loop, and should be kept as short as possible
+            for dbName, recordsDir, db in (("users", bbConfig.userDBRecordsDir, bbGlobals.usersDB), ("guilds", bbConfig.guildDBRecordsDir, bbGlobals.guildsDB)):
+                snapshotStart = time.perf_counter()
+                records, removedKeys = db.dirtyRecordsToDict(), db.popRemovedIDs()
+                saveTimes[dbName] = {"snapshot": time.perf_counter() - snapshotStart, "records": len(records) + len(removedKeys)}
+                if isinstance(db, bbUserSQLiteDB.bbUserSQLiteDB):
+                    writeJobs[dbName] = functools.partial(db.writeRecords, records, removedKeys)
+                else:
+                    writeJobs[dbName] = functools.partial(lib.jsonHandler.writeJSONRecords, recordsDir, records, removedKeys=removedKeys, fsync=True,
+                                                                                snapshotCompression=snapshotCompression, savedDigests=db.savedDigests)
+                snapshots[dbName] = (db, records, removedKeys)
+
+            snapshotStart = time.perf_counter()
+            menusData = bbGlobals.reactionMenusDB.toDict()
+            saveTimes["reactionMenus"] = {"snapshot": time.perf_counter() - snapshotStart, "records": len(menusData)}
+            writeJobs["reactionMenus"] = functools.partial(lib.jsonHandler.writeDBFile, bbConfig.reactionMenusDBPath, menusData, fsync=True,
+                                                                snapshotCompression=snapshotCompression)
+
+            snapshotStart = time.perf_counter()
+            tasksData = scheduledTasksToDict()
+            saveTimes["timedTasks"] = {"snapshot": time.perf_counter() - snapshotStart, "records": len(tasksData["newBounties"]) + len(tasksData["duelRequests"])}
+            writeJobs["timedTasks"] = functools.partial(lib.jsonHandler.writeDBFile, bbConfig.timedTasksDBPath, tasksData, fsync=True,
+                                                            snapshotCompression=snapshotCompression)
+
+            # Serialise and write phase, run outside of the event loop
+            allSaved = True
+            for dbName in writeJobs:
+                try:
+                    saveTimes[dbName]["serialise"], saveTimes[dbName]["write"] = await asyncio.get_event_loop().run_in_executor(None, writeJobs[dbName])
+                except Exception as e:
+                    bbLogger.log("bbClient", "bb_saveAllDBs", "Error writing " + dbName + " database: " + e.__class__.__name__, trace=traceback.format_exc(), eventType="SAVE_ERR")
+                    allSaved = False
+                    # Make sure the unwritten records are retried on the next save
+                    if dbName in snapshots:
+                        db, records, removedKeys = snapshots[dbName]
+                        for id in records:
+                            if int(id) not in db.removedIDs:
+                                db.markDirty(int(id))
+                        db.removedIDs.update(int(id) for id in removedKeys if int(id) not in db.dirtyIDs)
+
+            # The journaled changes are now saved, and no longer need to be replayed on startup
+            if allSaved:
+                bbGlobals.journal.discardUpTo(savedJournalSegment)
+
+            self.bb_lastSaveTimes = saveTimes
+            timesStr = ", ".join(dbName + " (" + str(saveTimes[dbName]["records"]) + "): " + \
+                                    "/".join(str(round(saveTimes[dbName][phase] * 1000, 1)) if phase in saveTimes[dbName] else "-" for phase in ("snapshot", "serialise", "write")) \
+                                    for dbName in saveTimes)
+            bbLogger.log("bbClient", "bb_saveAllDBs", "Save times in ms (snapshot/serialise/write): " + timesStr, category="saves", eventType="SAVE_TIMES", noPrint=True)
+
         bbLogger.save()
         print(datetime.now().strftime("%H:%M:%S: Data saved!"))
 
@@ -59,6 +146,7 @@ class bbClient(ClientBaseClass):
 
         This currently:
         - expires all non-saveable reaction menus
+        - waits for running TimedTask expiry functions to finish
         - logs out of discord
         - saves all savedata to file
         """
@@ -67,8 +155,15 @@ class bbClient(ClientBaseClass):
             if not menu.saveable:
                 await menu.delete()
         self.bb_loggedIn = False
+        # Let the task checking loop in on_ready exit, rather than waiting for the next task to expire
+        if bbGlobals.taskScheduler is not None:
+            bbGlobals.taskScheduler.wakeEvent.set()
+        # Let expiry functions already running in the background finish before logging out
+        for taskHeap in (bbGlobals.newBountiesTTDB, bbGlobals.duelRequestTTDB, bbGlobals.reactionMenusTTDB):
+            if taskHeap is not None:
+                await taskHeap.waitForCallbacks()
         await self.logout()
-        self.bb_saveAllDBs()
+        await self.bb_saveAllDBs()
         print(datetime.now().strftime("%H:%M:%S: Data saved!"))
 
 
@@ -84,67 +179,333 @@ bbCommands = commands.loadCommands()
 
 CWD = os.getcwd()
 
+# Guilds waiting to be sent shop refresh announcements. All buckets share this queue, so that announcements are always rate limited together.
+shopAnnouncementQueue = deque()
+# The background task sending queued shop refresh announcements, kept referenced so that it is not garbage collected. None if it has never run.
+shopAnnouncementTask = None
+
+# The pending delayed journal flush scheduled by journalDirtyRecords, or None if no flush has been scheduled yet
+journalFlushTask = None
+
 
 
 ####### DATABASE FUNCTIONS #####
 
-def loadUsersDB(filePath : str) -> bbUserDB.bbUserDB:
-    """Build a bbUserDB from the specified JSON file.
+def streamSavedRecords(dbName : str, recordsDir : str, filePath : str):
+    """Stream the saved records of the named database, with any changes recorded in the journal since it was saved applied on top.
+    Records are read from the specified directory of per-record JSON files, parsed by bbConfig.dbLoadWorkers worker processes if it is more than 1.
+    If the directory does not exist, records are instead streamed from the specified single JSON file.
 
-    :param str filePath: path to the JSON file to load. Theoretically, this can be absolute or relative.
-    :return: a bbUserDB as described by the dictionary-serialized representation stored in the file located in filePath.
+    :param str dbName: The name of the database in the journal, e.g "users"
+    :param str recordsDir: path to the directory of records to load. Theoretically, this can be absolute or relative.
+    :param str filePath: path to the JSON file to load if recordsDir does not exist. Theoretically, this can be absolute or relative.
+    :return: An iterator over (string record ID, serialised record) pairs, whether or not the records were read from filePath, and the IDs of all records changed by the journal
+    :rtype: tuple[Iterator[tuple[str, dict]], bool, set[str]]
     """
-    return bbUserDB.bbUserDB.fromDict(lib.jsonHandler.readJSON(filePath))
+    # Journaled changes are few, so are collected up front. Saved records which they replace are skipped as they are streamed.
+    replayedRecords = {}
+    replayedIDs = bbGlobals.journal.replayOnto(dbName, replayedRecords)
+    if os.path.isdir(recordsDir):
+        savedRecords = lib.jsonHandler.iterJSONRecords(recordsDir, workers=bbConfig.dbLoadWorkers or os.cpu_count() or 1, chunkSize=bbConfig.dbLoadChunkSize)
+        migrating = False
+    else:
+        savedRecords = lib.jsonHandler.iterDBFileRecords(filePath)
+        migrating = True
 
+    def applyReplayedRecords():
+        for id, record in savedRecords:
+            if id not in replayedIDs:
+                yield id, record
+        yield from replayedRecords.items()
 
-def loadGuildsDB(filePath : str, dbReload : bool = False) -> bbGuildDB.bbGuildDB:
-    """Build a bbGuildDB from the specified JSON file.
+    return applyReplayedRecords(), migrating, replayedIDs
 
-    :param str filePath: path to the JSON file to load. Theoretically, this can be absolute or relative.
+
+def logLoadStats(dbName : str, numRecords : int, loadSeconds : float):
+    """Log the number of records loaded into the named database, the loading throughput, and the peak memory usage of the bot so far.
+    Peak memory usage is only reported on platforms which provide the resource module.
+
+    :param str dbName: The name of the database which was loaded, e.g "users"
+    :param int numRecords: The number of records loaded
+    :param float loadSeconds: The time taken in seconds to load the database
+    """
+    statsStr = "Loaded " + str(numRecords) + " " + dbName + " in " + str(round(loadSeconds, 2)) + "s (" + str(round(numRecords / max(loadSeconds, 0.001))) + " records/s)"
+    if resource is not None:
+        # ru_maxrss is measured in bytes on macOS, and in kilobytes on other platforms
+        rssUnitsPerMB = 1048576 if sys.platform == "darwin" else 1024
+        statsStr += ", peak memory " + str(round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / rssUnitsPerMB, 1)) + "MB" + \
+                    " (worker processes " + str(round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / rssUnitsPerMB, 1)) + "MB)"
+    bbLogger.log("main", "on_ready", statsStr, category="loads", eventType="LOAD_STATS")
+
+
+def loadUsersDB(recordsDir : str, filePath : str) -> bbUserDB.bbUserDB:
+    """Build a bbUserDB from the specified directory of per-user JSON records, and replay any changes recorded in the journal since it was saved.
+    If the directory does not exist, the bbUserDB is instead built from the specified single JSON file, and all users are marked for saving into recordsDir.
+    Users are constructed as they are streamed from file, rather than after reading the whole database.
+
+    :param str recordsDir: path to the directory of user records to load. Theoretically, this can be absolute or relative.
+    :param str filePath: path to the JSON file to load if recordsDir does not exist. Theoretically, this can be absolute or relative.
+    :return: a bbUserDB as described by the dictionary-serialized representations stored in recordsDir or filePath, and the journal.
+    """
+    loadStart = time.perf_counter()
+    records, migrating, replayedIDs = streamSavedRecords("users", recordsDir, filePath)
+    newDB = bbUserDB.bbUserDB.fromRecords(records)
+    if migrating:
+        newDB.markAllDirty()
+    markReplayedRecords(newDB, newDB.users, replayedIDs)
+    logLoadStats("users", len(newDB.users), time.perf_counter() - loadStart)
+    return newDB
+
+
+def loadUsersSQLiteDB(dbPath : str, recordsDir : str, filePath : str) -> bbUserSQLiteDB.bbUserSQLiteDB:
+    """Open a bbUserSQLiteDB from the specified SQLite database file, and write any changes recorded in the journal since it was saved into the file.
+    No bbUsers are constructed; they are loaded on first access.
+    If the SQLite database does not exist yet, all users are imported into it from the JSON users database, as would be loaded by loadUsersDB.
+
+    :param str dbPath: path to the SQLite database file to open. Theoretically, this can be absolute or relative.
+    :param str recordsDir: path to the directory of JSON user records to import if dbPath does not exist.
+    :param str filePath: path to the JSON file to import if neither dbPath nor recordsDir exist.
+    :return: a bbUserSQLiteDB reading from dbPath
+    """
+    migrating = not os.path.isfile(dbPath)
+    newDB = bbUserSQLiteDB.bbUserSQLiteDB(dbPath, cacheSize=bbConfig.userDBSQLiteCacheSize)
+    if migrating:
+        if os.path.isdir(recordsDir):
+            newDB.importRecords(lib.jsonHandler.readJSONRecords(recordsDir))
+        elif lib.jsonHandler.dbFileExists(filePath):
+            newDB.importRecords(lib.jsonHandler.readDBFile(filePath))
+    records = {}
+    replayedIDs = bbGlobals.journal.replayOnto("users", records)
+    newDB.importRecords(records, removedKeys=[id for id in replayedIDs if id not in records])
+    return newDB
+
+
+def loadGuildsDB(recordsDir : str, filePath : str, dbReload : bool = False) -> bbGuildDB.bbGuildDB:
+    """Build a bbGuildDB from the specified directory of per-guild JSON records, and replay any changes recorded in the journal since it was saved.
+    If the directory does not exist, the bbGuildDB is instead built from the specified single JSON file, and all guilds are marked for saving into recordsDir.
+
+    :param str recordsDir: path to the directory of guild records to load. Theoretically, this can be absolute or relative.
+    :param str filePath: path to the JSON file to load if recordsDir does not exist. Theoretically, this can be absolute or relative.
     :param bool dbReload: Whether or not this DB is being created during the initial database loading phase of bountybot. This is used to toggle name checking in bbBounty contruction.
-    :return: a bbGuildDB as described by the dictionary-serialized representation stored in the file located in filePath.
+    :return: a bbGuildDB as described by the dictionary-serialized representations stored in recordsDir or filePath, and the journal.
+    """
+    loadStart = time.perf_counter()
+    records, migrating, replayedIDs = streamSavedRecords("guilds", recordsDir, filePath)
+    newDB = bbGuildDB.bbGuildDB.fromRecords(records, dbReload=dbReload)
+    if migrating:
+        newDB.markAllDirty()
+    markReplayedRecords(newDB, newDB.guilds, replayedIDs)
+    logLoadStats("guilds", len(newDB.guilds), time.perf_counter() - loadStart)
+    return newDB
+
+
+def markReplayedRecords(db, loadedRecords : dict, replayedIDs : set):
+    """Mark all records changed by a journal replay for writing or deletion on the next save.
+    Without this, the journal segments containing the replayed changes would be discarded on the next save without the changes being saved.
+
+    :param db: The bbUserDB or bbGuildDB which was loaded
+    :param dict loadedRecords: The database's dictionary of loaded records, e.g bbUserDB.users
+    :param set[str] replayedIDs: The string IDs of all records changed by the replay
+    """
+    for id in replayedIDs:
+        if int(id) in loadedRecords:
+            db.dirtyIDs.add(int(id))
+        else:
+            db.removedIDs.add(int(id))
+
+
+def journalDirtyRecords():
+    """Schedule the states of all users and guilds changed since they were last journaled to be recorded in the journal.
+    This should be called after every event which may change the databases, such as commands and TimedTask expiries.
+    Heaps which run expiry functions in the background call this as each one finishes, through their callbackDoneFunction.
+    Changes are not journaled immediately. Instead, they are batched up and flushed by flushJournal bbConfig.journalFlushSeconds after
+    the first unjournaled change, so this is cheap enough to call after every event.
+    """
+    global journalFlushTask
+    if journalFlushTask is None or journalFlushTask.done():
+        journalFlushTask = asyncio.ensure_future(flushJournalAfterDelay())
+
+
+async def flushJournalAfterDelay():
+    """Wait for bbConfig.journalFlushSeconds, and then flush all changes made in the meantime to the journal with flushJournal.
+    """
+    await asyncio.sleep(bbConfig.journalFlushSeconds)
+    await flushJournal()
+
+
+async def flushJournal(rotate : bool = False) -> int:
+    """Record the current states of all users and guilds changed since they were last journaled in the journal.
+    The records are snapshotted on the event loop, and then serialised and written to the journal in the event loop's default executor,
+    in the same way as bb_saveAllDBs. Records whose serialised states have not changed since they were last journaled are not written.
+    If the write fails, the records are kept to be journaled again on the next flush.
+
+    :param bool rotate: Whether or not to rotate the journal onto a new segment once the flush has been written (Default False)
+    :return: The number of the segment which was closed if rotate is True, None otherwise
+    :rtype: int
     """
-    return bbGuildDB.bbGuildDB.fromDict(lib.jsonHandler.readJSON(filePath), dbReload=dbReload)
+    async with bbGlobals.client.bb_journalLock:
+        batch = {"users": bbGlobals.usersDB.unjournaledRecordsToDict(), "guilds": bbGlobals.guildsDB.unjournaledRecordsToDict()}
+        if batch["users"] or batch["guilds"]:
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, bbGlobals.journal.append, batch)
+            except Exception as e:
+                bbLogger.log("Main", "flushJournal", "Error writing journal entries: " + e.__class__.__name__, trace=traceback.format_exc(), eventType="JOURNAL_ERR")
+                for db, records in ((bbGlobals.usersDB, batch["users"]), (bbGlobals.guildsDB, batch["guilds"])):
+                    db.unjournaledIDs.update(int(id) for id in records)
+        if rotate:
+            return bbGlobals.journal.rotate()
 
 
 async def loadReactionMenusDB(filePath : str) -> reactionMenuDB.ReactionMenuDB:
-    """Build a reactionMenuDB from the specified JSON file.
+    """Build a reactionMenuDB from the specified JSON file, or its binary snapshot.
     This method must be called asynchronously, to allow awaiting of discord message fetching functions.
 
     :param str filePath: path to the JSON file to load. Theoretically, this can be absolute or relative.
     :return: a reactionMenuDB as described by the dictionary-serialized representation stored in the file located in filePath.
     """
-    return await reactionMenuDB.fromDict(lib.jsonHandler.readJSON(filePath))
+    return await reactionMenuDB.fromDict(lib.jsonHandler.readDBFile(filePath))
+
+
+
+def scheduledTasksToDict() -> dict:
+    """Serialise the schedules of the bot's timed tasks, so that they can be restored after a restart with restoreScheduledTasks.
+    This includes the database save task, each guild's new bounty task, and all pending duel requests.
+    Reaction menu timeouts are saved with their menus, in the reaction menus database.
+    Shop refreshes are aligned to the clock, so do not need saving.
+
+    :return: A dictionary describing the expiry times of the bot's timed tasks
+    :rtype: dict
+    """
+    data = {"newBounties": {}, "duelRequests": []}
+    if bbGlobals.dbSaveTT is not None:
+        data["dbSave"] = bbGlobals.dbSaveTT.toDict()
+    for guild in bbGlobals.guildsDB.getGuilds():
+        if guild.newBountyTT is not None:
+            data["newBounties"][str(guild.id)] = guild.newBountyTT.toDict()
+    if bbGlobals.duelRequestTTDB is not None:
+        for task in bbGlobals.duelRequestTTDB:
+            if task.expiryFunction is DuelRequest.expireAndAnnounceDuelReq:
+                data["duelRequests"].append(task.expiryFunctionArgs["duelReq"].toDict())
+    return data
+
+
+def restoreScheduledTasks(tasksDict : dict):
+    """Move the bot's timed tasks to the expiry times saved by scheduledTasksToDict, and recreate saved duel requests.
+    Tasks which should have expired while the bot was offline are handled according to bbConfig.timedTaskCatchUpPolicy.
+    The database save task, guilds' new bounty tasks and the duel requests TimedTaskHeap must already have been created.
+
+    :param dict tasksDict: A dictionary describing the expiry times of the bot's timed tasks, as given by scheduledTasksToDict
+    """
+    catchUp = {"catchUpPolicy": bbConfig.timedTaskCatchUpPolicy, "catchUpSpreadSeconds": bbConfig.timedTaskCatchUpSpreadSeconds}
+    if "dbSave" in tasksDict:
+        bbGlobals.dbSaveTT.restoreSchedule(tasksDict["dbSave"], **catchUp)
+
+    if "newBounties" in tasksDict:
+        for guildID, taskDict in tasksDict["newBounties"].items():
+            # Bounties may have been disabled, or the guild removed, since the save
+            if bbGlobals.guildsDB.guildIdExists(int(guildID)) and bbGlobals.guildsDB.guilds[int(guildID)].newBountyTT is not None:
+                bbGlobals.guildsDB.guilds[int(guildID)].newBountyTT.restoreSchedule(taskDict, **catchUp)
+
+    if "duelRequests" in tasksDict:
+        for duelReqDict in tasksDict["duelRequests"]:
+            try:
+                duelReq = DuelRequest.DuelRequest.fromDict(duelReqDict, **catchUp)
+                duelReq.sourceBBUser.addDuelChallenge(duelReq)
+            except (KeyError, ValueError) as e:
+                bbLogger.log("Main", "restoreScheduledTasks", "Could not restore duel request " + str(duelReqDict["source"]) + " -> " + str(duelReqDict["target"]) + \
+                                ": " + e.__class__.__name__, category="timedTasks", eventType="RESTORE_ERR")
+                continue
+            bbGlobals.duelRequestTTDB.scheduleTask(duelReq.duelTimeoutTask)
+
+
+
+def loadRouteTable(cachePath : str) -> lib.pathfinding.RouteTable:
+    """Load the table of shortest routes between builtIn systems from the given cache file, or build it if the star map has changed since it was cached.
+    Newly built tables are written to the cache file. bbData.builtInSystemObjs must already have been populated.
+
+    :param str cachePath: path to the JSON file to cache the route table in, or "" to always build the table without caching it
+    :return: A RouteTable of the shortest routes between every pair of systems in bbData.builtInSystemObjs
+    :rtype: lib.pathfinding.RouteTable
+    """
+    graph = lib.pathfinding.systemGraph(bbData.builtInSystemObjs)
+    if cachePath and lib.jsonHandler.dbFileExists(cachePath):
+        try:
+            routeTable = lib.pathfinding.RouteTable.fromDict(lib.jsonHandler.readDBFile(cachePath))
+            if routeTable.isBuiltFrom(graph):
+                return routeTable
+        except (KeyError, ValueError, TypeError) as e:
+            bbLogger.log("Main", "loadRouteTable", "Could not read cached route table: " + e.__class__.__name__, category="misc", eventType="ROUTE_CACHE_ERR")
+
+    buildStart = time.perf_counter()
+    routeTable = lib.pathfinding.RouteTable(graph)
+    bbLogger.log("Main", "loadRouteTable", "Route table built for " + str(len(graph)) + " systems in " + str(round((time.perf_counter() - buildStart) * 1000, 1)) + "ms",
+                    category="misc", eventType="ROUTE_BUILT")
+    if cachePath:
+        lib.jsonHandler.writeJSON(cachePath, routeTable.toDict())
+    return routeTable
 
 
 
 ####### UTIL FUNCTIONS #######
 
-async def announceNewShopStock(guildID : int = -1):
-    """Announce the refreshing of shop stocks to one or all joined guilds.
-    Messages will be sent to the playChannels of all guilds in the bbGlobals.guildsDB, if they have one
+def shopRefreshBucketDelta() -> timedelta:
+    """Get the time between the refreshes of consecutive shop refresh buckets.
 
-    :param int guildID: The guild to announce to. If guildID is -1, the shop refresh will be announced to all joined guilds. (Default -1)
+    :return: shopRefreshStockPeriod divided evenly between shopRefreshBuckets buckets
+    :rtype: datetime.timedelta
     """
-    if guildID == -1:
-        # loop over all guilds
-        for guild in bbGlobals.guildsDB.guilds.values():
-            # ensure guild has a valid playChannel
-            if not guild.shopDisabled:
-                await guild.announceNewShopStock()
-    else:
-        guild = bbGlobals.guildsDB.getGuild(guildID)
-        # ensure guild has a valid playChannel
-        if not guild.shopDisabled:
+    return lib.timeUtil.timeDeltaFromDict(bbConfig.shopRefreshStockPeriod) / bbConfig.shopRefreshBuckets
+
+
+def timeUntilNextShopRefreshBucket(args : dict = {}) -> timedelta:
+    """Delay time generator for bbGlobals.shopRefreshTT, finding the time until the start of the next shop refresh bucket.
+    Buckets are aligned to the clock rather than to the time the bot started, so every guild's shop refreshes at the same time each period,
+    even across restarts.
+
+    :param dict args: ignored
+    :return: The time until the next bucket is due to be refreshed
+    :rtype: datetime.timedelta
+    """
+    bucketDelta = shopRefreshBucketDelta()
+    return bucketDelta - (datetime.utcnow() - TimedTask.EPOCH) % bucketDelta
+
+
+def queueShopStockAnnouncements(guilds : List[bbGuild.bbGuild]):
+    """Queue announcements of the refreshing of shop stocks to the given guilds, and start sending queued announcements in the background
+    if they are not already being sent.
+
+    :param List[bbGuild] guilds: The guilds whose shops were refreshed
+    """
+    global shopAnnouncementTask
+    shopAnnouncementQueue.extend(guilds)
+    if shopAnnouncementTask is None or shopAnnouncementTask.done():
+        shopAnnouncementTask = asyncio.ensure_future(announceQueuedShopStocks())
+
+
+async def announceQueuedShopStocks():
+    """Announce the refreshing of shop stocks to every guild in shopAnnouncementQueue, sending at most shopRefreshAnnouncementsPerSecond announcements per second.
+    Only one of these runs at a time, so the rate limit holds even when the announcements of several buckets overlap.
+    A failed announcement is logged, and does not prevent the remaining announcements.
+    """
+    while shopAnnouncementQueue:
+        guild = shopAnnouncementQueue.popleft()
+        try:
             await guild.announceNewShopStock()
+        except Exception as e:
+            bbLogger.log("Main", "anncShopStocks", "Failed to announce shop refresh to guild " + str(guild.id) + ": " + e.__class__.__name__,
+                            category="shop", eventType="ANNC_ERR", trace=traceback.format_exc())
+        await asyncio.sleep(1 / bbConfig.shopRefreshAnnouncementsPerSecond)
 
 
-async def refreshAndAnnounceAllShopStocks():
-    """Generate new tech levels and inventories for the shops of all joined guilds,
-    and announce the stock refresh to those guilds.
+async def refreshAndAnnounceShopStockBucket():
+    """Generate new tech levels and inventories for the shops of guilds in the current shop refresh bucket,
+    and start announcing the stock refresh to those guilds in the background.
+    Each bucket is refreshed once per shopRefreshStockPeriod, so that shop refreshes are spread evenly over the period.
     """
-    bbGlobals.guildsDB.refreshAllShopStocks()
-    await announceNewShopStock()
+    bucket = ((datetime.utcnow() - TimedTask.EPOCH) // shopRefreshBucketDelta()) % bbConfig.shopRefreshBuckets
+    refreshedGuilds = bbGlobals.guildsDB.refreshShopStocksInBucket(bucket, bbConfig.shopRefreshBuckets)
+    if refreshedGuilds:
+        queueShopStockAnnouncements(refreshedGuilds)
 
 
 
@@ -207,6 +568,7 @@ async def on_guild_join(guild : discord.Guild):
     if not bbGlobals.guildsDB.guildIdExists(guild.id):
         guildExists = False
         bbGlobals.guildsDB.addGuildID(guild.id)
+        journalDirtyRecords()
     bbLogger.log("Main", "guild_join", "I joined a new guild! " + guild.name + "#" + str(guild.id) + ("\n -- The guild was added to bbGlobals.guildsDB" if not guildExists else ""),
                  category="guildsDB", eventType="NW_GLD")
 
@@ -222,6 +584,7 @@ async def on_guild_remove(guild : discord.Guild):
     if bbGlobals.guildsDB.guildIdExists(guild.id):
         guildExists = True
         bbGlobals.guildsDB.removeGuildId(guild.id)
+        journalDirtyRecords()
     bbLogger.log("Main", "guild_remove", "I left a guild! " + guild.name + "#" + str(guild.id) + ("\n -- The guild was removed from bbGlobals.guildsDB" if guildExists else ""),
                  category="guildsDB", eventType="NW_GLD")
 
@@ -233,9 +596,9 @@ async def on_ready():
     - new bounty spawning
     - shop stock refreshing
     - regular database saving to JSON
+    - timed task checking through a TimedTaskScheduler, which sleeps until the next task is due when timedTaskCheckingType is "dynamic"
 
     TODO: Add bounty expiry and reaction menu (e.g duel challenges) expiry
-    TODO: Implement dynamic timedtask checking period
     TODO: Move item initialization to separate method
     """
     ##### EMOJI INITIALIZATION #####
@@ -275,6 +638,10 @@ async def on_ready():
         bbData.builtInSystemData[systemDict["name"]]["builtIn"] = True
         bbData.builtInSystemObjs[systemDict["name"]].builtIn = True
 
+    # Precompute the shortest routes between all systems, so that routes can be looked up rather than searched for
+    bbData.routeTable = loadRouteTable(bbConfig.routeTableCachePath)
+    bbData.starMap = lib.starMap.StarMap(bbData.builtInSystemObjs)
+
     # generate bbModule objects from data in bbData
     for moduleDict in bbData.builtInModuleData.values():
         bbData.builtInModuleObjs[moduleDict["name"]] = bbModuleFactory.fromDict(moduleDict)
@@ -337,6 +704,20 @@ async def on_ready():
             bbData.builtInToolObjs[toolName] = bbShipSkinTool.bbShipSkinTool(shipSkin, value=bbConfig.shipSkinValueForTL(shipSkin.averageTL), builtIn=True)
 
 
+    ##### ALIAS INDEXING #####
+
+    # Index builtIn objects by their names and aliases, for constant time lookups by name
+    for objectType, builtInObjs, aliasIndex in (("system", bbData.builtInSystemObjs, bbData.systemAliasIndex), ("criminal", bbData.builtInCriminalObjs, bbData.criminalAliasIndex),
+                                                ("module", bbData.builtInModuleObjs, bbData.moduleAliasIndex), ("weapon", bbData.builtInWeaponObjs, bbData.weaponAliasIndex),
+                                                ("upgrade", bbData.builtInUpgradeObjs, bbData.upgradeAliasIndex), ("turret", bbData.builtInTurretObjs, bbData.turretAliasIndex),
+                                                ("tool", bbData.builtInToolObjs, bbData.toolAliasIndex)):
+        for builtInObj in builtInObjs.values():
+            aliasIndex.add(builtInObj)
+            bbData.builtInAliasIndex.add(builtInObj, value=(objectType, builtInObj))
+
+    # Ships are indexed once their prototypes have been built, after spawn rate calculation
+
+
     ##### SORT ITEMS BY TECHLEVEL #####
 
     # Initialise shipKeysByTL as maxTechLevel empty arrays
@@ -386,11 +767,42 @@ async def on_ready():
         turret.shopSpawnRate = bbConfig.truncToRes((bbConfig.itemTLSpawnChanceForShopTL[turret.techLevel - 1][turret.techLevel - 1] / len(bbData.turretObjsByTL[turret.techLevel - 1])) * 100)
 
 
+    ##### SHIP CATALOG #####
 
-    bbGlobals.newBountiesTTDB = TimedTaskHeap.TimedTaskHeap()
+    # generate a frozen prototype bbShip for each builtIn ship, to be inspected by commands and cloned when given to users
+    for shipDict in bbData.builtInShipData.values():
+        shipPrototype = bbShip.bbShip.fromDict(shipDict)
+        shipPrototype.freeze()
+        bbData.builtInShipObjs[shipDict["name"]] = shipPrototype
+        bbData.shipAliasIndex.add(shipPrototype)
+        bbData.builtInAliasIndex.add(shipPrototype, value=("ship", shipPrototype))
+
+    # Index every name by its n-grams, for suggesting similar names when a name is not recognised
+    bbData.builtInNameSearch = lib.ngramSearch.NGramIndex()
+    for name, indexedValues in bbData.builtInAliasIndex.values.items():
+        for objectType, indexedValue in indexedValues:
+            bbData.builtInNameSearch.add(name, (objectType, indexedValue.name))
+    for shipSkin in bbData.builtInShipSkins.values():
+        bbData.builtInNameSearch.add(shipSkin.name, ("skin", shipSkin.name))
+
+
+
+    bbGlobals.newBountiesTTDB = TimedTaskHeap.TimedTaskHeap(maxConcurrentCallbacks=bbConfig.timedTaskMaxConcurrentCallbacks,
+                                                            callbackTimeoutSeconds=bbConfig.timedTaskCallbackTimeoutSeconds,
+                                                            callbackDoneFunction=journalDirtyRecords)
     # Databases
-    bbGlobals.usersDB = loadUsersDB(bbConfig.userDBPath)
-    bbGlobals.guildsDB = loadGuildsDB(bbConfig.guildDBPath, dbReload=True)
+    if bbConfig.dbSaveFormat not in ["json", "binary"]:
+        raise ValueError("bbConfig: Invalid dbSaveFormat '" + bbConfig.dbSaveFormat + "'")
+    if bbConfig.dbSnapshotCompression not in lib.binarySnapshot.COMPRESSION_IDS:
+        raise ValueError("bbConfig: Invalid dbSnapshotCompression '" + bbConfig.dbSnapshotCompression + "'")
+    bbGlobals.journal = bbJournal.bbJournal(bbConfig.journalDir, fsync=bbConfig.journalFsync)
+    if bbConfig.userDBBackend == "sqlite":
+        bbGlobals.usersDB = loadUsersSQLiteDB(bbConfig.userDBSQLitePath, bbConfig.userDBRecordsDir, bbConfig.userDBPath)
+    elif bbConfig.userDBBackend == "json":
+        bbGlobals.usersDB = loadUsersDB(bbConfig.userDBRecordsDir, bbConfig.userDBPath)
+    else:
+        raise ValueError("bbConfig: Invalid userDBBackend '" + bbConfig.userDBBackend + "'")
+    bbGlobals.guildsDB = loadGuildsDB(bbConfig.guildDBRecordsDir, bbConfig.guildDBPath, dbReload=True)
 
     for guild in bbGlobals.guildsDB.getGuilds():
         if guild.hasBountyBoardChannel:
@@ -413,19 +825,34 @@ async def on_ready():
     # bot is now logged in
     bbGlobals.client.bb_loggedIn = True
     
-    bbGlobals.shopRefreshTT = TimedTask.TimedTask(expiryDelta=lib.timeUtil.timeDeltaFromDict(bbConfig.shopRefreshStockPeriod), autoReschedule=True, expiryFunction=refreshAndAnnounceAllShopStocks)
+    # Expiry functions of timed tasks saved by scheduledTasksToDict
+    TimedTask.registerExpiryFunction("saveAllDBs", bbGlobals.client.bb_saveAllDBs)
+
+    # Guilds' shops are refreshed in buckets spread over the refresh period, rather than all at once
+    bbGlobals.shopRefreshTT = TimedTask.DynamicRescheduleTask(timeUntilNextShopRefreshBucket, autoReschedule=True, expiryFunction=refreshAndAnnounceShopStockBucket)
     bbGlobals.dbSaveTT = TimedTask.TimedTask(expiryDelta=lib.timeUtil.timeDeltaFromDict(bbConfig.savePeriod), autoReschedule=True, expiryFunction=bbGlobals.client.bb_saveAllDBs)
 
-    bbGlobals.duelRequestTTDB = TimedTaskHeap.TimedTaskHeap()
+    # Duel requests and reaction menus are short-lived and often cancelled early, so are stored in timing wheels
+    bbGlobals.duelRequestTTDB = TimedTaskWheel.TimedTaskWheel(maxConcurrentCallbacks=bbConfig.timedTaskMaxConcurrentCallbacks,
+                                                            callbackTimeoutSeconds=bbConfig.timedTaskCallbackTimeoutSeconds,
+                                                            callbackDoneFunction=journalDirtyRecords)
 
     if bbConfig.timedTaskCheckingType not in ["fixed", "dynamic"]:
         raise ValueError("bbConfig: Invalid timedTaskCheckingType '" +
                          bbConfig.timedTaskCheckingType + "'")
 
+    if bbConfig.timedTaskCatchUpPolicy not in TimedTask.CATCH_UP_POLICIES:
+        raise ValueError("bbConfig: Invalid timedTaskCatchUpPolicy '" + bbConfig.timedTaskCatchUpPolicy + "'")
+
+    if lib.jsonHandler.dbFileExists(bbConfig.timedTasksDBPath):
+        restoreScheduledTasks(lib.jsonHandler.readDBFile(bbConfig.timedTasksDBPath))
+
 
-    bbGlobals.reactionMenusTTDB = TimedTaskHeap.TimedTaskHeap()
+    bbGlobals.reactionMenusTTDB = TimedTaskWheel.TimedTaskWheel(maxConcurrentCallbacks=bbConfig.timedTaskMaxConcurrentCallbacks,
+                                                                callbackTimeoutSeconds=bbConfig.timedTaskCallbackTimeoutSeconds,
+                                                                callbackDoneFunction=journalDirtyRecords)
 
-    if not os.path.exists(bbConfig.reactionMenusDBPath):
+    if not lib.jsonHandler.dbFileExists(bbConfig.reactionMenusDBPath):
         try:
             f = open(bbConfig.reactionMenusDBPath, 'x')
             f.write("{}")
@@ -436,25 +863,23 @@ async def on_ready():
     bbGlobals.reactionMenusDB = await loadReactionMenusDB(bbConfig.reactionMenusDBPath)
 
 
-    # TODO: find next closest task with min over heap[0] for all task DBs and delay by that amount
-    # newTaskAdded = False
-    # nextTask
+    bbGlobals.taskScheduler = TimedTaskScheduler.TimedTaskScheduler(maxSleepSeconds=bbConfig.timedTaskDynamicMaxSleepSeconds)
+    for sourceName, taskSource in (("shopRefresh", bbGlobals.shopRefreshTT), ("newBounties", bbGlobals.newBountiesTTDB), ("dbSave", bbGlobals.dbSaveTT),
+                                    ("duelRequests", bbGlobals.duelRequestTTDB), ("reactionMenus", bbGlobals.reactionMenusTTDB)):
+        bbGlobals.taskScheduler.addSource(taskSource, name=sourceName)
 
     # execute regular tasks while the bot is logged in
     while bbGlobals.client.bb_loggedIn:
         if bbConfig.timedTaskCheckingType == "fixed":
             await asyncio.sleep(bbConfig.timedTaskLatenessThresholdSeconds)
-        # elif bbConfig.timedTaskCheckingType == "dynamic":
-
-        await bbGlobals.shopRefreshTT.doExpiryCheck()
-
-        await bbGlobals.newBountiesTTDB.doTaskChecking()
-
-        await bbGlobals.dbSaveTT.doExpiryCheck()
+        else:
+            # Sleep until the next task expires, or an earlier task is scheduled
+            await bbGlobals.taskScheduler.waitForNextExpiry()
 
-        await bbGlobals.duelRequestTTDB.doTaskChecking()
+        await bbGlobals.taskScheduler.doTaskChecking()
 
-        await bbGlobals.reactionMenusTTDB.doTaskChecking()
+        # Expiry functions still running in the background are journaled as they finish, by their heap's callbackDoneFunction
+        journalDirtyRecords()
 
 
 @bbGlobals.client.event
@@ -481,19 +906,8 @@ async def on_message(message : discord.Message):
 
     # For any messages beginning with bbConfig.commandPrefix
     if message.content.startswith(bbConfig.commandPrefix) and len(message.content) > len(bbConfig.commandPrefix):
-        # replace special apostraphe characters with the universal '
-        msgContent = message.content.replace("‘", "'").replace("’", "'")
-
-        # split the message into command and arguments
-        if len(msgContent[len(bbConfig.commandPrefix):]) > 0:
-            command = msgContent[len(bbConfig.commandPrefix):].split(" ")[
-                0]
-            args = msgContent[len(
-                bbConfig.commandPrefix) + len(command) + 1:]
-
-        # if no command is given, ignore the message
-        else:
-            return
+        # split the message into command and arguments, replacing special apostraphe characters with the universal '
+        command, args = HeirarchicalCommandsDB.tokenizeCommand(message.content, bbConfig.commandPrefix)
 
         # infer the message author's permissions
         if message.author.id in bbConfig.developers:
@@ -519,6 +933,8 @@ async def on_message(message : discord.Message):
                             command + "' with args '" + args + "': " + e.__class__.__name__, trace=traceback.format_exc())
             commandFound = True
 
+        journalDirtyRecords()
+
         # Command not found, send an error message.
         if not commandFound:
             userTitle = bbConfig.accessLevelTitles[accessLevel]
@@ -555,6 +971,7 @@ async def on_raw_reaction_add(payload : discord.RawReactionActionEvent):
         if message.id in bbGlobals.reactionMenusDB and \
                 bbGlobals.reactionMenusDB[message.id].hasEmojiRegistered(emoji):
             await bbGlobals.reactionMenusDB[message.id].reactionAdded(emoji, member)
+            journalDirtyRecords()
 
 
 @bbGlobals.client.event
@@ -587,6 +1004,7 @@ async def on_raw_reaction_remove(payload : discord.RawReactionActionEvent):
         if message.id in bbGlobals.reactionMenusDB and \
                 bbGlobals.reactionMenusDB[message.id].hasEmojiRegistered(emoji):
             await bbGlobals.reactionMenusDB[message.id].reactionRemoved(emoji, member)
+            journalDirtyRecords()
 
 
 @bbGlobals.client.event
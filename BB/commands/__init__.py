@@ -14,4 +14,5 @@ def loadCommands():
         except ImportError:
             raise ImportError("Unrecognised commands module in bbConfig.includedCommandModules. Please ensure the file exists, and spelling/capitalization are correct: '" + modName + "'")
     
+    commandsDB.compileDispatchTable()
     return commandsDB
\ No newline at end of file
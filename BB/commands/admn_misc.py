@@ -8,7 +8,6 @@ from ..bbConfig import bbConfig, bbData
 from ..userAlerts import UserAlerts
 from ..scheduling import TimedTask
 from ..reactionMenus import ReactionRolePicker, ReactionSkinRegionPicker
-from ..bbObjects.items import bbShip
 from ..logging import bbLogger
 from ..shipRenderer import shipRenderer
 
@@ -359,10 +358,8 @@ async def admin_cmd_showmeHD(message : discord.Message, args : str, isDM : bool)
     # look up the ship object
     itemName = args.rstrip(" ").title()
     itemObj = None
-    for ship in bbData.builtInShipData.values():
-        shipObj = bbShip.bbShip.fromDict(ship)
-        if shipObj.isCalled(itemName):
-            itemObj = shipObj
+    if itemName in bbData.shipAliasIndex:
+        itemObj = bbData.shipAliasIndex.get(itemName)
 
     # report unrecognised ship names
     if itemObj is None:
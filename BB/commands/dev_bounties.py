@@ -327,12 +327,10 @@ async def dev_cmd_make_bounty(message : discord.Message, args : str, isDM : bool
             newName = ""
         else:
             # if a criminal name was given, see if it corresponds to a builtIn criminal
-            for crim in bbData.builtInCriminalObjs.values():
-                if crim.isCalled(newName):
-                    builtIn = True
-                    builtInCrimObj = crim
-                    newName = crim.name
-                    break
+            if newName in bbData.criminalAliasIndex:
+                builtIn = True
+                builtInCrimObj = bbData.criminalAliasIndex.get(newName)
+                newName = builtInCrimObj.name
 
             # if a criminal name was given, ensure it does not already exist as a bounty
             if newName != "" and callingBBGuild.bountiesDB.bountyNameExists(newName):
@@ -1,9 +1,14 @@
+import cProfile
 import discord
+import io
+import json
+import pstats
 import traceback
 from datetime import datetime
 
 from . import commandsDB as bbCommands
 from .. import bbGlobals, lib
+from ..bbConfig import bbConfig
 
 from . import util_help
 
@@ -21,6 +26,138 @@ bbCommands.register("dev-help", dev_cmd_dev_help, 2, signatureStr="**dev-help**
 
 
 
+def formatSeconds(seconds : float) -> str:
+    """Format a number of seconds from a metrics snapshot for display, in milliseconds if it is less than a second.
+
+    :param float seconds: The number of seconds to format, or None if there were no recorded values
+    :return: seconds as a short string, or "-" if seconds is None
+    :rtype: str
+    """
+    if seconds is None:
+        return "-"
+    return str(round(seconds * 1000, 1)) + "ms" if abs(seconds) < 1 else str(round(seconds, 1)) + "s"
+
+
+async def dev_cmd_scheduler_stats(message : discord.Message, args : str, isDM : bool):
+    """developer command summarising the lateness, expiry function durations, check times, heap sizes and gravestone ratios
+    recorded for each of the task scheduler's TimedTaskHeaps and standalone TimedTasks.
+    Give 'export' to instead receive the full metrics snapshot, with histogram buckets, as a JSON file.
+
+    :param discord.Message message: the discord message calling the command
+    :param str args: 'export' to receive the full snapshot as a file, empty otherwise
+    :param bool isDM: Whether or not the command is being called from a DM channel
+    """
+    if bbGlobals.taskScheduler is None:
+        await message.channel.send(":x: The task scheduler has not started yet!")
+        return
+    snapshot = bbGlobals.taskScheduler.metricsSnapshot()
+
+    if args == "export":
+        exportData = {"time": datetime.utcnow().isoformat(), "timedTaskCheckingType": bbConfig.timedTaskCheckingType,
+                        "timedTaskLatenessThresholdSeconds": bbConfig.timedTaskLatenessThresholdSeconds, "sources": snapshot}
+        await message.channel.send("Scheduler metrics snapshot:", file=discord.File(io.BytesIO(json.dumps(exportData, indent=4).encode()), filename="schedulerMetrics.json"))
+        return
+
+    statsEmbed = lib.discordUtil.makeEmbed(titleTxt="Task Scheduler Metrics", desc="Checking type: " + bbConfig.timedTaskCheckingType + \
+                                            ", lateness threshold: " + str(bbConfig.timedTaskLatenessThresholdSeconds) + "s",
+                                            footerTxt="Percentiles are p50/p90/p99/max over recent samples. Use 'export' for histograms.")
+    for sourceName, metrics in snapshot.items():
+        lateness, callbacks, checks = metrics["lateness"], metrics["callbackSeconds"], metrics["checkSeconds"]
+        fieldText = "Lateness: " + "/".join(formatSeconds(lateness[stat]) for stat in ("p50", "p90", "p99", "max")) + \
+                    "\nCallbacks: " + "/".join(formatSeconds(callbacks[stat]) for stat in ("p50", "p90", "p99", "max")) + \
+                    "\nChecks: " + "/".join(formatSeconds(checks[stat]) for stat in ("p50", "p90", "p99", "max")) + \
+                    "\nExpired: " + str(metrics["counts"]["expired"])
+        if metrics["heapSize"]["count"] > 0:
+            fieldText += ", gravestoned: " + str(metrics["counts"]["gravestoned"]) + \
+                        "\nHeap size p50/max: " + str(metrics["heapSize"]["p50"]) + "/" + str(metrics["heapSize"]["max"]) + \
+                        "\nMean gravestone ratio: " + ("-" if metrics["gravestoneRatio"]["mean"] is None else str(round(metrics["gravestoneRatio"]["mean"], 2)))
+        if metrics["counts"]["peakPending"] > 0:
+            fieldText += "\nBackground callbacks pending/peak: " + str(metrics["counts"]["pending"]) + "/" + str(metrics["counts"]["peakPending"]) + \
+                        ", failed: " + str(metrics["counts"]["failed"]) + ", timed out: " + str(metrics["counts"]["timedOut"])
+        statsEmbed.add_field(name=sourceName, value=fieldText, inline=False)
+
+    await message.channel.send(embed=statsEmbed)
+
+bbCommands.register("scheduler-stats", dev_cmd_scheduler_stats, 2, allowDM=True, signatureStr="**scheduler-stats** *[export]*",
+                    shortHelp="Show how late timed tasks are firing, and how long their expiry functions and checks take.",
+                    longHelp="Show how late timed tasks are firing, how long their expiry functions and task checks take, and the size and gravestone ratio of each task heap. " + \
+                                "Give `export` to receive the full metrics snapshot, including histograms, as a JSON file.")
+
+
+async def dev_cmd_command_stats(message : discord.Message, args : str, isDM : bool):
+    """developer command summarising the call counts and timings recorded for each command, slowest first.
+    Give a command name to see only that command, or 'export' to instead receive the full metrics snapshot, with histogram buckets, as a JSON file.
+
+    :param discord.Message message: the discord message calling the command
+    :param str args: a command name to see only that command, 'export' to receive the full snapshot as a file, or empty to see the slowest commands
+    :param bool isDM: Whether or not the command is being called from a DM channel
+    """
+    snapshot = bbCommands.metricsSnapshot()
+
+    if args == "export":
+        exportData = {"time": datetime.utcnow().isoformat(), "slowCommandThresholdSeconds": bbConfig.slowCommandThresholdSeconds, "commands": snapshot}
+        await message.channel.send("Command metrics snapshot:", file=discord.File(io.BytesIO(json.dumps(exportData, indent=4).encode()), filename="commandMetrics.json"))
+        return
+
+    if args:
+        # Commands above access level 0 are named with their access level appended
+        snapshot = {commandName: metrics for commandName, metrics in snapshot.items() if commandName.split(" (")[0].lower() == args}
+        if not snapshot:
+            await message.channel.send(":x: No calls have been recorded for a command named '" + args + "'!")
+            return
+
+    statsEmbed = lib.discordUtil.makeEmbed(titleTxt="Command Metrics", desc="Slow command threshold: " + str(bbConfig.slowCommandThresholdSeconds) + "s",
+                                            footerTxt="Percentiles are p50/p95/p99/max over recent calls. Use 'export' for histograms.")
+    # Show the commands with the slowest p99 first, up to discord's embed field limit
+    for commandName, metrics in sorted(snapshot.items(), key=lambda item: item[1]["wallSeconds"]["p99"] or 0, reverse=True)[:25]:
+        wall, running, awaiting = metrics["wallSeconds"], metrics["runningSeconds"], metrics["awaitingSeconds"]
+        statsEmbed.add_field(name=commandName, value="Calls: " + str(metrics["calls"]) + ", errors: " + str(metrics["errors"]) + ", slow: " + str(metrics["slowCalls"]) + \
+                                "\nTotal: " + "/".join(formatSeconds(wall[stat]) for stat in ("p50", "p95", "p99", "max")) + \
+                                "\nRunning: " + "/".join(formatSeconds(running[stat]) for stat in ("p50", "p95", "p99", "max")) + \
+                                "\nAwaiting I/O: " + "/".join(formatSeconds(awaiting[stat]) for stat in ("p50", "p95", "p99", "max")), inline=False)
+    if not snapshot:
+        statsEmbed.description += "\nNo commands have been called yet."
+
+    await message.channel.send(embed=statsEmbed)
+
+bbCommands.register("command-stats", dev_cmd_command_stats, 2, allowDM=True, signatureStr="**command-stats** *[command | export]*",
+                    shortHelp="Show how long commands are taking, and how much of that is spent awaiting discord.",
+                    longHelp="Show call counts and timing percentiles for the slowest commands, split into time spent running and time spent awaiting I/O. " + \
+                                "Give a command name to see only that command, or `export` to receive the full metrics snapshot, including histograms, as a JSON file.")
+
+
+async def dev_cmd_profile_command(message : discord.Message, args : str, isDM : bool):
+    """developer command capturing a cProfile profile of the next call of the named command, by anyone.
+    The profile is sent to this channel once the call has finished, as a text file listing the functions with the highest cumulative time.
+
+    :param discord.Message message: the discord message calling the command
+    :param str args: the name of the command to profile
+    :param bool isDM: Whether or not the command is being called from a DM channel
+    """
+    if not args:
+        await message.channel.send(":x: Please give the name of the command to profile!")
+        return
+    registry = bbCommands.getCommand(args, bbConfig.numCommandAccessLevels - 1)
+    if registry is None:
+        await message.channel.send(":x: Unknown command '" + args + "'!")
+        return
+
+    async def sendProfile(profiler : cProfile.Profile):
+        profileText = io.StringIO()
+        pstats.Stats(profiler, stream=profileText).sort_stats("cumulative").print_stats(50)
+        await message.channel.send("Profile of the last call of '" + registry.ident + "':",
+                                    file=discord.File(io.BytesIO(profileText.getvalue().encode()), filename=registry.ident + "Profile.txt"))
+
+    bbCommands.profileNextCall(registry, sendProfile)
+    await message.channel.send("The next call of '" + registry.ident + "' will be profiled.")
+
+bbCommands.register("profile-command", dev_cmd_profile_command, 2, allowDM=True, signatureStr="**profile-command** *<command>*",
+                    shortHelp="Capture a cProfile profile of the next call of a command, by anyone.",
+                    longHelp="Capture a cProfile profile of the next call of the given command, by anyone. The profile is sent to this channel once the call has finished. " + \
+                                "Time spent awaiting I/O is not included.")
+
+
+
 async def dev_cmd_sleep(message : discord.Message, args : str, isDM : bool):
     """developer command saving all data to JSON and then shutting down the bot
 
@@ -45,7 +182,7 @@ async def dev_cmd_save(message : discord.Message, args : str, isDM : bool):
     :param bool isDM: Whether or not the command is being called from a DM channel
     """
     try:
-        bbGlobals.client.bb_saveAllDBs()
+        await bbGlobals.client.bb_saveAllDBs()
     except Exception as e:
         print("SAVING ERROR", e.__class__.__name__)
         print(traceback.format_exc())
@@ -2,7 +2,6 @@ import discord
 
 from . import commandsDB as bbCommands
 from ..bbConfig import bbConfig, bbData
-from ..bbObjects.items import bbShip
 from .. import lib, bbGlobals
 
 
@@ -32,10 +31,8 @@ async def dev_cmd_addSkin(message : discord.Message, args : str, isDM : bool):
     # look up the ship object
     itemName = args.rstrip(" ").title()
     itemObj = None
-    for ship in bbData.builtInShipData.values():
-        shipObj = bbShip.bbShip.fromDict(ship)
-        if shipObj.isCalled(itemName):
-            itemObj = shipObj
+    if itemName in bbData.shipAliasIndex:
+        itemObj = bbData.shipAliasIndex.get(itemName)
 
     # report unrecognised ship names
     if itemObj is None:
@@ -91,10 +88,8 @@ async def dev_cmd_delSkin(message : discord.Message, args : str, isDM : bool):
     # look up the ship object
     itemName = args.rstrip(" ").title()
     itemObj = None
-    for ship in bbData.builtInShipData.values():
-        shipObj = bbShip.bbShip.fromDict(ship)
-        if shipObj.isCalled(itemName):
-            itemObj = shipObj
+    if itemName in bbData.shipAliasIndex:
+        itemObj = bbData.shipAliasIndex.get(itemName)
 
     # report unrecognised ship names
     if itemObj is None:
@@ -148,10 +143,8 @@ async def dev_cmd_makeSkin(message : discord.Message, args : str, isDM : bool):
     # look up the ship object
     itemName = args.rstrip(" ").title()
     itemObj = None
-    for ship in bbData.builtInShipData.values():
-        shipObj = bbShip.bbShip.fromDict(ship)
-        if shipObj.isCalled(itemName):
-            itemObj = shipObj
+    if itemName in bbData.shipAliasIndex:
+        itemObj = bbData.shipAliasIndex.get(itemName)
 
     # report unrecognised ship names
     if itemObj is None:
@@ -45,19 +45,16 @@ async def cmd_check(message : discord.Message, args : str, isDM : bool):
         return
 
     requestedSystem = args.title()
-    systObj = None
 
     # attempt to find the requested system in the database
-    for syst in bbData.builtInSystemObjs.keys():
-        if bbData.builtInSystemObjs[syst].isCalled(requestedSystem):
-            systObj = bbData.builtInSystemObjs[syst]
+    systObj = bbData.systemAliasIndex.get(requestedSystem)
 
     # reject if the requested system is not in the database
     if systObj is None:
         if len(requestedSystem) < 20:
-            await message.channel.send(":x: The **" + requestedSystem + "** system is not on my star map! :map:")
+            await message.channel.send(":x: The **" + requestedSystem + "** system is not on my star map! :map:" + lib.ngramSearch.didYouMean(requestedSystem, ["system"]))
         else:
-            await message.channel.send(":x: The **" + requestedSystem[0:15] + "**... system is not on my star map! :map:")
+            await message.channel.send(":x: The **" + requestedSystem[0:15] + "**... system is not on my star map! :map:" + lib.ngramSearch.didYouMean(requestedSystem, ["system"]))
         return
 
     requestedSystem = systObj.name
@@ -82,53 +79,50 @@ async def cmd_check(message : discord.Message, args : str, isDM : bool):
         systemInBountyRoute = False
         dailyBountiesMaxReached = False
 
-        # Loop over all bounties in the database
-        for fac in callingBBGuild.bountiesDB.getFactions():
-            # list of completed bounties to remove from the bounties database
-            toPop = []
-            for bounty in callingBBGuild.bountiesDB.getFactionBounties(fac):
-
-                # Check the passed system in current bounty
-                # If current bounty resides in the requested system
-                checkResult = bounty.check(requestedSystem, message.author.id)
-                if checkResult == 3:
-                    requestedBBUser.bountyWinsToday += 1
-                    if not dailyBountiesMaxReached and requestedBBUser.bountyWinsToday >= bbConfig.maxDailyBountyWins:
-                        requestedBBUser.dailyBountyWinsReset = datetime.utcnow().replace(
-                            hour=0, minute=0, second=0, microsecond=0) + lib.timeUtil.timeDeltaFromDict({"hours": 24})
-                        dailyBountiesMaxReached = True
-
-                    bountyWon = True
-                    # reward all contributing users
-                    rewards = bounty.calcRewards()
-                    for userID in rewards:
-                        bbGlobals.usersDB.getUser(
-                            userID).credits += rewards[userID]["reward"]
-                        bbGlobals.usersDB.getUser(
-                            userID).lifetimeCredits += rewards[userID]["reward"]
-                    # add this bounty to the list of bounties to be removed
-                    toPop += [bounty]
-                    # Announce the bounty has ben completed
-                    await callingBBGuild.announceBountyWon(bounty, rewards, message.author)
-
-                if checkResult != 0:
-                    systemInBountyRoute = True
-                    await callingBBGuild.updateBountyBoardChannel(bounty, bountyComplete=checkResult == 3)
-
-            # remove all completed bounties
-            for bounty in toPop:
-                callingBBGuild.bountiesDB.removeBountyObj(bounty)
+        # list of completed bounties to remove from the bounties database
+        toPop = []
+        # Only bounties whose routes contain the requested system need checking. The index is copied, as it may change while awaiting.
+        for bounty, routePos in list(callingBBGuild.bountiesDB.getSystemBounties(requestedSystem)):
+
+            # Check the passed system in current bounty
+            # If current bounty resides in the requested system
+            checkResult = bounty.check(requestedSystem, message.author.id)
+            if checkResult == 3:
+                requestedBBUser.bountyWinsToday += 1
+                if not dailyBountiesMaxReached and requestedBBUser.bountyWinsToday >= bbConfig.maxDailyBountyWins:
+                    requestedBBUser.dailyBountyWinsReset = datetime.utcnow().replace(
+                        hour=0, minute=0, second=0, microsecond=0) + lib.timeUtil.timeDeltaFromDict({"hours": 24})
+                    dailyBountiesMaxReached = True
+
+                bountyWon = True
+                # reward all contributing users
+                rewards = bounty.calcRewards()
+                for userID in rewards:
+                    bbGlobals.usersDB.getUser(
+                        userID).credits += rewards[userID]["reward"]
+                    bbGlobals.usersDB.getUser(
+                        userID).lifetimeCredits += rewards[userID]["reward"]
+                # add this bounty to the list of bounties to be removed
+                toPop += [bounty]
+                # Announce the bounty has ben completed
+                await callingBBGuild.announceBountyWon(bounty, rewards, message.author)
+
+            if checkResult != 0:
+                systemInBountyRoute = True
+                await callingBBGuild.updateBountyBoardChannel(bounty, bountyComplete=checkResult == 3)
+
+        # remove all completed bounties
+        for bounty in toPop:
+            callingBBGuild.bountiesDB.removeBountyObj(bounty)
 
         sightedCriminalsStr = ""
         # Check if any bounties are close to the requested system in their route, defined by bbConfig.closeBountyThreshold
-        for fac in callingBBGuild.bountiesDB.getFactions():
-            for bounty in callingBBGuild.bountiesDB.getFactionBounties(fac):
-                if requestedSystem in bounty.route:
-                    if 0 < bounty.route.index(bounty.answer) - bounty.route.index(requestedSystem) < bbConfig.closeBountyThreshold:
-                        # Print any close bounty names
-                        sightedCriminalsStr += "**       **• Local security forces spotted **" + \
-                            lib.discordUtil.criminalNameOrDiscrim(
-                                bounty.criminal) + "** here recently.\n"
+        for bounty, routePos in callingBBGuild.bountiesDB.getSystemBounties(requestedSystem):
+            if 0 < bounty.answerRoutePos - routePos < bbConfig.closeBountyThreshold:
+                # Print any close bounty names
+                sightedCriminalsStr += "**       **• Local security forces spotted **" + \
+                    lib.discordUtil.criminalNameOrDiscrim(
+                        bounty.criminal) + "** here recently.\n"
         sightedCriminalsStr = sightedCriminalsStr[:-1]
 
         # If a bounty was won, print a congratulatory message
@@ -5,7 +5,6 @@ import asyncio
 from . import commandsDB as bbCommands
 from ..bbConfig import bbData, bbConfig
 from .. import lib, bbGlobals
-from ..bbObjects.items import bbShip
 from ..reactionMenus import ReactionSkinRegionPicker
 from ..logging import bbLogger
 from ..shipRenderer import shipRenderer
@@ -29,7 +28,7 @@ async def cmd_map(message : discord.Message, args : str, isDM : bool):
     else:
         await message.channel.send(bbData.mapImageNoGraphLink)
 
-bbCommands.register("map", cmd_map, 0, aliases=["starmap"], allowDM=True, helpSection="gof2 info", signatureStr="**map**", shortHelp="Send the complete GOF2 starmap.", longHelp="Send the complete GOF2 starmap with jumpgate routes, including all secret and DLC systems.")
+bbCommands.register("map", cmd_map, 0, aliases=["starmap"], allowDM=True, cost=3, helpSection="gof2 info", signatureStr="**map**", shortHelp="Send the complete GOF2 starmap.", longHelp="Send the complete GOF2 starmap with jumpgate routes, including all secret and DLC systems.")
 
 
 async def cmd_make_route(message : discord.Message, args : str, isDM : bool):
@@ -54,46 +53,45 @@ async def cmd_make_route(message : discord.Message, args : str, isDM : bool):
 
     # attempt to look up the requested systems in the built in systems database
     systemsFound = {requestedStart: False, requestedEnd: False}
-    for syst in bbData.builtInSystemObjs.keys():
-        if bbData.builtInSystemObjs[syst].isCalled(requestedStart):
-            systemsFound[requestedStart] = True
-            startSyst = syst
-        if bbData.builtInSystemObjs[syst].isCalled(requestedEnd):
-            systemsFound[requestedEnd] = True
-            endSyst = syst
+    if requestedStart in bbData.systemAliasIndex:
+        systemsFound[requestedStart] = True
+        startSyst = bbData.systemAliasIndex.get(requestedStart).name
+    if requestedEnd in bbData.systemAliasIndex:
+        systemsFound[requestedEnd] = True
+        endSyst = bbData.systemAliasIndex.get(requestedEnd).name
 
     # report any unrecognised systems
     for syst in [requestedStart, requestedEnd]:
         if not systemsFound[syst]:
             if len(syst) < 20:
-                await message.channel.send(":x: The **" + syst + "** system is not on my star map! :map:")
+                await message.channel.send(":x: The **" + syst + "** system is not on my star map! :map:" + lib.ngramSearch.didYouMean(syst, ["system"]))
             else:
-                await message.channel.send(":x: The **" + syst[0:15] + "**... system is not on my star map! :map:")
+                await message.channel.send(":x: The **" + syst[0:15] + "**... system is not on my star map! :map:" + lib.ngramSearch.didYouMean(syst, ["system"]))
             return
 
     # report any systems that were recognised, but do not have any neighbours
     for syst in [startSyst, endSyst]:
         if not bbData.builtInSystemObjs[syst].hasJumpGate():
+            nearestGate = bbData.starMap.nearestJumpGateSystem(syst)
+            nearestGateStr = "\nThe nearest system with a jump gate is **" + nearestGate + "**." if nearestGate is not None else ""
             if len(syst) < 20:
-                await message.channel.send(":x: The **" + syst + "** system does not have a jump gate! :rocket:")
+                await message.channel.send(":x: The **" + syst + "** system does not have a jump gate! :rocket:" + nearestGateStr)
             else:
-                await message.channel.send(":x: The **" + syst[0:15] + "**... system does not have a jump gate! :rocket:")
+                await message.channel.send(":x: The **" + syst[0:15] + "**... system does not have a jump gate! :rocket:" + nearestGateStr)
             return
 
     # build and print the route, reporting any errors in the route generation process
     routeStr = ""
     for currentSyst in lib.pathfinding.makeRoute(startSyst, endSyst):
         routeStr += currentSyst + ", "
-    if routeStr.startswith("#"):
-        await message.channel.send(":x: ERR: Processing took too long! :stopwatch:")
-    elif routeStr.startswith("!"):
+    if routeStr.startswith("!"):
         await message.channel.send(":x: ERR: No route found! :triangular_flag_on_post:")
     elif startSyst == endSyst:
         await message.channel.send(":thinking: You're already there, pilot!")
     else:
         await message.channel.send("Here's the shortest route from **" + startSyst + "** to **" + endSyst + "**:\n> " + routeStr[:-2] + " :rocket:")
 
-bbCommands.register("make-route", cmd_make_route, 0, allowDM=True, helpSection="gof2 info", signatureStr="**make-route <startSystem>, <endSystem>**", shortHelp="Find the shortest route from `startSystem` to `endSystem`.", longHelp="Find the shortest route from `startSystem` to `endSystem`. Both systems must have jump gates. To find out if a system has a jump gate, use `$COMMANDPREFIX$info`.")
+bbCommands.register("make-route", cmd_make_route, 0, allowDM=True, cost=3, helpSection="gof2 info", signatureStr="**make-route <startSystem>, <endSystem>**", shortHelp="Find the shortest route from `startSystem` to `endSystem`.", longHelp="Find the shortest route from `startSystem` to `endSystem`. Both systems must have jump gates. To find out if a system has a jump gate, use `$COMMANDPREFIX$info`.")
 
 
 async def cmd_info_system(message : discord.Message, args : str, isDM : bool):
@@ -110,17 +108,14 @@ async def cmd_info_system(message : discord.Message, args : str, isDM : bool):
 
     # attempt to look up the specified system
     systArg = args.title()
-    systObj = None
-    for syst in bbData.builtInSystemObjs.keys():
-        if bbData.builtInSystemObjs[syst].isCalled(systArg):
-            systObj = bbData.builtInSystemObjs[syst]
+    systObj = bbData.systemAliasIndex.get(systArg)
 
     # report unrecognised systems
     if systObj is None:
         if len(systArg) < 20:
-            await message.channel.send(":x: The **" + systArg + "** system is not on my star map! :map:")
+            await message.channel.send(":x: The **" + systArg + "** system is not on my star map! :map:" + lib.ngramSearch.didYouMean(systArg, ["system"]))
         else:
-            await message.channel.send(":x: The **" + systArg[0:15] + "**... system is not on my star map! :map:")
+            await message.channel.send(":x: The **" + systArg[0:15] + "**... system is not on my star map! :map:" + lib.ngramSearch.didYouMean(systArg, ["system"]))
     else:
         # build the neighbours statistic into a string
         neighboursStr = ""
@@ -169,17 +164,14 @@ async def cmd_info_criminal(message : discord.Message, args : str, isDM : bool):
 
     # look up the criminal object
     criminalName = args.title()
-    criminalObj = None
-    for crim in bbData.builtInCriminalObjs.keys():
-        if bbData.builtInCriminalObjs[crim].isCalled(criminalName):
-            criminalObj = bbData.builtInCriminalObjs[crim]
+    criminalObj = bbData.criminalAliasIndex.get(criminalName)
 
     # report unrecognised criminal names
     if criminalObj is None:
         if len(criminalName) < 20:
-            await message.channel.send(":x: **" + criminalName + "** is not in my database! :detective:")
+            await message.channel.send(":x: **" + criminalName + "** is not in my database! :detective:" + lib.ngramSearch.didYouMean(criminalName, ["criminal"]))
         else:
-            await message.channel.send(":x: **" + criminalName[0:15] + "**... is not in my database! :detective:")
+            await message.channel.send(":x: **" + criminalName[0:15] + "**... is not in my database! :detective:" + lib.ngramSearch.didYouMean(criminalName, ["criminal"]))
 
     else:
         # build the stats embed
@@ -218,17 +210,15 @@ async def cmd_info_ship(message : discord.Message, args : str, isDM : bool):
     # look up the ship object
     itemName = args.title()
     itemObj = None
-    for ship in bbData.builtInShipData.values():
-        shipObj = bbShip.bbShip.fromDict(ship)
-        if shipObj.isCalled(itemName):
-            itemObj = shipObj
+    if itemName in bbData.shipAliasIndex:
+        itemObj = bbData.shipAliasIndex.get(itemName)
 
     # report unrecognised ship names
     if itemObj is None:
         if len(itemName) < 20:
-            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:")
+            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["ship"]))
         else:
-            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:")
+            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["ship"]))
 
     else:
         # build the stats embed
@@ -303,17 +293,14 @@ async def cmd_info_weapon(message : discord.Message, args : str, isDM : bool):
 
     # look up the weapon object
     itemName = args.title()
-    itemObj = None
-    for weap in bbData.builtInWeaponObjs.keys():
-        if bbData.builtInWeaponObjs[weap].isCalled(itemName):
-            itemObj = bbData.builtInWeaponObjs[weap]
+    itemObj = bbData.weaponAliasIndex.get(itemName)
 
     # report unrecognised weapon names
     if itemObj is None:
         if len(itemName) < 20:
-            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:")
+            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["weapon"]))
         else:
-            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:")
+            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["weapon"]))
 
     else:
         # build the stats embed
@@ -355,17 +342,14 @@ async def cmd_info_module(message : discord.Message, args : str, isDM : bool):
 
     # look up the module object
     itemName = args.title()
-    itemObj = None
-    for module in bbData.builtInModuleObjs.keys():
-        if bbData.builtInModuleObjs[module].isCalled(itemName):
-            itemObj = bbData.builtInModuleObjs[module]
+    itemObj = bbData.moduleAliasIndex.get(itemName)
 
     # report unrecognised module names
     if itemObj is None:
         if len(itemName) < 20:
-            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:")
+            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["module"]))
         else:
-            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:")
+            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["module"]))
 
     else:
         # build the stats embed
@@ -408,17 +392,14 @@ async def cmd_info_turret(message : discord.Message, args : str, isDM : bool):
 
     # look up the turret object
     itemName = args.title()
-    itemObj = None
-    for turr in bbData.builtInTurretObjs.keys():
-        if bbData.builtInTurretObjs[turr].isCalled(itemName):
-            itemObj = bbData.builtInTurretObjs[turr]
+    itemObj = bbData.turretAliasIndex.get(itemName)
 
     # report unrecognised turret names
     if itemObj is None:
         if len(itemName) < 20:
-            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:")
+            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["turret"]))
         else:
-            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:")
+            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["turret"]))
 
     else:
         # build the stats embed
@@ -513,9 +494,9 @@ async def cmd_info_skin(message : discord.Message, args : str, isDM : bool):
     skin = args.lower()	
     if skin not in bbData.builtInShipSkins:	
         if len(skin) < 20:	
-            await message.channel.send(":x: The **" + skin + "** skin is not in my database! :detective:")	
+            await message.channel.send(":x: The **" + skin + "** skin is not in my database! :detective:" + lib.ngramSearch.didYouMean(skin, ["skin"]))	
         else:	
-            await message.channel.send(":x: The **" + skin[0:15] + "**... skin is not in my database! :detective:")	
+            await message.channel.send(":x: The **" + skin[0:15] + "**... skin is not in my database! :detective:" + lib.ngramSearch.didYouMean(skin, ["skin"]))	
     else:	
         shipSkin = bbData.builtInShipSkins[skin]	
         # build the stats embed	
@@ -590,16 +571,13 @@ async def cmd_showme_criminal(message : discord.Message, args : str, isDM : bool
         return	
     # look up the criminal object	
     criminalName = args.title()	
-    criminalObj = None	
-    for crim in bbData.builtInCriminalObjs.keys():	
-        if bbData.builtInCriminalObjs[crim].isCalled(criminalName):	
-            criminalObj = bbData.builtInCriminalObjs[crim]	
+    criminalObj = bbData.criminalAliasIndex.get(criminalName)	
     # report unrecognised criminal names	
     if criminalObj is None:	
         if len(criminalName) < 20:	
-            await message.channel.send(":x: **" + criminalName + "** is not in my database! :detective:")	
+            await message.channel.send(":x: **" + criminalName + "** is not in my database! :detective:" + lib.ngramSearch.didYouMean(criminalName, ["criminal"]))	
         else:	
-            await message.channel.send(":x: **" + criminalName[0:15] + "**... is not in my database! :detective:")	
+            await message.channel.send(":x: **" + criminalName[0:15] + "**... is not in my database! :detective:" + lib.ngramSearch.didYouMean(criminalName, ["criminal"]))	
     else:	
         itemEmbed = lib.discordUtil.makeEmbed(col=lib.discordUtil.randomColour(), img=criminalObj.icon, titleTxt=criminalObj.name, footerTxt="Wanted criminal")	
         await message.channel.send(embed=itemEmbed)	
@@ -638,16 +616,14 @@ async def cmd_showme_ship(message : discord.Message, args : str, isDM : bool):
     # look up the ship object	
     itemName = args.rstrip(" ").title()	
     itemObj = None	
-    for ship in bbData.builtInShipData.values():	
-        shipObj = bbShip.bbShip.fromDict(ship)	
-        if shipObj.isCalled(itemName):	
-            itemObj = shipObj	
+    if itemName in bbData.shipAliasIndex:	
+        itemObj = bbData.shipAliasIndex.get(itemName)	
     # report unrecognised ship names	
     if itemObj is None:	
         if len(itemName) < 20:	
-            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:")	
+            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["ship"]))	
         else:	
-            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:")	
+            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["ship"]))	
         return	
     if skin != "":	
         shipData = bbData.builtInShipData[itemObj.name]	
@@ -790,9 +766,9 @@ async def cmd_showme_ship(message : discord.Message, args : str, isDM : bool):
             skin = skin.lstrip(" ").lower()	
             if skin not in bbData.builtInShipSkins:	
                 if len(itemName) < 20:	
-                    await message.channel.send(":x: The **" + skin + "** skin is not in my database! :detective:")	
+                    await message.channel.send(":x: The **" + skin + "** skin is not in my database! :detective:" + lib.ngramSearch.didYouMean(skin, ["skin"]))	
                 else:	
-                    await message.channel.send(":x: The **" + skin[0:15] + "**... skin is not in my database! :detective:")	
+                    await message.channel.send(":x: The **" + skin[0:15] + "**... skin is not in my database! :detective:" + lib.ngramSearch.didYouMean(skin, ["skin"]))	
             elif skin not in bbData.builtInShipData[itemObj.name]["compatibleSkins"]:	
                 await message.channel.send(":x: That skin is not compatible with the **" + itemObj.name + "**!")	
             	
@@ -822,16 +798,13 @@ async def cmd_showme_weapon(message : discord.Message, args : str, isDM : bool):
         return	
     # look up the weapon object	
     itemName = args.title()	
-    itemObj = None	
-    for weap in bbData.builtInWeaponObjs.keys():	
-        if bbData.builtInWeaponObjs[weap].isCalled(itemName):	
-            itemObj = bbData.builtInWeaponObjs[weap]	
+    itemObj = bbData.weaponAliasIndex.get(itemName)	
     # report unrecognised weapon names	
     if itemObj is None:	
         if len(itemName) < 20:	
-            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:")	
+            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["weapon"]))	
         else:	
-            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:")	
+            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["weapon"]))	
     else:	
         if not itemObj.hasIcon:	
             await message.channel.send(":x: I don't have an icon for **" + itemObj.name.title() + "**!")	
@@ -855,16 +828,13 @@ async def cmd_showme_module(message : discord.Message, args : str, isDM : bool):
         return
     # look up the module object
     itemName = args.title()
-    itemObj = None
-    for module in bbData.builtInModuleObjs.keys():
-        if bbData.builtInModuleObjs[module].isCalled(itemName):
-            itemObj = bbData.builtInModuleObjs[module]
+    itemObj = bbData.moduleAliasIndex.get(itemName)
     # report unrecognised module names
     if itemObj is None:
         if len(itemName) < 20:
-            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:")	
+            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["module"]))	
         else:	
-            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:")	
+            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["module"]))	
     else:	
         if not itemObj.hasIcon:	
             await message.channel.send(":x: I don't have an icon for **" + itemObj.name.title() + "**!")	
@@ -887,16 +857,13 @@ async def cmd_showme_turret(message : discord.Message, args : str, isDM : bool):
         return	
     # look up the turret object	
     itemName = args.title()	
-    itemObj = None	
-    for turr in bbData.builtInTurretObjs.keys():	
-        if bbData.builtInTurretObjs[turr].isCalled(itemName):	
-            itemObj = bbData.builtInTurretObjs[turr]	
+    itemObj = bbData.turretAliasIndex.get(itemName)	
     # report unrecognised turret names	
     if itemObj is None:	
         if len(itemName) < 20:	
-            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:")	
+            await message.channel.send(":x: **" + itemName + "** is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["turret"]))	
         else:	
-            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:")	
+            await message.channel.send(":x: **" + itemName[0:15] + "**... is not in my database! :detective:" + lib.ngramSearch.didYouMean(itemName, ["turret"]))	
     else:	
         if not itemObj.hasIcon:	
             await message.channel.send(":x: I don't have an icon for **" + itemObj.name.title() + "**!")	
@@ -971,4 +938,4 @@ async def cmd_showme(message : discord.Message, args : str, isDM : bool):
     else:	
         await message.channel.send(":x: Unknown object type! (criminal/ship/weapon/module/turret/commodity)")	
 
-bbCommands.register("showme", cmd_showme, 0, allowDM=True, aliases=["show", "render"], helpSection="gof2 info", signatureStr="**showme <object-type> <name>** *[[full]+ [skinName]]*", shortHelp="Get an image of the named item. This command can also render ships with a given skin.", longHelp="Get a larger image of the requested item. If your item is a ship, you may also specify a skin name, prefaced by a `+` symbol.\nAlternatively, give a `+` and no ship name, and attach your own 2048x2048 jpg image, and I will render it onto your ship! Give `full+` instead of `+` to disable autoskin and render exactly your provided image, with no additional texturing.")
\ No newline at end of file
+bbCommands.register("showme", cmd_showme, 0, allowDM=True, cost=5, aliases=["show", "render"], helpSection="gof2 info", signatureStr="**showme <object-type> <name>** *[[full]+ [skinName]]*", shortHelp="Get an image of the named item. This command can also render ships with a given skin.", longHelp="Get a larger image of the requested item. If your item is a ship, you may also specify a skin name, prefaced by a `+` symbol.\nAlternatively, give a `+` and no ship name, and attach your own 2048x2048 jpg image, and I will render it onto your ship! Give `full+` instead of `+` to disable autoskin and render exactly your provided image, with no additional texturing.")
\ No newline at end of file
@@ -1,2 +1,2 @@
 # Make all lib modules available on package import
-from . import discordUtil, emojis, jsonHandler, pathfinding, stringTyping, timeUtil
\ No newline at end of file
+from . import binarySnapshot, discordUtil, emojis, jsonHandler, ngramSearch, pathfinding, rateLimiting, starMap, stringTyping, timeUtil
\ No newline at end of file
@@ -0,0 +1,284 @@
+"""A compact, versioned binary alternative to JSON for saving databases.
+
+A snapshot begins with a header of the magic bytes b"BBSNAP", a format version byte, and a compression byte.
+The rest of the snapshot, compressed with the named compression method, contains:
+- A string table: the number of distinct strings in the snapshot, followed by each string as a length-prefixed UTF-8 byte string.
+  Every dictionary key and string value is stored once in the table, and is referred to elsewhere by its index.
+  This removes the repeated key names (e.g "item", "count") which make up much of a JSON database.
+- The top-level value. If this is a dictionary, each of its values is length-prefixed as a record, so records can be skipped
+  or decoded one at a time by iterRecords.
+
+All integers in the format, including lengths and string indices, are stored as variable-length integers (7 bits per byte).
+Only JSON-serializable values are supported, and values are decoded to exactly what json.loads would return for the same data.
+"""
+import lzma
+import struct
+import zlib
+from typing import Iterator, Tuple
+
+MAGIC = b"BBSNAP"
+# Increase this whenever the format changes, and keep reading older versions in loads
+VERSION = 1
+
+# Compression method names, and their IDs in the snapshot header
+COMPRESSION_IDS = {"none": 0, "zlib": 1, "lzma": 2}
+COMPRESSION_NAMES = {compressionID: name for name, compressionID in COMPRESSION_IDS.items()}
+
+# Value type tags
+_TAG_NONE = 0
+_TAG_FALSE = 1
+_TAG_TRUE = 2
+_TAG_INT = 3
+_TAG_FLOAT = 4
+_TAG_STR = 5
+_TAG_LIST = 6
+_TAG_DICT = 7
+_TAG_RECORDS = 8
+
+_HEADER_LENGTH = len(MAGIC) + 2
+_DOUBLE = struct.Struct("<d")
+
+
+def isSnapshot(data : bytes) -> bool:
+    """Decide whether the given bytes begin with a binary snapshot header.
+
+    :param bytes data: The data to check. Only the first few bytes are needed.
+    :return: True if data starts with the snapshot magic bytes, False otherwise
+    :rtype: bool
+    """
+    return data[:len(MAGIC)] == MAGIC
+
+
+def _writeVarint(out : bytearray, n : int):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def dumps(obj, compression : str = "zlib") -> bytes:
+    """Serialise the given JSON-serializable object into a binary snapshot.
+
+    :param obj: The object to serialise. Usually a dictionary, such as a database's toDict.
+    :param str compression: The compression method to use; "none", "zlib" or "lzma" (Default "zlib")
+    :return: The binary snapshot
+    :rtype: bytes
+    :raise ValueError: When given an unknown compression method
+    :raise TypeError: When obj contains a value which is not JSON-serializable
+    """
+    if compression not in COMPRESSION_IDS:
+        raise ValueError("Unknown snapshot compression method: " + str(compression))
+
+    stringIndices = {}
+    body = bytearray()
+
+    def writeStr(out : bytearray, s : str):
+        if s not in stringIndices:
+            stringIndices[s] = len(stringIndices)
+        _writeVarint(out, stringIndices[s])
+
+    def writeKey(out : bytearray, key):
+        # Mirror json.dumps, which converts non-string keys to strings
+        if type(key) != str:
+            if key is True or key is False or key is None:
+                key = "true" if key is True else "false" if key is False else "null"
+            elif isinstance(key, (int, float)):
+                key = str(key) if isinstance(key, int) else repr(key)
+            else:
+                raise TypeError("Snapshot keys must be str, int, float, bool or None, not " + type(key).__name__)
+        writeStr(out, key)
+
+    def writeValue(out : bytearray, value):
+        valueType = type(value)
+        if valueType == str:
+            out.append(_TAG_STR)
+            writeStr(out, value)
+        elif value is None:
+            out.append(_TAG_NONE)
+        elif value is True:
+            out.append(_TAG_TRUE)
+        elif value is False:
+            out.append(_TAG_FALSE)
+        elif valueType == int:
+            out.append(_TAG_INT)
+            # Zigzag encode, so that small negative numbers stay short
+            _writeVarint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+        elif valueType == float:
+            out.append(_TAG_FLOAT)
+            out += _DOUBLE.pack(value)
+        elif valueType == dict:
+            out.append(_TAG_DICT)
+            _writeVarint(out, len(value))
+            for key in value:
+                writeKey(out, key)
+                writeValue(out, value[key])
+        elif valueType in (list, tuple):
+            out.append(_TAG_LIST)
+            _writeVarint(out, len(value))
+            for item in value:
+                writeValue(out, item)
+        # Subclasses of the basic types, such as enums, are slower to check for so are handled last
+        elif isinstance(value, str):
+            writeValue(out, str(value))
+        elif isinstance(value, int):
+            writeValue(out, int(value))
+        elif isinstance(value, float):
+            writeValue(out, float(value))
+        elif isinstance(value, dict):
+            writeValue(out, dict(value))
+        elif isinstance(value, (list, tuple)):
+            writeValue(out, list(value))
+        else:
+            raise TypeError("Object of type " + type(value).__name__ + " is not JSON serializable")
+
+    if type(obj) == dict:
+        body.append(_TAG_RECORDS)
+        _writeVarint(body, len(obj))
+        record = bytearray()
+        for key in obj:
+            writeKey(body, key)
+            record.clear()
+            writeValue(record, obj[key])
+            _writeVarint(body, len(record))
+            body += record
+    else:
+        writeValue(body, obj)
+
+    payload = bytearray()
+    _writeVarint(payload, len(stringIndices))
+    for s in stringIndices:
+        encoded = s.encode("utf-8")
+        _writeVarint(payload, len(encoded))
+        payload += encoded
+    payload += body
+
+    if compression == "zlib":
+        payload = zlib.compress(payload)
+    elif compression == "lzma":
+        payload = lzma.compress(payload)
+    return MAGIC + bytes((VERSION, COMPRESSION_IDS[compression])) + bytes(payload)
+
+
+class _SnapshotReader:
+    """Decodes the payload of a binary snapshot. Internal to this module; use loads or iterRecords.
+
+    :var data: The decompressed snapshot payload
+    :vartype data: bytes
+    :var pos: The index in data of the next byte to read
+    :vartype pos: int
+    :var strings: The snapshot's string table
+    :vartype strings: list[str]
+    """
+
+    def __init__(self, snapshot : bytes):
+        """
+        :param bytes snapshot: The complete binary snapshot, including its header
+        :raise ValueError: When snapshot is not a binary snapshot, or was written by a newer version of the format
+        """
+        if not isSnapshot(snapshot) or len(snapshot) < _HEADER_LENGTH:
+            raise ValueError("Not a binary snapshot")
+        version, compressionID = snapshot[len(MAGIC)], snapshot[len(MAGIC) + 1]
+        if version > VERSION:
+            raise ValueError("Unsupported binary snapshot version: " + str(version))
+        if compressionID not in COMPRESSION_NAMES:
+            raise ValueError("Unknown snapshot compression ID: " + str(compressionID))
+
+        compression = COMPRESSION_NAMES[compressionID]
+        payload = snapshot[_HEADER_LENGTH:]
+        if compression == "zlib":
+            payload = zlib.decompress(payload)
+        elif compression == "lzma":
+            payload = lzma.decompress(payload)
+        self.data = bytes(payload)
+        self.pos = 0
+
+        numStrings = self.readVarint()
+        self.strings = []
+        for _ in range(numStrings):
+            length = self.readVarint()
+            self.strings.append(self.data[self.pos:self.pos + length].decode("utf-8"))
+            self.pos += length
+
+
+    def readVarint(self) -> int:
+        data = self.data
+        pos = self.pos
+        byte = data[pos]
+        pos += 1
+        result = byte & 0x7f
+        shift = 7
+        while byte & 0x80:
+            byte = data[pos]
+            pos += 1
+            result |= (byte & 0x7f) << shift
+            shift += 7
+        self.pos = pos
+        return result
+
+
+    def readValue(self):
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag == _TAG_STR:
+            return self.strings[self.readVarint()]
+        elif tag == _TAG_INT:
+            n = self.readVarint()
+            return -((n + 1) >> 1) if n & 1 else n >> 1
+        elif tag == _TAG_DICT:
+            result = {}
+            strings = self.strings
+            for _ in range(self.readVarint()):
+                key = strings[self.readVarint()]
+                result[key] = self.readValue()
+            return result
+        elif tag == _TAG_LIST:
+            return [self.readValue() for _ in range(self.readVarint())]
+        elif tag == _TAG_TRUE:
+            return True
+        elif tag == _TAG_FALSE:
+            return False
+        elif tag == _TAG_NONE:
+            return None
+        elif tag == _TAG_FLOAT:
+            value = _DOUBLE.unpack_from(self.data, self.pos)[0]
+            self.pos += _DOUBLE.size
+            return value
+        elif tag == _TAG_RECORDS:
+            return dict(self.readRecords())
+        raise ValueError("Corrupt binary snapshot: unknown value tag " + str(tag) + " at byte " + str(self.pos - 1))
+
+
+    def readRecords(self) -> Iterator[Tuple[str, object]]:
+        for _ in range(self.readVarint()):
+            key = self.strings[self.readVarint()]
+            recordLength = self.readVarint()
+            recordEnd = self.pos + recordLength
+            value = self.readValue()
+            if self.pos != recordEnd:
+                raise ValueError("Corrupt binary snapshot: record '" + key + "' has the wrong length")
+            yield key, value
+
+
+def loads(snapshot : bytes):
+    """Deserialise a binary snapshot created by dumps.
+
+    :param bytes snapshot: The complete binary snapshot, including its header
+    :return: The deserialised object
+    :raise ValueError: When snapshot is not a valid binary snapshot
+    """
+    return _SnapshotReader(snapshot).readValue()
+
+
+def iterRecords(snapshot : bytes) -> Iterator[Tuple[str, object]]:
+    """Deserialise the records of a binary snapshot of a dictionary one at a time, in the order they were saved.
+
+    :param bytes snapshot: The complete binary snapshot, including its header
+    :return: An iterator over the snapshotted dictionary's keys and deserialised values
+    :rtype: Iterator[tuple[str, object]]
+    :raise ValueError: When snapshot is not a valid binary snapshot of a dictionary
+    """
+    reader = _SnapshotReader(snapshot)
+    if reader.data[reader.pos] != _TAG_RECORDS:
+        raise ValueError("Binary snapshot does not contain a dictionary")
+    reader.pos += 1
+    return reader.readRecords()
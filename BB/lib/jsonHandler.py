@@ -1,4 +1,14 @@
 import json
+import os
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+from . import binarySnapshot
+
+# File extension of binary snapshots, which are saved in place of JSON files when using the binary save format
+SNAPSHOT_EXTENSION = ".bbs"
 
 
 def readJSON(dbFile : str) -> dict:
@@ -14,21 +24,158 @@ def readJSON(dbFile : str) -> dict:
     return json.loads(txt)
 
 
-def writeJSON(dbFile : str, db : dict, prettyPrint=False):
+def writeJSON(dbFile : str, db : dict, prettyPrint=False, fsync=False) -> Tuple[float, float]:
     """Write the given json-serializable dictionary to the given file path. All objects in the dictionary must be JSON-serializable.
-    TODO: Check this makes the file if it doesnt exist
+    The file is replaced atomically, so it will always contain either its previous contents or the complete new contents.
 
     :param str dbFile: Path to the file which db should be written to
     :param dict db: The json-serializable dictionary to write
     :param bool prettyPrint: When False, write minified JSON. When true, write JSON with basic pretty printing (indentation)
+    :param bool fsync: When True, wait for the written file to be flushed to disk before returning (Default False)
+    :return: The time taken in seconds to serialise db to JSON, and the time taken in seconds to write (and fsync, if requested) the file
+    :rtype: tuple[float, float]
     """
+    serialiseStart = time.perf_counter()
     if prettyPrint:
         txt = json.dumps(db, indent=4, sort_keys=True)
     else:
         txt = json.dumps(db)
-    f = open(dbFile, "w")
-    txt = f.write(txt)
+    writeStart = time.perf_counter()
+    writeFileAtomic(dbFile, txt, fsync=fsync)
+    return writeStart - serialiseStart, time.perf_counter() - writeStart
+
+
+def writeFileAtomic(filePath : str, content, fsync=False):
+    """Replace the contents of the given file with the given text or bytes.
+    The contents are written to a temporary file first, and then moved over filePath, so that a crash part-way through writing can never leave a truncated file.
+
+    :param str filePath: Path to the file to write
+    :param content: The text or bytes to write
+    :type content: str or bytes
+    :param bool fsync: When True, wait for the written file to be flushed to disk before returning (Default False)
+    """
+    tempFile = filePath + ".tmp"
+    f = open(tempFile, "wb" if isinstance(content, bytes) else "w")
+    f.write(content)
+    if fsync:
+        f.flush()
+        os.fsync(f.fileno())
     f.close()
+    os.replace(tempFile, filePath)
+
+
+def snapshotPath(dbFile : str) -> str:
+    """Get the path that a binary snapshot of the given JSON file is saved to, by replacing its extension with SNAPSHOT_EXTENSION.
+
+    :param str dbFile: Path to a JSON file, e.g "saveData/users.json"
+    :return: The path of the file's binary snapshot, e.g "saveData/users.bbs"
+    :rtype: str
+    """
+    return os.path.splitext(dbFile)[0] + SNAPSHOT_EXTENSION
+
+
+def readSnapshot(snapshotFile : str):
+    """Read the binary snapshot file with the given path, and return its deserialised contents.
+
+    :param str snapshotFile: Path to the file to read
+    :return: The contents of the requested snapshot, usually a dictionary
+    :raise ValueError: When the file is not a valid binary snapshot
+    """
+    f = open(snapshotFile, "rb")
+    data = f.read()
+    f.close()
+    return binarySnapshot.loads(data)
+
+
+def writeSnapshot(snapshotFile : str, db : dict, compression="zlib", fsync=False) -> Tuple[float, float]:
+    """Write the given json-serializable dictionary to the given file path, as a binary snapshot. The file is replaced atomically.
+
+    :param str snapshotFile: Path to the file which db should be written to
+    :param dict db: The json-serializable dictionary to write
+    :param str compression: The compression method to use; "none", "zlib" or "lzma" (Default "zlib")
+    :param bool fsync: When True, wait for the written file to be flushed to disk before returning (Default False)
+    :return: The time taken in seconds to serialise and compress db, and the time taken in seconds to write (and fsync, if requested) the file
+    :rtype: tuple[float, float]
+    """
+    serialiseStart = time.perf_counter()
+    data = binarySnapshot.dumps(db, compression=compression)
+    writeStart = time.perf_counter()
+    writeFileAtomic(snapshotFile, data, fsync=fsync)
+    return writeStart - serialiseStart, time.perf_counter() - writeStart
+
+
+def readDBFile(dbFile : str) -> dict:
+    """Read a database saved with writeDBFile, in whichever format it was saved.
+    If a binary snapshot of dbFile exists, it is read instead of dbFile. If both exist, for example after a crash part-way through
+    changing save formats, the most recently written one is read.
+
+    :param str dbFile: Path to the database's JSON file
+    :return: The contents of the database's JSON file or binary snapshot
+    :rtype: dict
+    """
+    if isSnapshotNewest(dbFile):
+        return readSnapshot(snapshotPath(dbFile))
+    return readJSON(dbFile)
+
+
+def iterDBFileRecords(dbFile : str) -> Iterator[Tuple[str, object]]:
+    """Stream the records of a database saved with writeDBFile one at a time, in whichever format it was saved. See readDBFile.
+    JSON files are parsed with iterJSONObject, and binary snapshots with binarySnapshot.iterRecords.
+
+    :param str dbFile: Path to the database's JSON file
+    :return: An iterator over the database's keys and parsed records
+    :rtype: Iterator[tuple[str, object]]
+    """
+    if isSnapshotNewest(dbFile):
+        f = open(snapshotPath(dbFile), "rb")
+        data = f.read()
+        f.close()
+        return binarySnapshot.iterRecords(data)
+    return iterJSONObject(dbFile)
+
+
+def isSnapshotNewest(dbFile : str) -> bool:
+    """Decide whether a database saved with writeDBFile should be read from its binary snapshot, rather than its JSON file.
+
+    :param str dbFile: Path to the database's JSON file
+    :return: True if a binary snapshot of dbFile exists and is at least as new as dbFile, False otherwise
+    :rtype: bool
+    """
+    snapshotFile = snapshotPath(dbFile)
+    return os.path.isfile(snapshotFile) and (not os.path.isfile(dbFile) or os.path.getmtime(snapshotFile) >= os.path.getmtime(dbFile))
+
+
+def dbFileExists(dbFile : str) -> bool:
+    """Decide whether a database has been saved with writeDBFile, in either format.
+
+    :param str dbFile: Path to the database's JSON file
+    :return: True if dbFile or its binary snapshot exists, False otherwise
+    :rtype: bool
+    """
+    return os.path.isfile(dbFile) or os.path.isfile(snapshotPath(dbFile))
+
+
+def writeDBFile(dbFile : str, db : dict, snapshotCompression=None, fsync=False) -> Tuple[float, float]:
+    """Save the given json-serializable dictionary either as JSON to dbFile, or as a binary snapshot alongside it.
+    Once written, any copy of the database in the other format is deleted, so that it can never be read in place of the new save.
+
+    :param str dbFile: Path to the database's JSON file
+    :param dict db: The json-serializable dictionary to write
+    :param str snapshotCompression: None to write JSON, or the compression method to write a binary snapshot with; "none", "zlib" or "lzma" (Default None)
+    :param bool fsync: When True, wait for the written file to be flushed to disk before returning (Default False)
+    :return: The time taken in seconds to serialise db, and the time taken in seconds to write the file and delete the copy in the other format
+    :rtype: tuple[float, float]
+    """
+    if snapshotCompression is None:
+        serialiseTime, writeTime = writeJSON(dbFile, db, fsync=fsync)
+        staleFile = snapshotPath(dbFile)
+    else:
+        serialiseTime, writeTime = writeSnapshot(snapshotPath(dbFile), db, compression=snapshotCompression, fsync=fsync)
+        staleFile = dbFile
+    deleteStart = time.perf_counter()
+    if os.path.isfile(staleFile):
+        os.remove(staleFile)
+    return serialiseTime, writeTime + time.perf_counter() - deleteStart
 
 
 def saveDB(dbPath : str, db, **kwargs):
@@ -41,6 +188,206 @@ def saveDB(dbPath : str, db, **kwargs):
     writeJSON(dbPath, db.toDict(**kwargs))
 
 
+def iterJSONObject(dbFile : str, readSize : int = 1048576) -> Iterator[Tuple[str, object]]:
+    """Parse the JSON object stored in the given file one key-value pair at a time, reading the file in chunks.
+    Unlike readJSON, the whole file is never held in memory at once, and each value can be processed and discarded before the next is parsed.
+
+    :param str dbFile: Path to the file to read. The file must contain a single JSON object.
+    :param int readSize: The number of characters to read from the file at a time (Default 1048576)
+    :return: An iterator over the object's keys and parsed values, in the order they appear in the file
+    :rtype: Iterator[tuple[str, object]]
+    :raise json.JSONDecodeError: If the file does not contain a single valid JSON object
+    """
+    decoder = json.JSONDecoder()
+    whitespace = " \t\n\r"
+    f = open(dbFile, "r")
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def readMore() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = f.read(readSize)
+        if chunk == "":
+            eof = True
+            return False
+        # Drop everything already parsed, so that the buffer only ever holds around one record
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def nextChar() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in whitespace:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not readMore():
+                return ""
+
+    def decodeNext():
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof or not readMore():
+                    raise
+                continue
+            # A value which is not followed by a delimiter, such as a number at the end of the buffer, may have been cut short
+            delimiterPos = end
+            while delimiterPos < len(buffer) and buffer[delimiterPos] in whitespace:
+                delimiterPos += 1
+            if (delimiterPos == len(buffer) or buffer[delimiterPos] not in ",:}") and not eof and readMore():
+                continue
+            pos = end
+            return value
+
+    try:
+        if nextChar() != "{":
+            raise json.JSONDecodeError("Expecting '{'", buffer, pos)
+        pos += 1
+        if nextChar() == "}":
+            return
+        while True:
+            key = decodeNext()
+            if nextChar() != ":":
+                raise json.JSONDecodeError("Expecting ':' delimiter", buffer, pos)
+            pos += 1
+            nextChar()
+            yield key, decodeNext()
+            delimiter = nextChar()
+            pos += 1
+            if delimiter == "}":
+                return
+            if delimiter != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos - 1)
+            nextChar()
+    finally:
+        f.close()
+
+
+def readJSONRecordFiles(recordFiles : List[Tuple[str, str]]) -> List[Tuple[str, dict]]:
+    """Read and parse the given json or binary snapshot record files.
+    This is the unit of work sent to worker processes by iterJSONRecords, so must remain a module-level function.
+
+    :param list[tuple[str, str]] recordFiles: The key and file path of each record to read
+    :return: The key and parsed contents of each record, in the same order as recordFiles
+    :rtype: list[tuple[str, dict]]
+    """
+    return [(key, readSnapshot(recordPath) if recordPath.endswith(SNAPSHOT_EXTENSION) else readJSON(recordPath)) for key, recordPath in recordFiles]
+
+
+def iterJSONRecords(recordsDir : str, workers : int = 1, chunkSize : int = 256) -> Iterator[Tuple[str, dict]]:
+    """Read every json record file in the given directory, yielding each record's key and contents as it is parsed.
+    Each record is stored in its own file named after its key, e.g a record with key "1234" is stored in recordsDir/1234.json.
+    Records saved as binary snapshots, e.g recordsDir/1234.bbs, are also read.
+
+    When workers is greater than 1, record files are read and parsed by a pool of worker processes, in chunks of chunkSize files.
+    Only a few chunks are parsed ahead of the consumer, so that parsed records do not pile up in memory.
+    Worker processes are started with the spawn method rather than forked, as the calling process may be running other threads.
+    Spawned workers re-import the program's main module, so it must not start the bot when imported under a name other than __main__.
+    Parsed records are pickled back to the calling process, which costs a large part of the time saved by parsing in parallel,
+    so workers only help on large databases with several CPU cores free. See tools/recordLoadBenchmark.
+
+    :param str recordsDir: Path to the directory containing the record files
+    :param int workers: The number of worker processes to parse records with. 1 parses records in the calling process, with no worker processes. (Default 1)
+    :param int chunkSize: The number of record files to send to a worker process at a time (Default 256)
+    :return: An iterator over each record's key and its contents, parsed into a python dictionary
+    :rtype: Iterator[tuple[str, dict]]
+    """
+    recordPaths = {}
+    for fileName in os.listdir(recordsDir):
+        key, extension = os.path.splitext(fileName)
+        if extension == ".json" or extension == SNAPSHOT_EXTENSION:
+            recordPath = recordsDir + os.sep + fileName
+            # Only expected if the bot crashed part-way through saving a record in a new format, in which case the newest file is correct
+            if key in recordPaths and os.path.getmtime(recordPaths[key]) > os.path.getmtime(recordPath):
+                continue
+            recordPaths[key] = recordPath
+    recordFiles = list(recordPaths.items())
+    chunks = [recordFiles[chunkStart:chunkStart + chunkSize] for chunkStart in range(0, len(recordFiles), chunkSize)]
+
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from readJSONRecordFiles(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pending = deque()
+        nextChunk = 0
+        while nextChunk < len(chunks) or pending:
+            # Keep every worker busy, with one chunk waiting for each
+            while nextChunk < len(chunks) and len(pending) < workers * 2:
+                pending.append(executor.submit(readJSONRecordFiles, chunks[nextChunk]))
+                nextChunk += 1
+            yield from pending.popleft().result()
+
+
+def readJSONRecords(recordsDir : str) -> dict:
+    """Read every json record file in the given directory, and return the contents as a dictionary mapping record keys to record contents.
+    Each record is stored in its own file named after its key, e.g a record with key "1234" is stored in recordsDir/1234.json.
+    This is the reverse of writeJSONRecords.
+
+    :param str recordsDir: Path to the directory containing the record files
+    :return: A dictionary mapping each record's key to its contents, parsed into a python dictionary
+    :rtype: dict
+    """
+    return dict(iterJSONRecords(recordsDir))
+
+
+def recordDigest(record) -> int:
+    """Get a digest of the JSON serialisation of the given record, for cheaply checking whether a record has changed since it was last written.
+    Digests are only comparable within a single run of the bot.
+
+    :param record: The json-serializable record to digest
+    :return: A hash of record's JSON serialisation
+    :rtype: int
+    """
+    return hash(json.dumps(record))
+
+
+def writeJSONRecords(recordsDir : str, records : dict, removedKeys : List[str] = None, fsync=False, snapshotCompression=None,
+                        savedDigests : Dict[str, int] = None) -> Tuple[float, float]:
+    """Write each of the given json-serializable records to its own file in the given directory, and delete the files of any removed records.
+    Records not mentioned in records or removedKeys are left untouched.
+    If savedDigests is given, records whose recordDigest matches their digest in savedDigests are not rewritten, and savedDigests is updated
+    with the digests of the records written and removed.
+
+    :param str recordsDir: Path to the directory containing the record files. This is created if it does not exist.
+    :param dict records: A dictionary mapping string record keys to the json-serializable dictionaries to write
+    :param list[str] removedKeys: The keys of records whose files should be deleted, or None to delete no files (Default None)
+    :param bool fsync: When True, wait for each written file to be flushed to disk before moving on (Default False)
+    :param str snapshotCompression: None to write records as JSON, or the compression method to write binary snapshot records with. See writeDBFile. (Default None)
+    :param dict savedDigests: The digest of each record as it was last written, by record key, or None to write every record (Default None)
+    :return: The total time taken in seconds to serialise all records to JSON, and the total time taken in seconds to write and delete record files
+    :rtype: tuple[float, float]
+    """
+    serialiseTime, writeTime = 0, 0
+    if not os.path.isdir(recordsDir):
+        os.makedirs(recordsDir)
+    for key in records:
+        if savedDigests is not None:
+            digestStart = time.perf_counter()
+            digest = recordDigest(records[key])
+            serialiseTime += time.perf_counter() - digestStart
+            if savedDigests.get(key) == digest:
+                continue
+            savedDigests[key] = digest
+        recordSerialiseTime, recordWriteTime = writeDBFile(recordsDir + os.sep + key + ".json", records[key], snapshotCompression=snapshotCompression, fsync=fsync)
+        serialiseTime += recordSerialiseTime
+        writeTime += recordWriteTime
+    deleteStart = time.perf_counter()
+    for key in removedKeys or []:
+        if savedDigests is not None:
+            savedDigests.pop(key, None)
+        for recordPath in (recordsDir + os.sep + key + ".json", recordsDir + os.sep + key + SNAPSHOT_EXTENSION):
+            if os.path.isfile(recordPath):
+                os.remove(recordPath)
+    return serialiseTime, writeTime + time.perf_counter() - deleteStart
+
+
 async def saveDBAsync(dbPath : str, db, **kwargs):
     """This function should be used in place of saveDB for database objects whose toDict method is asynchronous.
     This function is currently unused.
@@ -0,0 +1,124 @@
+from typing import Any, Dict, Hashable, List, Set, Tuple
+from ..bbConfig import bbData
+
+
+def nGrams(name : str, n : int = 3) -> Set[str]:
+    """Split a name into the set of overlapping substrings of length n that it contains, ignoring casing.
+    The name is padded with a space at each end, so that its first and last characters form n-grams of their own.
+
+    :param str name: The name to split
+    :param int n: The length of each substring (Default 3)
+    :return: The set of n-grams in name
+    :rtype: set[str]
+    """
+    padded = " " + name.lower() + " "
+    return set(padded[start:start + n] for start in range(max(len(padded) - n + 1, 1)))
+
+
+class NGramIndex:
+    """An inverted index from n-grams to names, for finding names similar to a misspelled query.
+    Names are scored by the Dice coefficient of their n-grams with the query's: twice the number of shared n-grams,
+    divided by the total number of n-grams in both. Only names sharing at least one n-gram with the query are ever scored,
+    so searches do not need to compare the query with every name.
+
+    :var n: The length of each n-gram
+    :vartype n: int
+    :var names: The indexed names, in lower case. Names are referred to by their position in this list.
+    :vartype names: list[str]
+    :var nameValues: The values indexed under each name, in the same order as names
+    :vartype nameValues: list[list]
+    :var nameSizes: The number of n-grams in each name, in the same order as names
+    :vartype nameSizes: list[int]
+    :var nameIDs: Maps each name to its position in names
+    :vartype nameIDs: dict[str, int]
+    :var postings: Maps each n-gram to the positions in names of the names containing it
+    :vartype postings: dict[str, list[int]]
+    """
+
+    def __init__(self, n : int = 3):
+        """
+        :param int n: The length of each n-gram (Default 3)
+        """
+        self.n = n
+        self.names : List[str] = []
+        self.nameValues : List[list] = []
+        self.nameSizes : List[int] = []
+        self.nameIDs : Dict[str, int] = {}
+        self.postings : Dict[str, List[int]] = {}
+
+
+    def __len__(self) -> int:
+        """Get the number of distinct names in the index.
+
+        :return: The number of names indexed
+        :rtype: int
+        """
+        return len(self.names)
+
+
+    def add(self, name : str, value : Hashable):
+        """Index a value under the given name. Indexing the same value under the same name more than once has no effect.
+
+        :param str name: The name to index value under, in any casing
+        :param Hashable value: The value to return when name is similar to a query
+        """
+        name = name.lower()
+        if name in self.nameIDs:
+            if value not in self.nameValues[self.nameIDs[name]]:
+                self.nameValues[self.nameIDs[name]].append(value)
+            return
+
+        nameID = len(self.names)
+        self.nameIDs[name] = nameID
+        self.names.append(name)
+        self.nameValues.append([value])
+        grams = nGrams(name, self.n)
+        self.nameSizes.append(len(grams))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(nameID)
+
+
+    def search(self, query : str, maxResults : int = 3, minScore : float = 0.3, valueFilter = None) -> List[Tuple[Any, float]]:
+        """Find the values whose names are most similar to query.
+
+        :param str query: The name to search for, in any casing
+        :param int maxResults: The maximum number of values to return (Default 3)
+        :param float minScore: The lowest similarity score, between 0 and 1, for a name to be considered a match (Default 0.3)
+        :param valueFilter: A function taking a value and returning False if it should be left out of the results, or None to return all values (Default None)
+        :return: Up to maxResults distinct values and their similarity scores, most similar first.
+                    A value indexed under several similar names is returned once, with its highest score.
+        :rtype: list[tuple[Hashable, float]]
+        """
+        queryGrams = nGrams(query, self.n)
+        sharedGrams : Dict[int, int] = {}
+        for gram in queryGrams:
+            for nameID in self.postings.get(gram, ()):
+                sharedGrams[nameID] = sharedGrams.get(nameID, 0) + 1
+
+        bestScores : Dict[Hashable, float] = {}
+        for nameID, shared in sharedGrams.items():
+            score = 2 * shared / (len(queryGrams) + self.nameSizes[nameID])
+            if score < minScore:
+                continue
+            for value in self.nameValues[nameID]:
+                if (valueFilter is None or valueFilter(value)) and score > bestScores.get(value, 0):
+                    bestScores[value] = score
+
+        return sorted(bestScores.items(), key=lambda result: (-result[1], str(result[0])))[:maxResults]
+
+
+def didYouMean(name : str, objectTypes : List[str]) -> str:
+    """Suggest builtIn objects of the given types with names similar to a name which was not recognised, using bbData.builtInNameSearch.
+
+    :param str name: The unrecognised name
+    :param list[str] objectTypes: The types of object to suggest, as named in bbData.builtInAliasIndex, e.g "system"
+    :return: A new line asking whether the user meant any of the most similar objects, or an empty string if there are no similar objects
+    :rtype: str
+    """
+    suggestions = bbData.builtInNameSearch.search(name, valueFilter=lambda value: value[0] in objectTypes)
+    if not suggestions:
+        return ""
+    suggestionNames = ["**" + objectName + "**" for (objectType, objectName), score in suggestions]
+    if len(suggestionNames) == 1:
+        return "\nDid you mean " + suggestionNames[0] + "?"
+    return "\nDid you mean " + ", ".join(suggestionNames[:-1]) + " or " + suggestionNames[-1] + "?"
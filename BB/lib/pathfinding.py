@@ -3,38 +3,49 @@
 from __future__ import annotations
 from ..bbObjects.bounties import bbSystem
 import math
+import heapq
+import itertools
+from collections import deque
 from ..bbConfig import bbData
-from typing import Dict, List
-
-class AStarNode(bbSystem.System):
-    """A node for use in a* pathfinding.
-    TODO: Does this really need to extend bbSystem?
-
-    :var syst: this node's associated bbSystem object.
-    :vartype syst: bbSystem
-    :var parent: The previous AStarNode in the generated path
-    :vartype parent: AStarNode
-    :var g: The total distance travelled to get to this node
-    :vartype g: float
-    :var h: The estimated distance from this node to the nearest goal
-    :vartype h: float
-    :var f: The node's estimated "value" when picking the next node in the route, equal to g + h
-    :vartype f: float
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class PathNode:
+    """A system reached during an A* search, and the route taken to reach it.
+
+    :var systemName: The name of the system reached
+    :vartype systemName: str
+    :var parent: The PathNode of the previous system on the route, or None if this is the first system
+    :vartype parent: PathNode
+    :var g: The number of jumps taken to reach this system
+    :vartype g: int
     """
-    
-    def __init__(self, syst : bbSystem.System, parent : AStarNode, g : float = 0, h : float = 0):
+    __slots__ = ("systemName", "parent", "g")
+
+    def __init__(self, systemName : str, parent : PathNode, g : int):
         """
-        :param bbSystem syst: this node's associated bbSystem object.
-        :param AStarNode parent: The previous AStarNode in the generated path
-        :param float g: The total distance travelled to get to this node (Default 0)
-        :param float h: The estimated distance from this node to the nearest goal (Default 0)
-        :param float f: The node's estimated "value" when picking the next node in the route, equal to g + h (Default g + h)
+        :param str systemName: The name of the system reached
+        :param PathNode parent: The PathNode of the previous system on the route, or None if this is the first system
+        :param int g: The number of jumps taken to reach this system
         """
-        self.syst = syst
+        self.systemName = systemName
         self.parent = parent
         self.g = g
-        self.h = h
-        self.f = g + h
+
+
+    def route(self) -> List[str]:
+        """Get the names of the systems on the route taken to reach this node.
+
+        :return: The names of the systems on the route, where the first element is the start of the route and the last is this node's system
+        :rtype: list[str]
+        """
+        route = []
+        node = self
+        while node is not None:
+            route.append(node.systemName)
+            node = node.parent
+        route.reverse()
+        return route
 
 
 def heuristic(start : bbSystem.System, end : bbSystem.System) -> float:
@@ -48,71 +59,248 @@ def heuristic(start : bbSystem.System, end : bbSystem.System) -> float:
                     (end.coordinates[0] - start.coordinates[0]) ** 2)
 
 
-def bbAStar(start : bbSystem.System, end : bbSystem.System, graph : Dict[str, bbSystem.System]) -> List[str]:
+def longestJump(graph : Dict[str, bbSystem.System]) -> float:
+    """Find the longest straight-line distance between any two neighbouring systems in a graph.
+    No route can cover more than this distance per jump, so dividing the straight-line distance between two systems by it
+    gives an estimate of the number of jumps between them which is never too high. This keeps A* searches optimal.
+
+    :param dict[str, bbSystem] graph: A dictionary mapping system names to bbSystem objects
+    :return: The longest distance covered by a single jump, or 1 if no jumps are longer than 1
+    :rtype: float
+    """
+    return max([heuristic(system, graph[neighbourName]) for system in graph.values() for neighbourName in system.getNeighbours()] + [1])
+
+
+def findRoute(start : str, goals : Iterable[str], graph : Dict[str, bbSystem.System], jumpLength : float = None,
+        blockedSystems : Set[str] = set(), blockedJumps : Set[Tuple[str, str]] = set()) -> List[str]:
+    """Find the shortest route from the given start system to the nearest of the given goal systems, with an A* search.
+    Every jump is assumed to cost the same. Jumps are estimated by straight-line distance divided by the longest jump in the graph.
+
+    :param str start: The name of the system to start the route from
+    :param goals: The names of the systems the route may end at
+    :type goals: Iterable[str]
+    :param dict[str, bbSystem] graph: A dictionary mapping system names to bbSystem objects
+    :param float jumpLength: The longest straight-line distance covered by a jump in graph, as given by longestJump, or None to calculate it (Default None)
+    :param set[str] blockedSystems: The names of systems which the route may not pass through (Default set())
+    :param set[tuple[str, str]] blockedJumps: Pairs of system names, the first of which the route may not jump directly to the second from (Default set())
+    :return: The names of the systems on the shortest route, where the first element is start and the last is the nearest goal, or None if no goal can be reached
+    :rtype: list[str]
+    """
+    goalSystems = [graph[goal] for goal in goals]
+    goalNames = set(goal.name for goal in goalSystems)
+    if not goalNames:
+        return None
+    if jumpLength is None:
+        jumpLength = longestJump(graph)
+
+    def estimate(systemName : str) -> float:
+        return min(heuristic(graph[systemName], goal) for goal in goalSystems) / jumpLength
+
+    # Heap entries are (estimated route length, tie breaker, node). The tie breaker keeps the heap from comparing nodes.
+    tieBreaker = itertools.count()
+    openHeap = [(estimate(start), next(tieBreaker), PathNode(start, None, 0))]
+    bestJumps = {start: 0}
+    closed : Dict[str, PathNode] = {}
+
+    while openHeap:
+        node = heapq.heappop(openHeap)[2]
+        if node.systemName in closed:
+            continue
+        if node.systemName in goalNames:
+            return node.route()
+        closed[node.systemName] = node
+
+        jumps = node.g + 1
+        for neighbourName in graph[node.systemName].getNeighbours():
+            if neighbourName in closed or neighbourName in blockedSystems or (node.systemName, neighbourName) in blockedJumps:
+                continue
+            if neighbourName not in bestJumps or jumps < bestJumps[neighbourName]:
+                bestJumps[neighbourName] = jumps
+                heapq.heappush(openHeap, (jumps + estimate(neighbourName), next(tieBreaker), PathNode(neighbourName, node, jumps)))
+
+    return None
+
+
+def kShortestRoutes(start : str, end : str, graph : Dict[str, bbSystem.System], k : int) -> List[List[str]]:
+    """Find the k shortest routes from start to end which do not visit any system more than once, using Yen's algorithm.
+    Each route after the first is found by following a shorter route part of the way, and then searching for the rest of the route
+    while blocking the jumps taken by the shorter routes at that point.
+
+    :param str start: The name of the system to start the routes from
+    :param str end: The name of the system to end the routes at
+    :param dict[str, bbSystem] graph: A dictionary mapping system names to bbSystem objects
+    :param int k: The maximum number of routes to find
+    :return: Up to k distinct routes from start to end, shortest first. Each route is a list of system names, as given by findRoute.
+    :rtype: list[list[str]]
+    """
+    jumpLength = longestJump(graph)
+    shortestRoute = findRoute(start, [end], graph, jumpLength=jumpLength)
+    if shortestRoute is None or k < 1:
+        return []
+
+    routes = [shortestRoute]
+    routesFound = {tuple(shortestRoute)}
+    # Heap entries are (route length, tie breaker, route)
+    tieBreaker = itertools.count()
+    candidates = []
+
+    while len(routes) < k:
+        previousRoute = routes[-1]
+        for spurIndex in range(len(previousRoute) - 1):
+            rootRoute = previousRoute[:spurIndex + 1]
+            blockedJumps = set((route[spurIndex], route[spurIndex + 1]) for route in routes if len(route) > spurIndex + 1 and route[:spurIndex + 1] == rootRoute)
+            spurRoute = findRoute(rootRoute[-1], [end], graph, jumpLength=jumpLength, blockedSystems=set(rootRoute[:-1]), blockedJumps=blockedJumps)
+            if spurRoute is not None:
+                candidate = rootRoute[:-1] + spurRoute
+                if tuple(candidate) not in routesFound:
+                    routesFound.add(tuple(candidate))
+                    heapq.heappush(candidates, (len(candidate), next(tieBreaker), candidate))
+
+        if not candidates:
+            break
+        routes.append(heapq.heappop(candidates)[2])
+
+    return routes
+
+
+def bbAStar(start : str, end : str, graph : Dict[str, bbSystem.System]) -> List[str]:
     """Find the shortest path from the given start bbSystem to the end bbSystem, using the given graph for edges.
     If no route can be found, the string "! " + start + " -> " + end is returned.
-    If the max route length (50) is reached, "#" is returned.
 
-    :param bbSystem start: The starting system for route generation
-    :param bbSystem end: The goal system where route generation terminates
+    :param str start: The name of the starting system for route generation
+    :param str end: The name of the goal system where route generation terminates
     :param dict[str, bbSystem] graph: A dictionary mapping system names to bbSystem objects
     :return: A list containing string system names representing the shortest route from start (the first element) to end (the last element)
     :rtype: list
     """
+    route = findRoute(start, [end], graph)
+    return route if route is not None else "! " + start + " -> " + end
+
+
+class RouteTable:
+    """A precomputed table of the shortest routes between every pair of systems in a graph, for looking up routes in time proportional to their length.
+    The table is built by a breadth first search from every system, recording the predecessor of each system reached on the shortest route from the source.
+    As every jump costs the same, breadth first search finds routes with the fewest jumps, the same as those found by bbAStar.
+
+    :var graph: The names of the neighbours of each system in the graph the table was built from, by system name
+    :vartype graph: dict[str, list[str]]
+    :var systemNames: The names of all systems in the graph. Systems are referred to by their position in this list.
+    :vartype systemNames: list[str]
+    :var systemIDs: Maps each system name to its position in systemNames
+    :vartype systemIDs: dict[str, int]
+    :var predecessors: predecessors[source][target] is the ID of the system before target on the shortest route from source to target,
+                        or -1 if target is source, or cannot be reached from source
+    :vartype predecessors: list[list[int]]
+    """
+
+    def __init__(self, graph : Dict[str, List[str]], predecessors : List[List[int]] = None):
+        """
+        :param dict[str, list[str]] graph: The names of the neighbours of each system, by system name
+        :param list[list[int]] predecessors: A predecessor matrix previously built for graph, as given by toDict, or None to build one (Default None)
+        """
+        self.graph = graph
+        self.systemNames = list(graph.keys())
+        self.systemIDs = {systemName: systemID for systemID, systemName in enumerate(self.systemNames)}
+        self.predecessors = predecessors if predecessors is not None else [self.searchFrom(sourceID) for sourceID in range(len(self.systemNames))]
+
+
+    def searchFrom(self, sourceID : int) -> List[int]:
+        """Breadth first search the graph from a single system, finding the predecessor of every system on its shortest route from the source.
+
+        :param int sourceID: The ID of the system to search from
+        :return: The ID of the system before each system on its shortest route from the source, or -1 for the source and systems which cannot be reached
+        :rtype: list[int]
+        """
+        sourcePredecessors = [-1] * len(self.systemNames)
+        visited = [False] * len(self.systemNames)
+        visited[sourceID] = True
+        frontier = deque([sourceID])
+        while frontier:
+            currentID = frontier.popleft()
+            for neighbourName in self.graph[self.systemNames[currentID]]:
+                neighbourID = self.systemIDs[neighbourName]
+                if not visited[neighbourID]:
+                    visited[neighbourID] = True
+                    sourcePredecessors[neighbourID] = currentID
+                    frontier.append(neighbourID)
+        return sourcePredecessors
 
-    if start == end:
-        return [start]
-    open = [AStarNode(graph[start], None, h=heuristic(graph[start], graph[end]))]
-    closed = []
-    count = 0
-
-    while open:
-        q = open.pop(0)
-
-        count += 1
-        if count == 50:
-            return "#"
-        for succName in q.syst.getNeighbours():
-            if succName == end:
-                closed.append(AStarNode(graph[succName], q))
-                route = []
-                node = closed[-1]
-                while node:
-                    route.append(node.syst.name)
-                    node = node.parent
-                return route[::-1]
-
-            succ = AStarNode(graph[succName], q)
-            succ.g = q.g + 1
-            succ.h = heuristic(succ.syst, graph[end])
-            succ.f = succ.g + succ.h
-
-            betterFound = False
-            for existingNode in open + closed:
-                if existingNode.syst.coordinates == succ.syst.coordinates and existingNode.f <= succ.f:
-                    betterFound = True
-            if betterFound:
-                continue
 
-            insertPos = len(open)
-            for i in range(len(open)):
-                if open[i].f > succ.f:
-                    if i != 0:
-                        insertPos = i -1
-                    break
-            open.insert(insertPos, succ)
+    def route(self, start : str, end : str) -> List[str]:
+        """Look up the shortest route between two systems in the table.
 
-        closed.append(q)
+        :param str start: The name of the system to start the route from
+        :param str end: The name of the system to end the route at
+        :return: The names of the systems on the route, where the first element is start and the last is end, or None if end cannot be reached from start
+        :rtype: list[str]
+        :raise KeyError: If either system is not in the table
+        """
+        sourcePredecessors = self.predecessors[self.systemIDs[start]]
+        currentID = self.systemIDs[end]
+        if start == end:
+            return [start]
+        if sourcePredecessors[currentID] == -1:
+            return None
+        route = []
+        while currentID != -1:
+            route.append(self.systemNames[currentID])
+            currentID = sourcePredecessors[currentID]
+        route.reverse()
+        return route
 
-    return "! " + start + " -> " + end
+
+    def isBuiltFrom(self, graph : Dict[str, List[str]]) -> bool:
+        """Decide whether this table was built from the given graph, and so can be used to find routes through it.
+
+        :param dict[str, list[str]] graph: The names of the neighbours of each system, by system name
+        :return: True if graph has exactly the same systems and neighbours, in the same order, as the graph this table was built from, False otherwise
+        :rtype: bool
+        """
+        return list(graph.items()) == list(self.graph.items())
+
+
+    def toDict(self, **kwargs) -> dict:
+        """Serialize this table into dictionary format, for caching to file.
+
+        :return: A dictionary containing the graph and predecessor matrix of this table
+        :rtype: dict
+        """
+        return {"graph": self.graph, "predecessors": self.predecessors}
+
+
+    @classmethod
+    def fromDict(cls, tableDict : dict, **kwargs) -> RouteTable:
+        """Factory function reconstructing a RouteTable from its dictionary representation - the opposite of RouteTable.toDict.
+        The routes are not recalculated, so use isBuiltFrom to check that the table is still valid for the current graph.
+
+        :param dict tableDict: A dictionary containing the graph and predecessor matrix of a table, as given by toDict
+        :return: A new RouteTable as described by tableDict
+        :rtype: RouteTable
+        """
+        return RouteTable(tableDict["graph"], predecessors=tableDict["predecessors"])
+
+
+def systemGraph(systems : Dict[str, bbSystem.System]) -> Dict[str, List[str]]:
+    """Get the names of the neighbours of each of the given systems, for building a RouteTable.
+
+    :param dict[str, bbSystem] systems: A dictionary mapping system names to bbSystem objects
+    :return: The names of the neighbours of each system, by system name
+    :rtype: dict[str, list[str]]
+    """
+    return {systemName: list(system.getNeighbours()) for systemName, system in systems.items()}
 
 
 def makeRoute(start : str, end : str) -> List[str]:
     """Find the shortest route between two systems.
+    Routes are looked up in bbData.routeTable once it has been built on startup. Until then, they are found with bbAStar.
+    If no route can be found, the string "! " + start + " -> " + end is returned.
 
     :param str start: string name of the starting system. Must exist in bbData.builtInSystemObjs
     :param str end: string name of the target system. Must exist in bbData.builtInSystemObjs
     :return: list of string system names where the first element is start, the last element is end, and all intermediary systems are adjacent
     :rtype: list[str]
     """
-    return bbAStar(start, end, bbData.builtInSystemObjs)
\ No newline at end of file
+    if bbData.routeTable is None:
+        return bbAStar(start, end, bbData.builtInSystemObjs)
+    route = bbData.routeTable.route(start, end)
+    return route if route is not None else "! " + start + " -> " + end
@@ -0,0 +1,230 @@
+import time
+from typing import Dict, Hashable, Tuple
+
+
+class TokenBucket:
+    """A bucket of tokens which refills at a constant rate, up to a maximum capacity.
+    Actions are allowed while the bucket holds enough tokens to pay their cost, allowing short bursts of up to capacity tokens,
+    while limiting the long-term rate of actions to refillPerSecond tokens per second.
+    Tokens are refilled lazily, whenever the bucket is inspected.
+
+    :var capacity: The maximum number of tokens the bucket can hold
+    :vartype capacity: float
+    :var refillPerSecond: The number of tokens added to the bucket every second
+    :vartype refillPerSecond: float
+    :var tokens: The number of tokens in the bucket at lastUpdate
+    :vartype tokens: float
+    :var lastUpdate: The time.monotonic time at which tokens was last refilled
+    :vartype lastUpdate: float
+    """
+
+    def __init__(self, capacity : float, refillPerSecond : float, now : float = None):
+        """
+        :param float capacity: The maximum number of tokens the bucket can hold. The bucket starts full.
+        :param float refillPerSecond: The number of tokens added to the bucket every second
+        :param float now: The current time.monotonic time, or None to read the clock (Default None)
+        """
+        self.capacity = capacity
+        self.refillPerSecond = refillPerSecond
+        self.tokens = capacity
+        self.lastUpdate = time.monotonic() if now is None else now
+
+
+    def refill(self, now : float):
+        """Add the tokens refilled since the bucket was last refilled.
+
+        :param float now: The current time.monotonic time
+        """
+        if now > self.lastUpdate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.lastUpdate) * self.refillPerSecond)
+            self.lastUpdate = now
+
+
+    def timeUntilAvailable(self, cost : float, now : float) -> float:
+        """Find how long it will be until the bucket holds enough tokens to pay the given cost.
+        Costs larger than the bucket's capacity are treated as costing the full capacity.
+
+        :param float cost: The number of tokens required
+        :param float now: The current time.monotonic time
+        :return: The number of seconds until cost tokens are available, or 0 if they are available now
+        :rtype: float
+        """
+        self.refill(now)
+        return max(0, (min(cost, self.capacity) - self.tokens) / self.refillPerSecond)
+
+
+    def consume(self, cost : float, now : float):
+        """Remove tokens from the bucket. The tokens must be available, according to timeUntilAvailable.
+
+        :param float cost: The number of tokens to remove
+        :param float now: The current time.monotonic time
+        """
+        self.refill(now)
+        self.tokens -= min(cost, self.capacity)
+
+
+    def isFull(self, now : float) -> bool:
+        """Decide whether the bucket has refilled to its capacity. A full bucket is indistinguishable from a new one.
+
+        :param float now: The current time.monotonic time
+        :return: True if the bucket holds capacity tokens, False otherwise
+        :rtype: bool
+        """
+        self.refill(now)
+        return self.tokens >= self.capacity
+
+
+class TokenBucketPool:
+    """A collection of TokenBucket with the same capacity and refill rate, one for each key, such as a user or guild ID.
+    Buckets are created on first use. Buckets which have refilled to full capacity are indistinguishable from new ones,
+    so they can be evicted with evictIdle without affecting rate limiting, keeping memory use proportional to the number of recently active keys.
+
+    :var capacity: The capacity of each bucket
+    :vartype capacity: float
+    :var refillPerSecond: The number of tokens added to each bucket every second
+    :vartype refillPerSecond: float
+    :var buckets: The buckets in the pool, by key
+    :vartype buckets: dict[Hashable, TokenBucket]
+    """
+
+    def __init__(self, capacity : float, refillPerSecond : float):
+        """
+        :param float capacity: The capacity of each bucket
+        :param float refillPerSecond: The number of tokens added to each bucket every second
+        """
+        self.capacity = capacity
+        self.refillPerSecond = refillPerSecond
+        self.buckets : Dict[Hashable, TokenBucket] = {}
+
+
+    def __len__(self) -> int:
+        """Get the number of buckets currently in the pool.
+
+        :return: The number of buckets in the pool
+        :rtype: int
+        """
+        return len(self.buckets)
+
+
+    def getBucket(self, key : Hashable, now : float) -> TokenBucket:
+        """Get the bucket for the given key, creating a full one if the key has no bucket.
+
+        :param Hashable key: The key whose bucket to get
+        :param float now: The current time.monotonic time
+        :return: The bucket for key
+        :rtype: TokenBucket
+        """
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(self.capacity, self.refillPerSecond, now=now)
+        return self.buckets[key]
+
+
+    def evictIdle(self, now : float) -> int:
+        """Remove all buckets which have refilled to full capacity.
+
+        :param float now: The current time.monotonic time
+        :return: The number of buckets removed
+        :rtype: int
+        """
+        idleKeys = [key for key, bucket in self.buckets.items() if bucket.isFull(now)]
+        for key in idleKeys:
+            del self.buckets[key]
+        return len(idleKeys)
+
+
+class CommandRateLimiter:
+    """Limits the rate at which commands can be called, with separate token buckets for each user and guild, and a single global bucket.
+    A command call must be paid for from all three buckets at once. If any of them cannot pay, the call is refused and nothing is consumed.
+
+    :var userBuckets: The bucket of each user who has recently called a command
+    :vartype userBuckets: TokenBucketPool
+    :var guildBuckets: The bucket of each guild in which a command has recently been called
+    :vartype guildBuckets: TokenBucketPool
+    :var globalBucket: The bucket shared by all command calls
+    :vartype globalBucket: TokenBucket
+    :var evictionIntervalSeconds: The minimum number of seconds between evictions of idle user and guild buckets
+    :vartype evictionIntervalSeconds: float
+    :var lastEviction: The time.monotonic time at which idle buckets were last evicted
+    :vartype lastEviction: float
+    :var cooldownsNotified: The time.monotonic times at which users who have been told they are rate limited will be able to call commands again
+    :vartype cooldownsNotified: dict[int, float]
+    """
+
+    def __init__(self, userCapacity : float, userRefillPerSecond : float, guildCapacity : float, guildRefillPerSecond : float,
+            globalCapacity : float, globalRefillPerSecond : float, evictionIntervalSeconds : float = 60):
+        """
+        :param float userCapacity: The capacity of each user's bucket
+        :param float userRefillPerSecond: The number of tokens added to each user's bucket every second
+        :param float guildCapacity: The capacity of each guild's bucket
+        :param float guildRefillPerSecond: The number of tokens added to each guild's bucket every second
+        :param float globalCapacity: The capacity of the global bucket
+        :param float globalRefillPerSecond: The number of tokens added to the global bucket every second
+        :param float evictionIntervalSeconds: The minimum number of seconds between evictions of idle user and guild buckets (Default 60)
+        """
+        self.userBuckets = TokenBucketPool(userCapacity, userRefillPerSecond)
+        self.guildBuckets = TokenBucketPool(guildCapacity, guildRefillPerSecond)
+        self.globalBucket = TokenBucket(globalCapacity, globalRefillPerSecond)
+        self.evictionIntervalSeconds = evictionIntervalSeconds
+        self.lastEviction = time.monotonic()
+        self.cooldownsNotified : Dict[int, float] = {}
+
+
+    def tryCall(self, userID : int, guildID : int, cost : float) -> Tuple[float, str]:
+        """Attempt to pay for a command call from the calling user's, guild's and global buckets.
+        If enough time has passed since the last eviction, idle buckets are evicted first.
+
+        :param int userID: The ID of the user calling the command
+        :param int guildID: The ID of the guild the command is being called in, or None if it is being called from DMs
+        :param float cost: The number of tokens the command costs
+        :return: 0 and None if the call was paid for. Otherwise, the number of seconds until it could be, and the name of the bucket
+                    which refused it for longest: "user", "guild" or "global"
+        :rtype: tuple[float, str]
+        """
+        now = time.monotonic()
+        if now - self.lastEviction >= self.evictionIntervalSeconds:
+            self.evictIdle(now)
+
+        buckets = {"user": self.userBuckets.getBucket(userID, now), "global": self.globalBucket}
+        if guildID is not None:
+            buckets["guild"] = self.guildBuckets.getBucket(guildID, now)
+
+        waitSeconds, limitingBucket = 0, None
+        for bucketName, bucket in buckets.items():
+            bucketWait = bucket.timeUntilAvailable(cost, now)
+            if bucketWait > waitSeconds:
+                waitSeconds, limitingBucket = bucketWait, bucketName
+        if waitSeconds == 0:
+            for bucket in buckets.values():
+                bucket.consume(cost, now)
+            self.cooldownsNotified.pop(userID, None)
+        return waitSeconds, limitingBucket
+
+
+    def shouldNotify(self, userID : int, waitSeconds : float) -> bool:
+        """Decide whether a user whose call was refused should be told about their cooldown.
+        Users are only told once per cooldown, so that spamming commands does not also spam cooldown messages.
+
+        :param int userID: The ID of the user whose call was refused
+        :param float waitSeconds: The number of seconds until the user's call could be paid for, as given by tryCall
+        :return: True if the user has not already been told about this cooldown, False otherwise
+        :rtype: bool
+        """
+        now = time.monotonic()
+        if userID in self.cooldownsNotified and self.cooldownsNotified[userID] > now:
+            return False
+        self.cooldownsNotified[userID] = now + waitSeconds
+        return True
+
+
+    def evictIdle(self, now : float = None):
+        """Remove all user and guild buckets which have refilled to full capacity, and all expired cooldown notifications.
+
+        :param float now: The current time.monotonic time, or None to read the clock (Default None)
+        """
+        if now is None:
+            now = time.monotonic()
+        self.userBuckets.evictIdle(now)
+        self.guildBuckets.evictIdle(now)
+        for userID in [userID for userID, cooldownEnd in self.cooldownsNotified.items() if cooldownEnd <= now]:
+            del self.cooldownsNotified[userID]
+        self.lastEviction = now
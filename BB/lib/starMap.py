@@ -0,0 +1,48 @@
+from __future__ import annotations
+from typing import Dict
+from ..bbObjects.bounties import bbSystem
+
+
+class StarMap:
+    """An index of system IDs, coordinates and jump gate systems, built once from the map so that bounty generation and make-route
+    do not have to scan every bbSystem object.
+    Each system is given an integer ID, its position in systemNames, and system coordinates are stored in a single list by ID.
+    Hop distances and routes between systems are not stored here, and should instead be looked up in a lib.pathfinding.RouteTable.
+
+    :var systemNames: The names of all systems in the map. Systems are referred to by their position in this list.
+    :vartype systemNames: list[str]
+    :var systemIDs: Maps each system name to its position in systemNames
+    :vartype systemIDs: dict[str, int]
+    :var coordinates: The coordinates of each system, by ID
+    :vartype coordinates: list[tuple[int, int]]
+    :var jumpGateSystems: The names of all systems with at least one neighbour
+    :vartype jumpGateSystems: list[str]
+    """
+
+    def __init__(self, systems : Dict[str, bbSystem.System]):
+        """
+        :param dict[str, bbSystem] systems: A dictionary mapping system names to bbSystem objects
+        """
+        self.systemNames = list(systems.keys())
+        self.systemIDs = {systemName: systemID for systemID, systemName in enumerate(self.systemNames)}
+        self.coordinates = [tuple(system.coordinates) for system in systems.values()]
+        self.jumpGateSystems = [systemName for systemName, system in systems.items() if system.hasJumpGate()]
+
+
+    def nearestJumpGateSystem(self, systemName : str) -> str:
+        """Find the system with a jump gate which is closest in straight-line distance to the given system, other than the system itself.
+
+        :param str systemName: The name of the system to search around
+        :return: The name of the nearest other system with a jump gate, or None if there are no other systems with jump gates
+        :rtype: str
+        """
+        x, y = self.coordinates[self.systemIDs[systemName]]
+        nearestGate, nearestDistance = None, None
+        for gateName in self.jumpGateSystems:
+            if gateName == systemName:
+                continue
+            gateX, gateY = self.coordinates[self.systemIDs[gateName]]
+            distance = (gateX - x) ** 2 + (gateY - y) ** 2
+            if nearestDistance is None or distance < nearestDistance:
+                nearestGate, nearestDistance = gateName, distance
+        return nearestGate
@@ -3,7 +3,7 @@ from . import ReactionMenu
 from ..bbConfig import bbConfig
 from .. import bbGlobals, lib
 from discord import Colour, Emoji, PartialEmoji, Message, Embed, User, Member, Role
-from datetime import datetime
+from datetime import datetime, timedelta
 from ..scheduling import TimedTask
 from ..logging import bbLogger
 from typing import Dict, Union, TYPE_CHECKING
@@ -23,6 +23,7 @@ async def printAndExpirePollResults(msgID : int):
 
     if menu.owningBBUser is not None:
         menu.owningBBUser.pollOwned = False
+        bbGlobals.usersDB.markDirty(menu.owningBBUser.id)
 
     maxOptionLen = 0
     
@@ -202,7 +203,8 @@ class ReactionPollMenu(ReactionMenu.ReactionMenu):
 
         timeoutTT = None
         if "timeout" in rmDict:
-            expiryTime = datetime.utcfromtimestamp(rmDict["timeout"])
+            expiryTime = TimedTask.catchUpExpiryTime(datetime.utcfromtimestamp(rmDict["timeout"]), timedelta(0), False,
+                                                        policy=bbConfig.timedTaskCatchUpPolicy, spreadSeconds=bbConfig.timedTaskCatchUpSpreadSeconds)
             bbGlobals.reactionMenusTTDB.scheduleTask(TimedTask.TimedTask(expiryTime=expiryTime, expiryFunction=printAndExpirePollResults, expiryFunctionArgs=msg.id))
 
         return ReactionPollMenu(msg, options, timeoutTT, multipleChoice=rmDict["multipleChoice"] if "multipleChoice" in rmDict else False,
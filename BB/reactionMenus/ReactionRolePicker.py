@@ -4,7 +4,7 @@ from . import ReactionMenu
 from ..bbConfig import bbConfig
 from .. import bbGlobals, lib
 from discord import Colour, NotFound, HTTPException, Forbidden, Guild, Role, Message, User
-from datetime import datetime
+from datetime import datetime, timedelta
 from ..scheduling import TimedTask
 from typing import List, Union, Dict
 
@@ -159,7 +159,8 @@ class ReactionRolePicker(ReactionMenu.ReactionMenu):
 
         timeoutTT = None
         if "timeout" in rmDict:
-            expiryTime = datetime.utcfromtimestamp(rmDict["timeout"])
+            expiryTime = TimedTask.catchUpExpiryTime(datetime.utcfromtimestamp(rmDict["timeout"]), timedelta(0), False,
+                                                        policy=bbConfig.timedTaskCatchUpPolicy, spreadSeconds=bbConfig.timedTaskCatchUpSpreadSeconds)
             bbGlobals.reactionMenusTTDB.scheduleTask(TimedTask.TimedTask(expiryTime=expiryTime, expiryFunction=ReactionMenu.markExpiredMenu, expiryFunctionArgs=msg.id))
 
 
@@ -3,7 +3,72 @@ from __future__ import annotations
 
 from datetime import date, datetime, timedelta
 import inspect
+import random
 from types import FunctionType
+from typing import Dict
+
+
+# The naive UTC datetime which saved task times are measured from
+EPOCH = datetime(1970, 1, 1)
+
+# Functions which can be saved to file as a TimedTask's expiryFunction, by their registry keys. Add to this with registerExpiryFunction.
+expiryFunctionRegistry : Dict[str, FunctionType] = {}
+
+# The ways to handle a saved task whose expiry time passed while the bot was offline, when it is restored:
+# "fire" expires the task as soon as possible, "skip" moves autorescheduling tasks on to their next expiry time after now without expiring them,
+# and "spread" expires the task at a random time over the following catch-up period, to avoid bursts of expiring tasks after a restart.
+CATCH_UP_POLICIES = ["fire", "skip", "spread"]
+
+
+def registerExpiryFunction(key : str, expiryFunction : FunctionType):
+    """Allow TimedTasks with the given expiry function to be saved to file, and restored with TimedTask.fromDict.
+
+    :param str key: A unique, unchanging name to save the function as
+    :param function expiryFunction: The function to register
+    :raise KeyError: When a different function is already registered with the given key
+    """
+    if key in expiryFunctionRegistry and expiryFunctionRegistry[key] != expiryFunction:
+        raise KeyError("An expiry function is already registered with key '" + key + "'")
+    expiryFunctionRegistry[key] = expiryFunction
+
+
+def expiryFunctionKey(expiryFunction : FunctionType) -> str:
+    """Find the registry key of a function registered with registerExpiryFunction.
+
+    :param function expiryFunction: The function to look up
+    :return: The key that expiryFunction is registered with, or None if it is not registered
+    :rtype: str
+    """
+    for key, registeredFunction in expiryFunctionRegistry.items():
+        if registeredFunction == expiryFunction:
+            return key
+    return None
+
+
+def catchUpExpiryTime(expiryTime : datetime, expiryDelta : timedelta, autoReschedule : bool, policy : str = "fire", spreadSeconds : float = 0) -> datetime:
+    """Decide when a restored task should expire, according to a catch-up policy from CATCH_UP_POLICIES.
+    Tasks whose expiry time has not yet passed keep their expiry time.
+
+    :param datetime.datetime expiryTime: The task's saved expiry time
+    :param datetime.timedelta expiryDelta: The time between the task's expiries, if it autoreschedules
+    :param bool autoReschedule: Whether or not the task autoreschedules. "skip" is treated as "fire" for tasks which do not, as they must still expire.
+    :param str policy: The catch-up policy to apply if expiryTime has passed (Default "fire")
+    :param float spreadSeconds: The length in seconds of the period to spread overdue tasks over, with the "spread" policy (Default 0)
+    :return: The time that the restored task should expire
+    :rtype: datetime.datetime
+    :raise ValueError: When given an unknown catch-up policy
+    """
+    if policy not in CATCH_UP_POLICIES:
+        raise ValueError("Unknown catch-up policy: " + str(policy))
+    now = datetime.utcnow()
+    if expiryTime > now:
+        return expiryTime
+    if policy == "skip" and autoReschedule and expiryDelta > timedelta(0):
+        return expiryTime + expiryDelta * ((now - expiryTime) // expiryDelta + 1)
+    if policy == "spread" and spreadSeconds > 0:
+        return now + timedelta(seconds=random.uniform(0, spreadSeconds))
+    return expiryTime
+
 
 
 class TimedTask:
@@ -32,6 +97,10 @@ class TimedTask:
     :vartype gravestone: bool
     :var asyncExpiryFunction: whether or not the expiryFunction is a coroutine and needs to be awaited
     :vartype asyncExpiryFunction: bool
+    :var heap: The TimedTaskHeap that this task is scheduled on, to be informed of changes to the task's expiry time. None if the task is not on a heap.
+    :vartype heap: TimedTaskHeap
+    :var forcingExpiry: True while forceExpire is calling this task's expiry function, during which the task cannot be expired by any other check
+    :vartype forcingExpiry: bool
     """
 
     def __init__(self, issueTime : datetime = None, expiryTime : datetime = None, expiryDelta : timedelta = None,
@@ -68,6 +137,11 @@ class TimedTask:
         # Track whether or not the expiryFunction is a coroutine and needs to be awaited
         self.asyncExpiryFunction = inspect.iscoroutinefunction(expiryFunction)
 
+        # Set by TimedTaskHeap.scheduleTask
+        self.heap = None
+        # True while forceExpire is calling the expiry function
+        self.forcingExpiry = False
+
 
     
     def __lt__(self, other : TimedTask) -> bool:
@@ -126,6 +200,79 @@ class TimedTask:
 
     
     
+    def updateHeap(self):
+        """Inform the heap this task is scheduled on, if any, of a change to the task's expiry time or gravestone.
+        Gravestoned tasks are removed from the heap, and other tasks are moved to the correct position for their new expiry time.
+        """
+        if self.heap is not None:
+            if self.gravestone:
+                self.heap.removeTask(self)
+            else:
+                self.heap.updateTask(self)
+
+
+    def toDict(self, **kwargs) -> dict:
+        """Serialize this task's schedule to a dictionary, to be saved to file.
+        The expiry function is only included if it has been registered with registerExpiryFunction. Expiry function args are not included.
+
+        :return: A dictionary containing this task's issue and expiry times, expiryDelta, autoReschedule, and expiry function registry key
+        :rtype: dict
+        """
+        data = {"issueTime": (self.issueTime - EPOCH).total_seconds(), "expiryTime": (self.expiryTime - EPOCH).total_seconds(),
+                "expiryDelta": self.expiryDelta.total_seconds(), "autoReschedule": self.autoReschedule}
+        if self.hasExpiryFunction:
+            key = expiryFunctionKey(self.expiryFunction)
+            if key is not None:
+                data["expiryFunction"] = key
+        return data
+
+
+    def restoreSchedule(self, taskDict : dict, catchUpPolicy : str = "fire", catchUpSpreadSeconds : float = 0):
+        """Move this task to the issue and expiry times saved in taskDict by toDict, applying a catch-up policy if the expiry time has passed.
+        The task's expiryDelta is not changed.
+
+        :param dict taskDict: A dictionary-serialized TimedTask, as given by toDict
+        :param str catchUpPolicy: How to handle an expiry time which has already passed, from CATCH_UP_POLICIES (Default "fire")
+        :param float catchUpSpreadSeconds: The length in seconds of the period to spread overdue tasks over, with the "spread" policy (Default 0)
+        """
+        self.issueTime = EPOCH + timedelta(seconds=taskDict["issueTime"])
+        self.expiryTime = catchUpExpiryTime(EPOCH + timedelta(seconds=taskDict["expiryTime"]), self.expiryDelta, self.autoReschedule,
+                                            policy=catchUpPolicy, spreadSeconds=catchUpSpreadSeconds)
+        self.gravestone = False
+        self.updateHeap()
+
+
+    @classmethod
+    def fromDict(cls, taskDict : dict, **kwargs) -> TimedTask:
+        """Construct a TimedTask from its dictionary-serialized representation - the opposite of TimedTask.toDict
+
+        :param dict taskDict: A dictionary-serialized TimedTask, as given by toDict
+        :param function expiryFunction: The task's expiry function. (Default the function registered with the key saved in taskDict, or None if there is no key)
+        :param expiryFunctionArgs: The data to pass to the expiryFunction. (Default {})
+        :param str catchUpPolicy: How to handle an expiry time which has already passed, from CATCH_UP_POLICIES (Default "fire")
+        :param float catchUpSpreadSeconds: The length in seconds of the period to spread overdue tasks over, with the "spread" policy (Default 0)
+        :return: A new TimedTask as described by taskDict. The task is not scheduled onto any heap.
+        :rtype: TimedTask
+        :raise KeyError: When taskDict names an expiry function that has not been registered, and no expiryFunction is given
+        """
+        if "expiryFunction" in kwargs:
+            expiryFunction = kwargs["expiryFunction"]
+        elif "expiryFunction" in taskDict:
+            if taskDict["expiryFunction"] not in expiryFunctionRegistry:
+                raise KeyError("Unknown expiry function registry key: " + str(taskDict["expiryFunction"]))
+            expiryFunction = expiryFunctionRegistry[taskDict["expiryFunction"]]
+        else:
+            expiryFunction = None
+
+        newTask = TimedTask(expiryDelta=timedelta(seconds=taskDict["expiryDelta"]), expiryFunction=expiryFunction,
+                            expiryFunctionArgs=kwargs["expiryFunctionArgs"] if "expiryFunctionArgs" in kwargs else {},
+                            autoReschedule=taskDict["autoReschedule"] if "autoReschedule" in taskDict else False)
+        newTask.restoreSchedule(taskDict, catchUpPolicy=kwargs["catchUpPolicy"] if "catchUpPolicy" in kwargs else "fire",
+                                catchUpSpreadSeconds=kwargs["catchUpSpreadSeconds"] if "catchUpSpreadSeconds" in kwargs else 0)
+        return newTask
+
+
+    
     def isExpired(self) -> bool:
         """Decide whether or not this task has expired.
         This can be due to reaching the task's expiryTime, or due to manual expiry.
@@ -165,6 +312,9 @@ class TimedTask:
         :return: True if this task is expired in this check, False otherwise. Regardless of autorescheduling.
         :rtype: bool
         """
+        # Tasks being expired by forceExpire must not be expired again until their expiry function has finished
+        if self.forcingExpiry:
+            return False
         expired = self.isExpired()
         # If the task has expired, call expiry function and reschedule if specified
         if expired:
@@ -192,29 +342,45 @@ class TimedTask:
         self.expiryTime = self.issueTime + (self.expiryDelta if expiryDelta is None else expiryDelta) if expiryTime is None else expiryTime
         # reset the gravestone to False, in case the task had been expired and marked for removal
         self.gravestone = False
+        self.updateHeap()
 
 
     
     async def forceExpire(self, callExpiryFunc : bool = True):
         """Force the expiry of this task.
         Handles calling of this task's expiryFunction, and rescheduling if specified. Set's the task's expiryTime to now.
+        While the expiry function runs, the task is taken off its heap and will not be expired by any other check, so the expiry function
+        is only called once. Afterwards, the task is scheduled back onto the heap if it autoreschedules, unless it was unscheduled meanwhile.
 
         :param bool callExpiryFunction: Whether or not to call the task's expiryFunction if the task expires. Default: True
         :return: The result of the expiry function, if it is called
         """
+        # Take the task off its heap, so that the heap's checks cannot expire it again while the expiry function runs
+        heap = self.heap
+        if heap is not None:
+            heap.removeTask(self)
         # Update expiryTime
         self.expiryTime = datetime.utcnow()
-        # Call expiryFunction and reschedule if specified
-        if callExpiryFunc and self.hasExpiryFunction:
-            expiryFuncResults = await self.callExpiryFunction()
-        else:
-            expiryFuncResults = None
+        self.gravestone = False
+        self.forcingExpiry = True
+        try:
+            # Call expiryFunction and reschedule if specified
+            if callExpiryFunc and self.hasExpiryFunction:
+                expiryFuncResults = await self.callExpiryFunction()
+            else:
+                expiryFuncResults = None
+        finally:
+            self.forcingExpiry = False
 
-        if self.autoReschedule:
+        # The expiry function may have unscheduled the task with TimedTaskHeap.unscheduleTask, marking its gravestone
+        if self.autoReschedule and not self.gravestone:
             await self.reschedule()
-        # Mark for removal if not rescheduled
+            if heap is not None:
+                heap.scheduleTask(self)
+        # Remove from the heap if not rescheduled
         else:
             self.gravestone = True
+            self.updateHeap()
         # Return expiry function results
         if callExpiryFunc and self.hasExpiryFunction:
             return expiryFuncResults
@@ -275,3 +441,4 @@ class DynamicRescheduleTask(TimedTask):
         self.expiryTime = self.issueTime + await self.callDelayTimeGenerator()
         # reset the gravestone to False, in case the task had been expired and marked for removal
         self.gravestone = False
+        self.updateHeap()
@@ -1,14 +1,25 @@
-from . import TimedTask
-from heapq import heappop, heappush
+from __future__ import annotations
+from . import TimedTask, TimedTaskMetrics
+from ..logging import bbLogger
+from datetime import datetime
+import asyncio
 import inspect
+import time
+import traceback
 from types import FunctionType
+from typing import Dict, Iterator, Set
 
 class TimedTaskHeap:
     """A min-heap of TimedTasks, sorted by task expiration time.
+    The heap is indexed: the position of every task in the heap is tracked, so any task can be removed or moved after a change to its
+    expiry time in O(log n) time. Tasks scheduled onto the heap inform it of such changes themselves, so the heap never contains tasks
+    which have been unscheduled or have finished expiring.
     TODO: Return a value from the expiryFunction in case someone wants to use that
 
     :var tasksHeap: The heap, stored as an array. tasksHeap[0] is always the TimedTask with the closest expiry time.
     :vartype tasksHeap: list[TimedTask]
+    :var taskPositions: The index of every task in tasksHeap
+    :vartype taskPositions: dict[TimedTask, int]
     :var expiryFunction: function reference to call upon the expiry of any TimedTask managed by this heap.
     :vartype expiryFunction: FunctionType
     :var hasExpiryFunction: Whether or not this heap has an expiry function to call
@@ -18,15 +29,40 @@ class TimedTaskHeap:
     :vartype hasExpiryFunctionArgs: bool
     :var asyncExpiryFunction: whether or not the expiryFunction is a coroutine and needs to be awaited
     :vartype asyncExpiryFunction: bool
+    :var scheduler: The TimedTaskScheduler driving this heap, to be notified of newly scheduled tasks. None if the heap is not driven by a scheduler.
+    :vartype scheduler: TimedTaskScheduler
+    :var maxConcurrentCallbacks: The maximum number of expired tasks' expiry functions to run at once in the background.
+                                    0 if expiry functions are instead awaited one at a time during task checking.
+    :vartype maxConcurrentCallbacks: int
+    :var callbackTimeoutSeconds: The number of seconds a background expiry function may run for before being cancelled, or None for no limit
+    :vartype callbackTimeoutSeconds: float
+    :var callbackSemaphore: Limits the number of background expiry functions running at once. None if maxConcurrentCallbacks is 0.
+    :vartype callbackSemaphore: asyncio.Semaphore
+    :var runningCallbacks: The background asyncio task expiring each TimedTask whose expiry functions have been dispatched but not yet finished
+    :vartype runningCallbacks: dict[TimedTask, asyncio.Task]
+    :var cancelledCallbacks: TimedTasks which were unscheduled while their expiry functions were running, and so should not be rescheduled
+    :vartype cancelledCallbacks: set[TimedTask]
+    :var callbackDoneFunction: Synchronous function to call with no arguments whenever a task's background expiry functions finish, successfully or not,
+                                e.g to pick up changes they made after task checking returned. None if there is no such function.
+    :vartype callbackDoneFunction: FunctionType
+    :var metrics: Rolling statistics on the lateness and expiry functions of this heap's tasks.
+                    Check times and heap sizes are recorded by the TimedTaskScheduler driving the heap, if there is one.
+    :vartype metrics: TimedTaskMetrics
     """
 
-    def __init__(self, expiryFunction : FunctionType = None, expiryFunctionArgs={}):
+    def __init__(self, expiryFunction : FunctionType = None, expiryFunctionArgs={}, maxConcurrentCallbacks : int = 0, callbackTimeoutSeconds : float = None,
+            callbackDoneFunction : FunctionType = None):
         """
         :param function expiryFunction: function reference to call upon the expiry of any TimedTask managed by this heap. (Default None)
         :param expiryFunctionArgs: an object to pass to expiryFunction when calling. There is no type requirement, but a dictionary is recommended as a close representation of KWArgs. (Default {})
+        :param int maxConcurrentCallbacks: The maximum number of expired tasks' expiry functions to run at once in the background.
+                                            Give 0 to instead await expiry functions one at a time during task checking. (Default 0)
+        :param float callbackTimeoutSeconds: The number of seconds a background expiry function may run for before being cancelled, or None for no limit (Default None)
+        :param function callbackDoneFunction: Synchronous function to call with no arguments whenever a task's background expiry functions finish (Default None)
         """
         # self.taskType = taskType
         self.tasksHeap = []
+        self.taskPositions : Dict[TimedTask.TimedTask, int] = {}
         
         self.expiryFunction = expiryFunction
         self.hasExpiryFunction = expiryFunction is not None
@@ -36,22 +72,157 @@ class TimedTaskHeap:
         # Track whether or not the expiryFunction is a coroutine and needs to be awaited
         self.asyncExpiryFunction = inspect.iscoroutinefunction(expiryFunction)
 
+        # Set by TimedTaskScheduler.addSource
+        self.scheduler = None
+
+        self.maxConcurrentCallbacks = maxConcurrentCallbacks
+        self.callbackTimeoutSeconds = callbackTimeoutSeconds
+        self.callbackSemaphore = asyncio.Semaphore(maxConcurrentCallbacks) if maxConcurrentCallbacks > 0 else None
+        self.runningCallbacks : Dict[TimedTask.TimedTask, asyncio.Task] = {}
+        self.cancelledCallbacks : Set[TimedTask.TimedTask] = set()
+        self.callbackDoneFunction = callbackDoneFunction
+        self.metrics = TimedTaskMetrics.TimedTaskMetrics()
+
+
+    def __len__(self) -> int:
+        """Get the number of tasks scheduled on this heap.
+
+        :return: The number of tasks in the heap
+        :rtype: int
+        """
+        return len(self.tasksHeap)
+
+
+    def __contains__(self, task : TimedTask.TimedTask) -> bool:
+        """Decide whether the given task is scheduled on this heap.
+
+        :param TimedTask task: The task to look for
+        :return: True if task is in the heap, False otherwise
+        :rtype: bool
+        """
+        return task in self.taskPositions
+
+
+    def __iter__(self) -> Iterator[TimedTask.TimedTask]:
+        """Iterate over the tasks scheduled on this heap, in no particular order.
+        Tasks whose expiry functions are currently running in the background are not included.
+
+        :return: An iterator over the scheduled tasks
+        :rtype: Iterator[TimedTask]
+        """
+        return iter(list(self.tasksHeap))
+
+
+    def peek(self) -> TimedTask.TimedTask:
+        """Get the task with the closest expiry time, without removing it from the heap.
+
+        :return: The task at the head of the heap, or None if the heap is empty
+        :rtype: TimedTask
+        """
+        return self.tasksHeap[0] if self.tasksHeap else None
+
+
+    def _siftUp(self, pos : int):
+        """Move the task at the given index towards the head of the heap, until it is no earlier than its parent.
+
+        :param int pos: The index in tasksHeap of the task to move
+        """
+        heap = self.tasksHeap
+        task = heap[pos]
+        while pos > 0:
+            parentPos = (pos - 1) >> 1
+            parent = heap[parentPos]
+            if not task < parent:
+                break
+            heap[pos] = parent
+            self.taskPositions[parent] = pos
+            pos = parentPos
+        heap[pos] = task
+        self.taskPositions[task] = pos
+
+
+    def _siftDown(self, pos : int):
+        """Move the task at the given index away from the head of the heap, until it is no later than either of its children.
+
+        :param int pos: The index in tasksHeap of the task to move
+        """
+        heap = self.tasksHeap
+        task = heap[pos]
+        numTasks = len(heap)
+        while True:
+            childPos = 2 * pos + 1
+            if childPos >= numTasks:
+                break
+            if childPos + 1 < numTasks and heap[childPos + 1] < heap[childPos]:
+                childPos += 1
+            child = heap[childPos]
+            if not child < task:
+                break
+            heap[pos] = child
+            self.taskPositions[child] = pos
+            pos = childPos
+        heap[pos] = task
+        self.taskPositions[task] = pos
+
 
     def cleanHead(self):
         """Remove expired tasks from the head of the heap.
         A task's 'gravestone' represents the task no longer being able to be called.
         I.e, it is expired (whether manually or through timeout) and does not auto-reschedule.
+        Tasks inform the heap when they are gravestoned, so this is only needed for tasks whose gravestones were set directly.
         """
         while len(self.tasksHeap) > 0 and self.tasksHeap[0].gravestone:
-            heappop(self.tasksHeap)
+            self.removeTask(self.tasksHeap[0])
+            self.metrics.counts["gravestoned"] += 1
 
 
     def scheduleTask(self, task : TimedTask.TimedTask):
-        """Schedule a new task onto this heap.
+        """Schedule a new task onto this heap. If the task is already scheduled on this heap, it is moved to match its current expiry time.
+        If this heap is driven by a scheduler which is sleeping past the task's expiry time, the scheduler is woken.
 
         :param TimedTask task: the task to schedule
         """
-        heappush(self.tasksHeap, task)
+        if task in self.taskPositions:
+            self.updateTask(task)
+            return
+        task.heap = self
+        self.tasksHeap.append(task)
+        self._siftUp(len(self.tasksHeap) - 1)
+        if self.scheduler is not None:
+            self.scheduler.notifyScheduled(task)
+
+
+    def updateTask(self, task : TimedTask.TimedTask):
+        """Move a task already scheduled on this heap to the correct position for its current expiry time.
+        This is called by the task itself whenever its expiry time changes.
+
+        :param TimedTask task: the task whose expiry time has changed
+        """
+        pos = self.taskPositions[task]
+        self._siftUp(pos)
+        if self.taskPositions[task] == pos:
+            self._siftDown(pos)
+        if self.scheduler is not None:
+            self.scheduler.notifyScheduled(task)
+
+
+    def removeTask(self, task : TimedTask.TimedTask):
+        """Remove a task from the heap, without changing the task in any way. Does nothing if the task is not on this heap.
+
+        :param TimedTask task: the task to remove from the heap
+        """
+        if task not in self.taskPositions:
+            return
+        pos = self.taskPositions.pop(task)
+        task.heap = None
+        lastTask = self.tasksHeap.pop()
+        # Fill the gap left by the removed task with the last task in the heap, and move it into the correct position
+        if lastTask is not task:
+            self.tasksHeap[pos] = lastTask
+            self.taskPositions[lastTask] = pos
+            self._siftUp(pos)
+            if self.taskPositions[lastTask] == pos:
+                self._siftDown(pos)
 
 
     def unscheduleTask(self, task : TimedTask.TimedTask):
@@ -61,7 +232,9 @@ class TimedTaskHeap:
         :param TimedTask task: the task to remove from the heap
         """
         task.gravestone = True
-        self.cleanHead()
+        self.removeTask(task)
+        if task in self.runningCallbacks:
+            self.cancelledCallbacks.add(task)
 
 
     async def callExpiryFunction(self):
@@ -87,20 +260,117 @@ class TimedTaskHeap:
 
     
 
+    async def callTaskExpiryFunctions(self, task : TimedTask.TimedTask):
+        """Call an expired task's expiry function followed by the heap's expiry function, if they are defined.
+
+        :param TimedTask task: the expired task
+        """
+        if task.hasExpiryFunction:
+            await task.callExpiryFunction()
+        if self.hasExpiryFunction:
+            await self.callExpiryFunction()
+
+
+    async def runCallbacksInBackground(self, task : TimedTask.TimedTask):
+        """Call an expired task's expiry functions once a slot in callbackSemaphore is free, then reschedule the task if it autoreschedules.
+        Expiry functions which raise an exception or run for longer than callbackTimeoutSeconds are logged, and do not affect other tasks.
+        The task is rescheduled even if its expiry functions failed, unless it was unscheduled while they were running.
+
+        :param TimedTask task: the expired task, which has already been removed from the heap
+        """
+        try:
+            async with self.callbackSemaphore:
+                self.metrics.lateness.record((datetime.utcnow() - task.expiryTime).total_seconds())
+                started = time.perf_counter()
+                try:
+                    await asyncio.wait_for(self.callTaskExpiryFunctions(task), timeout=self.callbackTimeoutSeconds)
+                    self.metrics.counts["completed"] += 1
+                except asyncio.TimeoutError:
+                    self.metrics.counts["timedOut"] += 1
+                    bbLogger.log("TimedTaskHeap", "runCallbacks", "Expiry function for task due at " + str(task.expiryTime) + " cancelled after running for " + \
+                                    str(self.callbackTimeoutSeconds) + "s: " + str(task.expiryFunction), category="timedTasks", eventType="CB_TIMEOUT")
+                except Exception as e:
+                    self.metrics.counts["failed"] += 1
+                    bbLogger.log("TimedTaskHeap", "runCallbacks", "Expiry function for task due at " + str(task.expiryTime) + " raised " + type(e).__name__ + \
+                                    ": " + str(task.expiryFunction), category="timedTasks", eventType="CB_ERR", trace=traceback.format_exc())
+                self.metrics.callbackSeconds.record(time.perf_counter() - started)
+
+            if task.autoReschedule and task not in self.cancelledCallbacks:
+                try:
+                    await task.reschedule()
+                except Exception as e:
+                    bbLogger.log("TimedTaskHeap", "runCallbacks", "Failed to reschedule task with expiry function " + str(task.expiryFunction) + ": " + type(e).__name__,
+                                    category="timedTasks", eventType="RESCHED_ERR", trace=traceback.format_exc())
+                else:
+                    self.scheduleTask(task)
+        finally:
+            del self.runningCallbacks[task]
+            self.cancelledCallbacks.discard(task)
+            self.metrics.counts["pending"] = len(self.runningCallbacks)
+            if self.callbackDoneFunction is not None:
+                self.callbackDoneFunction()
+
+
+    async def expireTask(self, task : TimedTask.TimedTask) -> bool:
+        """Check whether a task on the heap has expired, and if so, expire it.
+        If maxConcurrentCallbacks is 0, the task and heap expiry functions are awaited, and the task is then removed from the heap or moved to its
+        rescheduled expiry time. Otherwise, the task is removed from the heap and its expiry functions are dispatched to run in the background,
+        after which autorescheduling tasks are scheduled back onto the heap.
+
+        :param TimedTask task: the task to check
+        :return: True if task expired, False otherwise
+        :rtype: bool
+        """
+        if self.callbackSemaphore is None:
+            expiryTime = task.expiryTime
+            checkTime = datetime.utcnow()
+            started = time.perf_counter()
+            if not await task.doExpiryCheck():
+                return False
+            # Call the heap's expiry function
+            if self.hasExpiryFunction:
+                await self.callExpiryFunction()
+            self.metrics.callbackSeconds.record(time.perf_counter() - started)
+            self.metrics.lateness.record((checkTime - expiryTime).total_seconds())
+            self.metrics.counts["expired"] += 1
+            self.metrics.counts["completed"] += 1
+            # Expiry functions may have unscheduled the task already
+            if task in self:
+                # Remove the expired task from the heap, or move autorescheduling tasks to their new expiry time
+                if task.gravestone:
+                    self.removeTask(task)
+                else:
+                    self.updateTask(task)
+            return True
+
+        if not task.isExpired():
+            return False
+        self.removeTask(task)
+        self.runningCallbacks[task] = asyncio.ensure_future(self.runCallbacksInBackground(task))
+        self.metrics.counts["expired"] += 1
+        self.metrics.counts["pending"] = len(self.runningCallbacks)
+        self.metrics.counts["peakPending"] = max(self.metrics.counts["peakPending"], self.metrics.counts["pending"])
+        return True
+
+
+    async def waitForCallbacks(self):
+        """Wait for all expiry functions currently running in the background to finish.
+        """
+        while self.runningCallbacks:
+            await asyncio.gather(*self.runningCallbacks.values(), return_exceptions=True)
+
+
     async def doTaskChecking(self):
         """Function to be called regularly (ideally in a main loop), that handles the expiring of tasks.
         Tasks are checked against their expiry times and manual expiry.
         Task and heap-level expiry functions are called upon task expiry, if they are defined.
         Tasks are rescheduled if they are marked for auto-rescheduling.
         Expired, non-rescheduling tasks are removed from the heap.
+        If maxConcurrentCallbacks is set, expiry functions run in the background, and this returns without waiting for them.
         """
+        self.cleanHead()
         # Is the task at the head of the heap expired?
-        while len(self.tasksHeap) > 0 and (self.tasksHeap[0].gravestone or await self.tasksHeap[0].doExpiryCheck()):
-            # Call the heap's expiry function
-            if self.hasExpiryFunction:
-                await self.callExpiryFunction()
-            # Remove the expired task from the heap
-            task = heappop(self.tasksHeap)
-            # push autorescheduling tasks back onto the heap
-            if not task.gravestone:
-                heappush(self.tasksHeap, task)
+        while len(self.tasksHeap) > 0:
+            if not await self.expireTask(self.tasksHeap[0]):
+                break
+            self.cleanHead()
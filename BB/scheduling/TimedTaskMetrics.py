@@ -0,0 +1,111 @@
+from __future__ import annotations
+from collections import deque
+from typing import Dict, List, Union
+import math
+
+
+def _nearestRank(ordered : List[float], percent : float) -> float:
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)] if ordered else None
+
+
+class RollingHistogram:
+    """A histogram of the most recent maxSamples values recorded into it. Older values are discarded as new ones are added.
+
+    :var samples: The recorded values, oldest first
+    :vartype samples: collections.deque[float]
+    :var bucketBounds: The upper bounds of the histogram's buckets, in ascending order. Values above the last bound are counted in a final, unbounded bucket.
+    :vartype bucketBounds: list[float]
+    :var totalRecorded: The number of values ever recorded, including those which have since been discarded
+    :vartype totalRecorded: int
+    """
+
+    def __init__(self, bucketBounds : List[float], maxSamples : int = 1000):
+        """
+        :param list[float] bucketBounds: The upper bounds of the histogram's buckets, in ascending order
+        :param int maxSamples: The number of most recent values to keep (Default 1000)
+        """
+        self.samples = deque(maxlen=maxSamples)
+        self.bucketBounds = bucketBounds
+        self.totalRecorded = 0
+
+
+    def record(self, value : float):
+        """Add a value to the histogram, discarding the oldest value if the histogram is full.
+
+        :param float value: The value to record
+        """
+        self.samples.append(value)
+        self.totalRecorded += 1
+
+
+    def percentile(self, percent : float) -> float:
+        """Find the value below which the given percentage of the recorded values fall, using the nearest-rank method.
+
+        :param float percent: The percentile to find, between 0 and 100
+        :return: The requested percentile of the recorded values, or None if no values have been recorded
+        :rtype: float
+        """
+        return _nearestRank(sorted(self.samples), percent)
+
+
+    def toDict(self) -> Dict[str, Union[int, float, Dict[str, int]]]:
+        """Summarise the recorded values into a JSON-serializable dictionary.
+
+        :return: The number of values currently and ever recorded, their mean, median, 90th, 95th and 99th percentiles and maximum,
+                    and the number of values in each bucket, keyed by the bucket's upper bound
+        :rtype: dict
+        """
+        ordered = sorted(self.samples)
+        buckets = {}
+        bucketIndex = 0
+        for bound in self.bucketBounds:
+            bucketStart = bucketIndex
+            while bucketIndex < len(ordered) and ordered[bucketIndex] <= bound:
+                bucketIndex += 1
+            buckets["<=" + str(bound)] = bucketIndex - bucketStart
+        buckets[">" + str(self.bucketBounds[-1])] = len(ordered) - bucketIndex
+
+        return {"count": len(ordered), "totalRecorded": self.totalRecorded, "mean": sum(ordered) / len(ordered) if ordered else None,
+                "p50": _nearestRank(ordered, 50), "p90": _nearestRank(ordered, 90), "p95": _nearestRank(ordered, 95), "p99": _nearestRank(ordered, 99), "max": ordered[-1] if ordered else None, "buckets": buckets}
+
+
+class TimedTaskMetrics:
+    """Rolling statistics describing the expiry of the tasks in a TimedTaskHeap, or of a single standalone TimedTask.
+    Heaps record into their own metrics; a TimedTaskScheduler records check times and heap sizes for its sources, and everything for standalone tasks.
+
+    :var lateness: How many seconds after their expiry times tasks actually fired
+    :vartype lateness: RollingHistogram
+    :var callbackSeconds: How long expired tasks' expiry functions took to run, in seconds
+    :vartype callbackSeconds: RollingHistogram
+    :var checkSeconds: How long each doTaskChecking call took, in seconds. When expiry functions are awaited during task checking, this includes them.
+    :vartype checkSeconds: RollingHistogram
+    :var heapSize: The number of tasks scheduled on the heap after each check
+    :vartype heapSize: RollingHistogram
+    :var gravestoneRatio: For each check which removed any tasks, the fraction of them which had been gravestoned rather than expired
+    :vartype gravestoneRatio: RollingHistogram
+    :var counts: Running totals. "expired" and "gravestoned" count tasks removed by task checking, "pending" is the number of expiry functions
+                    dispatched to run in the background but not yet finished, and "peakPending" is the highest this has been.
+                    "completed", "failed" and "timedOut" count finished expiry functions by outcome.
+    :vartype counts: dict[str, int]
+    """
+
+    def __init__(self, maxSamples : int = 1000):
+        """
+        :param int maxSamples: The number of most recent values to keep in each histogram (Default 1000)
+        """
+        self.lateness = RollingHistogram([0.1, 1, 5, 10, 30, 60, 300], maxSamples=maxSamples)
+        self.callbackSeconds = RollingHistogram([0.01, 0.1, 0.5, 1, 5, 30, 120], maxSamples=maxSamples)
+        self.checkSeconds = RollingHistogram([0.001, 0.01, 0.1, 1, 10], maxSamples=maxSamples)
+        self.heapSize = RollingHistogram([0, 10, 100, 1000, 10000, 100000], maxSamples=maxSamples)
+        self.gravestoneRatio = RollingHistogram([0, 0.1, 0.25, 0.5, 0.75, 0.9], maxSamples=maxSamples)
+        self.counts = {"expired": 0, "gravestoned": 0, "pending": 0, "peakPending": 0, "completed": 0, "failed": 0, "timedOut": 0}
+
+
+    def toDict(self) -> dict:
+        """Take a JSON-serializable snapshot of these metrics.
+
+        :return: A summary of each histogram, and the running totals
+        :rtype: dict
+        """
+        return {"lateness": self.lateness.toDict(), "callbackSeconds": self.callbackSeconds.toDict(), "checkSeconds": self.checkSeconds.toDict(),
+                "heapSize": self.heapSize.toDict(), "gravestoneRatio": self.gravestoneRatio.toDict(), "counts": dict(self.counts)}
@@ -0,0 +1,147 @@
+from __future__ import annotations
+from . import TimedTask, TimedTaskHeap, TimedTaskMetrics
+from datetime import datetime
+from typing import Dict, Union
+import asyncio
+import time
+
+
+class TimedTaskScheduler:
+    """Drives the expiry of a collection of TimedTaskHeaps and standalone TimedTasks from a single loop.
+    Rather than checking every task at a fixed interval, the scheduler sleeps exactly until the earliest expiry time of all of its tasks.
+    Heaps registered with the scheduler wake it early when a task is scheduled to expire before the time the scheduler is sleeping until.
+
+    :var sources: The TimedTaskHeaps and TimedTasks to check for expiry, in the order they are checked
+    :vartype sources: list[Union[TimedTaskHeap, TimedTask]]
+    :var sourceNames: The name of each source, in the same order as sources, to identify it in metrics snapshots
+    :vartype sourceNames: list[str]
+    :var sourceMetrics: The metrics recorded for each source, in the same order as sources. For heaps, this is the heap's own metrics.
+    :vartype sourceMetrics: list[TimedTaskMetrics]
+    :var maxSleepSeconds: The maximum number of seconds to sleep for before rechecking expiry times, even if no task is due to expire.
+                            This guards against the expiry times of scheduled tasks being changed without waking the scheduler.
+    :vartype maxSleepSeconds: float
+    :var wakeEvent: Set to wake the scheduler before its next expiry time
+    :vartype wakeEvent: asyncio.Event
+    :var sleeping: Whether or not the scheduler is currently waiting for a task to expire
+    :vartype sleeping: bool
+    :var sleepingUntil: The expiry time that the scheduler is currently waiting for, or None if it is waiting for the first task to be scheduled
+    :vartype sleepingUntil: datetime.datetime
+    """
+
+    def __init__(self, maxSleepSeconds : float = 600):
+        """
+        :param float maxSleepSeconds: The maximum number of seconds to sleep for before rechecking expiry times, even if no task is due to expire. (Default 600)
+        """
+        self.sources = []
+        self.sourceNames = []
+        self.sourceMetrics = []
+        self.maxSleepSeconds = maxSleepSeconds
+        self.wakeEvent = asyncio.Event()
+        self.sleeping = False
+        self.sleepingUntil = None
+
+
+    def addSource(self, source : Union[TimedTaskHeap.TimedTaskHeap, TimedTask.TimedTask], name : str = None):
+        """Add a TimedTaskHeap or standalone TimedTask to be checked by the scheduler. Sources are checked in the order they are added.
+        Heaps are given a reference to the scheduler, so that they can wake it when new tasks are scheduled.
+
+        :param source: The heap or task to check for expiry
+        :type source: Union[TimedTaskHeap, TimedTask]
+        :param str name: The name to identify the source by in metrics snapshots (Default "source" followed by the source's index)
+        """
+        self.sourceNames.append("source" + str(len(self.sources)) if name is None else name)
+        self.sources.append(source)
+        if isinstance(source, TimedTaskHeap.TimedTaskHeap):
+            source.scheduler = self
+            self.sourceMetrics.append(source.metrics)
+        else:
+            self.sourceMetrics.append(TimedTaskMetrics.TimedTaskMetrics())
+
+
+    def notifyScheduled(self, task : TimedTask.TimedTask):
+        """Inform the scheduler that the given task has been scheduled. If the scheduler is sleeping past the task's expiry time, it is woken.
+
+        :param TimedTask task: The newly scheduled task
+        """
+        if self.sleeping and (self.sleepingUntil is None or task.expiryTime < self.sleepingUntil):
+            self.wakeEvent.set()
+
+
+    def nextExpiryTime(self) -> datetime:
+        """Find the earliest expiry time out of all tasks managed by this scheduler.
+        Tasks which will never expire again, and so are waiting to be removed from their heap, are ignored.
+
+        :return: The expiry time of the next task to expire, or None if there are no tasks
+        :rtype: datetime.datetime
+        """
+        nextExpiry = None
+        for source in self.sources:
+            if isinstance(source, TimedTaskHeap.TimedTaskHeap):
+                source.cleanHead()
+                if len(source) == 0:
+                    continue
+                sourceExpiry = source.peek().expiryTime
+            elif source.gravestone:
+                continue
+            else:
+                sourceExpiry = source.expiryTime
+            if nextExpiry is None or sourceExpiry < nextExpiry:
+                nextExpiry = sourceExpiry
+        return nextExpiry
+
+
+    async def waitForNextExpiry(self):
+        """Sleep until the next task is due to expire, the scheduler is woken by a newly scheduled task, or maxSleepSeconds have passed.
+        """
+        nextExpiry = self.nextExpiryTime()
+        if nextExpiry is None:
+            delay = self.maxSleepSeconds
+        else:
+            delay = min((nextExpiry - datetime.utcnow()).total_seconds(), self.maxSleepSeconds)
+        if delay > 0:
+            self.sleeping = True
+            self.sleepingUntil = nextExpiry
+            try:
+                await asyncio.wait_for(self.wakeEvent.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self.sleeping = False
+            self.sleepingUntil = None
+        # Any task scheduled before this point will be seen in the next call to nextExpiryTime
+        self.wakeEvent.clear()
+
+
+    async def doTaskChecking(self):
+        """Check every source for expired tasks, calling their expiry functions and rescheduling them as appropriate.
+        The time taken to check each source is recorded in its metrics, along with the size and gravestone ratio of heaps,
+        and the lateness and expiry function duration of standalone tasks.
+        """
+        for source, metrics in zip(self.sources, self.sourceMetrics):
+            started = time.perf_counter()
+            if isinstance(source, TimedTaskHeap.TimedTaskHeap):
+                removedBefore = metrics.counts["expired"] + metrics.counts["gravestoned"]
+                gravestonedBefore = metrics.counts["gravestoned"]
+                await source.doTaskChecking()
+                metrics.checkSeconds.record(time.perf_counter() - started)
+                metrics.heapSize.record(len(source))
+                numRemoved = metrics.counts["expired"] + metrics.counts["gravestoned"] - removedBefore
+                if numRemoved > 0:
+                    metrics.gravestoneRatio.record((metrics.counts["gravestoned"] - gravestonedBefore) / numRemoved)
+            else:
+                expiryTime = source.expiryTime
+                checkTime = datetime.utcnow()
+                if await source.doExpiryCheck():
+                    metrics.callbackSeconds.record(time.perf_counter() - started)
+                    metrics.lateness.record((checkTime - expiryTime).total_seconds())
+                    metrics.counts["expired"] += 1
+                    metrics.counts["completed"] += 1
+                metrics.checkSeconds.record(time.perf_counter() - started)
+
+
+    def metricsSnapshot(self) -> Dict[str, dict]:
+        """Take a JSON-serializable snapshot of the metrics of every source.
+
+        :return: A dictionary mapping each source's name to a snapshot of its metrics, as given by TimedTaskMetrics.toDict
+        :rtype: dict[str, dict]
+        """
+        return {name: metrics.toDict() for name, metrics in zip(self.sourceNames, self.sourceMetrics)}
@@ -0,0 +1,257 @@
+from __future__ import annotations
+from . import TimedTask, TimedTaskHeap
+from datetime import datetime
+from types import FunctionType
+from typing import Dict, Iterator, List, Set, Tuple
+import math
+
+# The naive UTC datetime which task expiry times are measured from, to find their ticks
+EPOCH = datetime(1970, 1, 1)
+
+
+class TimedTaskWheel(TimedTaskHeap.TimedTaskHeap):
+    """A hierarchical timing wheel of TimedTasks, which can be used anywhere a TimedTaskHeap can.
+    Scheduling, rescheduling and unscheduling a task which expires soon is O(1), making this suited to large numbers
+    of short-lived tasks which are often cancelled, such as reaction menu timeouts.
+
+    Time is divided into ticks of resolution seconds. The wheel has two levels of wheelSize slots each:
+    - Level 0 holds tasks expiring in the same block of wheelSize ticks as the current tick, in one slot per tick.
+    - Level 1 holds tasks expiring in later blocks of the same superblock of wheelSize * wheelSize ticks, in one slot per block.
+      When the wheel reaches a new block, that block's level 1 slot is cascaded down into level 0.
+    Tasks expiring after the current superblock are stored in the inherited heap, and moved into the wheel when their superblock is reached.
+    With the default 1 second resolution and 64 slots, the wheel covers up to around an hour ahead.
+
+    :var resolution: The length of one tick in seconds
+    :vartype resolution: float
+    :var wheelSize: The number of slots in each level of the wheel
+    :vartype wheelSize: int
+    :var currentTick: The current tick. All slots for earlier ticks have been fully expired.
+    :vartype currentTick: int
+    :var levels: The slots of each level of the wheel. Each slot is a set of TimedTasks.
+    :vartype levels: list[list[set[TimedTask]]]
+    :var taskSlots: The level and slot index of every task in the wheel, not including tasks in the inherited heap
+    :vartype taskSlots: dict[TimedTask, tuple[int, int]]
+    """
+
+    def __init__(self, expiryFunction : FunctionType = None, expiryFunctionArgs={}, maxConcurrentCallbacks : int = 0, callbackTimeoutSeconds : float = None,
+            callbackDoneFunction : FunctionType = None, resolution : float = 1, wheelSize : int = 64):
+        """
+        :param function expiryFunction: function reference to call upon the expiry of any TimedTask managed by this wheel. (Default None)
+        :param expiryFunctionArgs: an object to pass to expiryFunction when calling. There is no type requirement, but a dictionary is recommended as a close representation of KWArgs. (Default {})
+        :param int maxConcurrentCallbacks: The maximum number of expired tasks' expiry functions to run at once in the background.
+                                            Give 0 to instead await expiry functions one at a time during task checking. (Default 0)
+        :param float callbackTimeoutSeconds: The number of seconds a background expiry function may run for before being cancelled, or None for no limit (Default None)
+        :param function callbackDoneFunction: Synchronous function to call with no arguments whenever a task's background expiry functions finish (Default None)
+        :param float resolution: The length of one tick in seconds (Default 1)
+        :param int wheelSize: The number of slots in each level of the wheel (Default 64)
+        """
+        super().__init__(expiryFunction=expiryFunction, expiryFunctionArgs=expiryFunctionArgs, maxConcurrentCallbacks=maxConcurrentCallbacks,
+                            callbackTimeoutSeconds=callbackTimeoutSeconds, callbackDoneFunction=callbackDoneFunction)
+        self.resolution = resolution
+        self.wheelSize = wheelSize
+        self.currentTick = self.tickOf(datetime.utcnow())
+        self.levels : List[List[Set[TimedTask.TimedTask]]] = [[set() for _ in range(wheelSize)] for _ in range(2)]
+        self.taskSlots : Dict[TimedTask.TimedTask, Tuple[int, int]] = {}
+
+
+    def tickOf(self, expiryTime : datetime) -> int:
+        """Find the tick containing the given time.
+
+        :param datetime.datetime expiryTime: A naive UTC datetime
+        :return: The number of the tick containing expiryTime
+        :rtype: int
+        """
+        return math.floor((expiryTime - EPOCH).total_seconds() / self.resolution)
+
+
+    def __len__(self) -> int:
+        """Get the number of tasks scheduled on this wheel, including those stored in the heap.
+
+        :return: The number of tasks scheduled
+        :rtype: int
+        """
+        return len(self.taskSlots) + len(self.tasksHeap)
+
+
+    def __contains__(self, task : TimedTask.TimedTask) -> bool:
+        """Decide whether the given task is scheduled on this wheel.
+
+        :param TimedTask task: The task to look for
+        :return: True if task is in the wheel or its heap, False otherwise
+        :rtype: bool
+        """
+        return task in self.taskSlots or task in self.taskPositions
+
+
+    def __iter__(self) -> Iterator[TimedTask.TimedTask]:
+        """Iterate over the tasks scheduled on this wheel, including those stored in the heap, in no particular order.
+
+        :return: An iterator over the scheduled tasks
+        :rtype: Iterator[TimedTask]
+        """
+        return iter(list(self.taskSlots) + self.tasksHeap)
+
+
+    def peek(self) -> TimedTask.TimedTask:
+        """Get the task with the closest expiry time, without removing it.
+        Slots cover consecutive ranges of time, so only the first non-empty slot needs to be searched.
+
+        :return: The scheduled task with the closest expiry time, or None if no tasks are scheduled
+        :rtype: TimedTask
+        """
+        for level, firstSlot in ((0, self.currentTick % self.wheelSize), (1, (self.currentTick // self.wheelSize) % self.wheelSize + 1)):
+            for slotIndex in range(firstSlot, self.wheelSize):
+                if self.levels[level][slotIndex]:
+                    return min(self.levels[level][slotIndex])
+        return super().peek()
+
+
+    def placeTask(self, task : TimedTask.TimedTask):
+        """Store a task in the slot or heap matching its expiry time. The task must not already be stored.
+        Tasks which are already due are placed in the current tick's slot, to be expired on the next check.
+
+        :param TimedTask task: The task to store
+        """
+        tick = self.tickOf(task.expiryTime)
+        if tick // self.wheelSize == self.currentTick // self.wheelSize or tick < self.currentTick:
+            level, slotIndex = 0, max(tick, self.currentTick) % self.wheelSize
+        elif tick // (self.wheelSize * self.wheelSize) == self.currentTick // (self.wheelSize * self.wheelSize):
+            level, slotIndex = 1, (tick // self.wheelSize) % self.wheelSize
+        else:
+            super().scheduleTask(task)
+            return
+        self.levels[level][slotIndex].add(task)
+        self.taskSlots[task] = (level, slotIndex)
+
+
+    def scheduleTask(self, task : TimedTask.TimedTask):
+        """Schedule a new task onto this wheel. If the task is already scheduled on this wheel, it is moved to match its current expiry time.
+        If this wheel is driven by a scheduler which is sleeping past the task's expiry time, the scheduler is woken.
+
+        :param TimedTask task: the task to schedule
+        """
+        if task in self:
+            self.updateTask(task)
+            return
+        task.heap = self
+        self.placeTask(task)
+        if self.scheduler is not None:
+            self.scheduler.notifyScheduled(task)
+
+
+    def updateTask(self, task : TimedTask.TimedTask):
+        """Move a task already scheduled on this wheel to the correct slot for its current expiry time.
+        This is called by the task itself whenever its expiry time changes.
+
+        :param TimedTask task: the task whose expiry time has changed
+        """
+        if task in self.taskSlots:
+            level, slotIndex = self.taskSlots.pop(task)
+            self.levels[level][slotIndex].discard(task)
+        else:
+            super().removeTask(task)
+            task.heap = self
+        self.placeTask(task)
+        if self.scheduler is not None:
+            self.scheduler.notifyScheduled(task)
+
+
+    def removeTask(self, task : TimedTask.TimedTask):
+        """Remove a task from the wheel, without changing the task in any way. Does nothing if the task is not on this wheel.
+
+        :param TimedTask task: the task to remove
+        """
+        if task in self.taskSlots:
+            level, slotIndex = self.taskSlots.pop(task)
+            self.levels[level][slotIndex].discard(task)
+            task.heap = None
+        else:
+            super().removeTask(task)
+
+
+    def pullFromHeap(self, endTick : int):
+        """Move all tasks in the heap which expire before the given tick into the wheel.
+        The wheel's current tick must be in the superblock ending at endTick.
+
+        :param int endTick: The first tick after the current superblock
+        """
+        while len(self.tasksHeap) > 0 and self.tickOf(self.tasksHeap[0].expiryTime) < endTick:
+            task = self.tasksHeap[0]
+            super().removeTask(task)
+            task.heap = self
+            self.placeTask(task)
+
+
+    def advanceTick(self):
+        """Move the wheel onto the next tick. The slot for the current tick must have been fully expired.
+        On reaching a new superblock, tasks in the heap which expire during the superblock are moved into the wheel.
+        On reaching a new block, the block's level 1 slot is cascaded down into level 0.
+        """
+        self.currentTick += 1
+        if self.currentTick % self.wheelSize != 0:
+            return
+        superblockSize = self.wheelSize * self.wheelSize
+        if self.currentTick % superblockSize == 0:
+            self.pullFromHeap(self.currentTick + superblockSize)
+        cascadingSlot = self.levels[1][(self.currentTick // self.wheelSize) % self.wheelSize]
+        for task in list(cascadingSlot):
+            cascadingSlot.discard(task)
+            del self.taskSlots[task]
+            self.placeTask(task)
+
+
+    async def expireSlot(self, slot : Set[TimedTask.TimedTask]):
+        """Expire every task in the given slot which has reached its expiry time, with expireTask.
+        Tasks which have not yet expired are left in the slot.
+
+        :param set[TimedTask] slot: The level 0 slot to expire tasks from
+        """
+        for task in list(slot):
+            # Expiry functions of earlier tasks may have unscheduled this one
+            if task not in self.taskSlots:
+                continue
+            if task.gravestone:
+                self.removeTask(task)
+                self.metrics.counts["gravestoned"] += 1
+            else:
+                await self.expireTask(task)
+
+
+    async def doTaskChecking(self):
+        """Function to be called regularly (ideally in a main loop), that handles the expiring of tasks.
+        Advances the wheel to the current time, expiring all due tasks on the way.
+        Task and wheel-level expiry functions are called upon task expiry, if they are defined.
+        Tasks are rescheduled if they are marked for auto-rescheduling.
+        Expired, non-rescheduling tasks are removed from the wheel.
+        """
+        self.cleanHead()
+        nowTick = self.tickOf(datetime.utcnow())
+        superblockSize = self.wheelSize * self.wheelSize
+        # Empty ticks do not need to be stepped through individually
+        if not self.taskSlots and nowTick > self.currentTick:
+            crossesSuperblock = nowTick // superblockSize != self.currentTick // superblockSize
+            self.currentTick = nowTick
+            # Tasks in the heap can now only be brought into the wheel by a superblock change, so one is simulated
+            if crossesSuperblock:
+                self.pullFromHeap((nowTick // superblockSize + 1) * superblockSize)
+
+        while True:
+            await self.expireSlot(self.levels[0][self.currentTick % self.wheelSize])
+            if self.currentTick >= nowTick:
+                break
+
+            # Skip straight to the next tick with tasks to expire, or to the next block or superblock if the rest of this one is empty
+            nextSlot = next((slotIndex for slotIndex in range(self.currentTick % self.wheelSize + 1, self.wheelSize) if self.levels[0][slotIndex]), None)
+            blockStart = self.currentTick - self.currentTick % self.wheelSize
+            if nextSlot is not None:
+                self.currentTick = min(blockStart + nextSlot, nowTick)
+            elif blockStart + self.wheelSize > nowTick:
+                self.currentTick = nowTick
+            else:
+                superblockEnd = (self.currentTick // superblockSize + 1) * superblockSize
+                nextBlockSlot = (self.currentTick // self.wheelSize) % self.wheelSize + 1
+                if superblockEnd <= nowTick and not any(self.levels[1][slotIndex] for slotIndex in range(nextBlockSlot, self.wheelSize)):
+                    self.currentTick = superblockEnd - 1
+                else:
+                    self.currentTick = blockStart + self.wheelSize - 1
+                self.advanceTick()
@@ -0,0 +1 @@
+# Standalone maintenance scripts, run with python -m BB.tools.<scriptName> from the repository root.
@@ -0,0 +1,102 @@
+"""Measure the per-message overhead of tokenizing and dispatching commands with a HeirarchicalCommandsDB.
+
+Usage, from the repository root:
+    python -m BB.tools.commandDispatchBenchmark [--messages 200000] [--seed 0]
+
+The commands registered by bbConfig.includedCommandModules are replaced with no-op functions and exempted from rate limiting, so that only dispatch is measured.
+Messages are generated calling random commands and aliases with random casing and arguments, from random access levels,
+with some calling commands which do not exist. Each message is tokenized and dispatched as in on_message, first as it was before the
+dispatch table was added ("legacy": chained replaces and repeated slicing, then a search of each access level's commands in turn),
+and then with tokenizeCommand and the dispatch table ("table"). Times are reported per message, in microseconds.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+# bbConfig must be imported before the commands, to avoid a circular import
+from ..bbConfig import bbConfig
+from ..bbDatabases import HeirarchicalCommandsDB
+from .. import commands
+
+
+async def noop(message, args : str, isDM : bool):
+    pass
+
+
+def legacyTokenize(content : str, prefix : str):
+    """Split a message into command and arguments, as on_message did before tokenizeCommand.
+    """
+    msgContent = content.replace("‘", "'").replace("’", "'")
+    command = msgContent[len(prefix):].split(" ")[0]
+    args = msgContent[len(prefix) + len(command) + 1:]
+    return command, args
+
+
+async def legacyCall(db : HeirarchicalCommandsDB.HeirarchicalCommandsDB, command : str, args : str, accessLevel : int) -> bool:
+    """Find and call a command, as HeirarchicalCommandsDB.call did before the dispatch table.
+    """
+    commandLower = command.lower()
+    for requiredAccess in range(accessLevel, -1, -1):
+        if command in db.commands[requiredAccess]:
+            await db.commands[requiredAccess][command].call(None, args, False)
+            return True
+        elif commandLower in db.commands[requiredAccess]:
+            await db.commands[requiredAccess][commandLower].call(None, args, False)
+            return True
+    return False
+
+
+async def runDispatch(db : HeirarchicalCommandsDB.HeirarchicalCommandsDB, messages : list, legacy : bool) -> dict:
+    """Tokenize and dispatch every message.
+
+    :param HeirarchicalCommandsDB db: The commands DB to dispatch with
+    :param list messages: Tuples of message content and caller access level
+    :param bool legacy: When True, use legacyTokenize and legacyCall. When False, use tokenizeCommand and the dispatch table.
+    :return: The total time in seconds spent dispatching, and the number of messages whose command was found
+    :rtype: dict
+    """
+    found = 0
+    startTime = time.perf_counter()
+    if legacy:
+        for content, accessLevel in messages:
+            command, args = legacyTokenize(content, bbConfig.commandPrefix)
+            found += await legacyCall(db, command, args, accessLevel)
+    else:
+        for content, accessLevel in messages:
+            command, args = HeirarchicalCommandsDB.tokenizeCommand(content, bbConfig.commandPrefix)
+            found += await db.call(command, None, args, accessLevel)
+    return {"time": time.perf_counter() - startTime, "found": found}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Measure the per-message overhead of tokenizing and dispatching commands.")
+    parser.add_argument("--messages", type=int, default=200000, help="the number of messages to dispatch (default 200000)")
+    parser.add_argument("--seed", type=int, default=0, help="the random seed to use (default 0)")
+    args = parser.parse_args(args)
+
+    db = commands.loadCommands()
+    for levelCommands in db.commands:
+        for registry in levelCommands.values():
+            registry.func = noop
+            registry.cost = 0
+    db.compileDispatchTable()
+
+    rand = random.Random(args.seed)
+    idents = [(ident, accessLevel) for accessLevel in range(db.numAccessLevels) for ident in db.commands[accessLevel]] + \
+                [("not-a-command", 0), ("sh0p", 0)]
+    messages = []
+    for _ in range(args.messages):
+        ident, accessLevel = rand.choice(idents)
+        ident = "".join(c.upper() if rand.random() < 0.2 else c for c in ident)
+        messages.append((bbConfig.commandPrefix + ident + " " + " ".join(rand.choice(["all", "‘quoted’", "1", "@someone", "terran"]) for _ in range(rand.randint(0, 4))),
+                            rand.randint(accessLevel, db.numAccessLevels - 1)))
+
+    print("dispatch".ljust(9) + "found".rjust(9) + "per message (us)".rjust(18))
+    for name, legacy in (("legacy", True), ("table", False)):
+        results = asyncio.run(runDispatch(db, messages, legacy))
+        print(name.ljust(9) + str(results["found"]).rjust(9) + str(round(results["time"] * 1000000 / args.messages, 3)).rjust(18))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,95 @@
+"""Compare the speed and suggestions of lib.ngramSearch.NGramIndex against a brute-force edit distance search, for suggesting names similar to misspellings.
+
+Usage, from the repository root:
+    python -m BB.tools.nameSearchBenchmark [--queries 2000] [--edits 2] [--seed 0]
+
+An index is built from the names and aliases in bbData's builtIn system, criminal, ship, module, weapon and turret data.
+Queries are generated by applying random single-character insertions, deletions and substitutions to random indexed names.
+For each query, the most similar names are found with the n-gram index, and by computing the Levenshtein distance to every indexed name.
+Times are reported per query, in microseconds, along with how often each search ranked the misspelled name among its top 3 suggestions.
+"""
+import argparse
+import random
+import string
+import sys
+import time
+# bbConfig must be imported before lib, to avoid a circular import
+from ..bbConfig import bbConfig, bbData
+from ..lib import ngramSearch
+
+
+def levenshtein(first : str, second : str) -> int:
+    """Find the minimum number of single-character insertions, deletions and substitutions needed to turn first into second.
+    """
+    previousRow = list(range(len(second) + 1))
+    for i, firstChar in enumerate(first, 1):
+        currentRow = [i]
+        for j, secondChar in enumerate(second, 1):
+            currentRow.append(min(previousRow[j] + 1, currentRow[j - 1] + 1, previousRow[j - 1] + (firstChar != secondChar)))
+        previousRow = currentRow
+    return previousRow[-1]
+
+
+def bruteForceSearch(names : list, query : str, maxResults : int = 3) -> list:
+    """Find the maxResults names with the smallest edit distance to query, comparing query with every name.
+    """
+    query = query.lower()
+    return sorted(names, key=lambda name: (levenshtein(query, name), name))[:maxResults]
+
+
+def misspell(rand : random.Random, name : str, edits : int) -> str:
+    """Apply edits random single-character insertions, deletions or substitutions to name.
+    """
+    for _ in range(edits):
+        pos = rand.randrange(len(name) + 1)
+        edit = rand.choice(("insert", "delete", "substitute")) if len(name) > 1 else "insert"
+        if edit == "insert":
+            name = name[:pos] + rand.choice(string.ascii_lowercase) + name[pos:]
+        else:
+            pos = min(pos, len(name) - 1)
+            name = name[:pos] + (rand.choice(string.ascii_lowercase) if edit == "substitute" else "") + name[pos + 1:]
+    return name
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Compare n-gram and brute-force edit distance searches for names similar to misspellings.")
+    parser.add_argument("--queries", type=int, default=2000, help="the number of misspelled names to search for (default 2000)")
+    parser.add_argument("--edits", type=int, default=2, help="the number of random edits to make to each name (default 2)")
+    parser.add_argument("--seed", type=int, default=0, help="the random seed to use (default 0)")
+    args = parser.parse_args(args)
+
+    index = ngramSearch.NGramIndex()
+    for objectType, data in (("system", bbData.builtInSystemData), ("criminal", bbData.builtInCriminalData), ("ship", bbData.builtInShipData),
+                                ("module", bbData.builtInModuleData), ("weapon", bbData.builtInWeaponData), ("turret", bbData.builtInTurretData)):
+        for itemData in data.values():
+            for name in [itemData["name"]] + itemData.get("aliases", []):
+                index.add(name, (objectType, itemData["name"]))
+    names = list(index.names)
+
+    rand = random.Random(args.seed)
+    queries = []
+    for _ in range(args.queries):
+        name = rand.choice(names)
+        queries.append((name, misspell(rand, name, args.edits)))
+
+    print(str(len(names)) + " names indexed, " + str(len(index.postings)) + " distinct " + str(index.n) + "-grams")
+    print("search".ljust(12) + "per query (us)".rjust(16) + "top 3 hits".rjust(12))
+
+    hits = 0
+    startTime = time.perf_counter()
+    for name, query in queries:
+        expectedValues = index.nameValues[index.nameIDs[name]]
+        hits += any(result in expectedValues for result, score in index.search(query))
+    ngramTime = time.perf_counter() - startTime
+    print("n-gram".ljust(12) + str(round(ngramTime * 1000000 / args.queries, 3)).rjust(16) + (str(round(hits * 100 / args.queries, 1)) + "%").rjust(12))
+
+    hits = 0
+    startTime = time.perf_counter()
+    for name, query in queries:
+        hits += name in bruteForceSearch(names, query)
+    bruteTime = time.perf_counter() - startTime
+    print("levenshtein".ljust(12) + str(round(bruteTime * 1000000 / args.queries, 3)).rjust(16) + (str(round(hits * 100 / args.queries, 1)) + "%").rjust(12))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
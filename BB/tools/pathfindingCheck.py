@@ -0,0 +1,146 @@
+"""Check the correctness of lib.pathfinding's A* searches, and measure their speed.
+
+Usage, from the repository root:
+    python -m BB.tools.pathfindingCheck [--k 4] [--gridSize 40] [--seed 0]
+
+Checks are run on two maps: the builtIn star map from bbData.builtInSystemData, and a generated grid map of gridSize * gridSize systems,
+in which each system jumps to its grid neighbours and a random few of them are removed, standing in for a large custom map.
+On each map, for every ordered pair of systems (or a random sample of pairs on the grid map):
+    - findRoute must give a valid route, with the same number of jumps as the breadth first search in lib.pathfinding.RouteTable
+    - findRoute with several goals must reach the nearest of them
+    - kShortestRoutes must give distinct, valid routes which visit no system twice, shortest first, starting with a shortest route.
+      On the builtIn map, the route lengths must match those found by exhaustively enumerating every route.
+Any failed check raises an exception. Times per search are reported in microseconds.
+"""
+import argparse
+import random
+import sys
+import time
+# bbConfig must be imported before lib, to avoid a circular import
+from ..bbConfig import bbConfig, bbData
+from ..bbObjects.bounties import bbSystem
+from ..lib import pathfinding
+
+
+def checkRoute(route : list, start : str, goals : list, systems : dict):
+    """Raise an AssertionError if route does not start at start, end at one of goals, and only jump between neighbouring systems.
+    """
+    if route is None or route[0] != start or route[-1] not in goals or \
+            any(route[i + 1] not in systems[route[i]].getNeighbours() for i in range(len(route) - 1)):
+        raise AssertionError("Invalid route from " + start + " to " + str(goals) + ": " + str(route))
+
+
+def allRouteLengths(start : str, end : str, systems : dict, maxLength : int) -> list:
+    """Find the lengths of every route from start to end which visits no system twice and has at most maxLength systems, by depth first search.
+    """
+    lengths = []
+    visited = [start]
+
+    def visit(systemName):
+        if systemName == end:
+            lengths.append(len(visited))
+            return
+        if len(visited) == maxLength:
+            return
+        for neighbourName in systems[systemName].getNeighbours():
+            if neighbourName not in visited:
+                visited.append(neighbourName)
+                visit(neighbourName)
+                visited.pop()
+
+    visit(start)
+    return sorted(lengths)
+
+
+def gridMap(size : int, rand : random.Random) -> dict:
+    """Generate a map of size * size systems, each jumping to its horizontal and vertical neighbours, with a random tenth of the systems removed.
+    """
+    names = {(x, y): "grid " + str(x) + "," + str(y) for x in range(size) for y in range(size) if rand.random() >= 0.1}
+    return {name: bbSystem.System(name, "neutral", [names[(x + dx, y + dy)] for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)) if (x + dx, y + dy) in names],
+                                    0, (x, y), aliases=[]) for (x, y), name in names.items()}
+
+
+def checkMap(mapName : str, systems : dict, pairs : list, k : int, rand : random.Random, exhaustive : bool):
+    """Run every check on the given pairs of systems in a map, and print the time taken per search.
+    """
+    routeTable = pathfinding.RouteTable(pathfinding.systemGraph(systems))
+    jumpLength = pathfinding.longestJump(systems)
+
+    startTime = time.perf_counter()
+    routes = [pathfinding.findRoute(start, [end], systems, jumpLength=jumpLength) for start, end in pairs]
+    findTime = time.perf_counter() - startTime
+    for (start, end), route in zip(pairs, routes):
+        expected = routeTable.route(start, end)
+        if expected is None:
+            if route is not None:
+                raise AssertionError("Found a route from " + start + " to " + end + " where there is none: " + str(route))
+            continue
+        checkRoute(route, start, [end], systems)
+        if len(route) != len(expected):
+            raise AssertionError("Route from " + start + " to " + end + " has " + str(len(route)) + " systems, but the shortest has " + str(len(expected)))
+
+    names = list(systems.keys())
+    multiGoalTime = 0
+    for start, end in pairs:
+        goals = [end] + rand.sample(names, 2)
+        startTime = time.perf_counter()
+        route = pathfinding.findRoute(start, goals, systems, jumpLength=jumpLength)
+        multiGoalTime += time.perf_counter() - startTime
+        reachable = [routeTable.route(start, goal) for goal in goals if routeTable.route(start, goal) is not None]
+        if not reachable:
+            if route is not None:
+                raise AssertionError("Found a route from " + start + " to " + str(goals) + " where there is none: " + str(route))
+            continue
+        checkRoute(route, start, goals, systems)
+        if len(route) != min(len(goalRoute) for goalRoute in reachable):
+            raise AssertionError("Route from " + start + " to " + str(goals) + " does not reach the nearest goal: " + str(route))
+
+    kTime = 0
+    for start, end in pairs:
+        startTime = time.perf_counter()
+        kRoutes = pathfinding.kShortestRoutes(start, end, systems, k)
+        kTime += time.perf_counter() - startTime
+        shortest = routeTable.route(start, end)
+        if shortest is None:
+            if kRoutes:
+                raise AssertionError("Found routes from " + start + " to " + end + " where there are none: " + str(kRoutes))
+            continue
+        for route in kRoutes:
+            checkRoute(route, start, [end], systems)
+            if len(set(route)) != len(route):
+                raise AssertionError("Route from " + start + " to " + end + " visits a system twice: " + str(route))
+        lengths = [len(route) for route in kRoutes]
+        if len(set(map(tuple, kRoutes))) != len(kRoutes) or lengths != sorted(lengths) or lengths[0] != len(shortest):
+            raise AssertionError("Routes from " + start + " to " + end + " are not distinct and shortest first: " + str(kRoutes))
+        if exhaustive:
+            expectedLengths = allRouteLengths(start, end, systems, lengths[-1])[:k]
+            if lengths != expectedLengths:
+                raise AssertionError("Route lengths from " + start + " to " + end + " are " + str(lengths) + ", but the shortest are " + str(expectedLengths))
+
+    print(mapName.ljust(10) + str(len(systems)).rjust(9) + str(len(pairs)).rjust(8) + str(round(findTime * 1000000 / len(pairs), 2)).rjust(14) +
+            str(round(multiGoalTime * 1000000 / len(pairs), 2)).rjust(14) + str(round(kTime * 1000000 / len(pairs), 2)).rjust(14))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Check the correctness of A* route searches, and measure their speed.")
+    parser.add_argument("--k", type=int, default=4, help="the number of routes to find in k-shortest route checks (default 4)")
+    parser.add_argument("--gridSize", type=int, default=40, help="the width and height of the generated grid map (default 40)")
+    parser.add_argument("--gridPairs", type=int, default=200, help="the number of random pairs of systems to check on the grid map (default 200)")
+    parser.add_argument("--seed", type=int, default=0, help="the random seed to use (default 0)")
+    args = parser.parse_args(args)
+    rand = random.Random(args.seed)
+
+    print("map".ljust(10) + "systems".rjust(9) + "pairs".rjust(8) + "route (us)".rjust(14) + "3 goals (us)".rjust(14) + (str(args.k) + " routes (us)").rjust(14))
+
+    systems = {systemDict["name"]: bbSystem.System.fromDict(systemDict) for systemDict in bbData.builtInSystemData.values()}
+    checkMap("builtIn", systems, [(start, end) for start in systems for end in systems], args.k, rand, True)
+
+    systems = gridMap(args.gridSize, rand)
+    names = list(systems.keys())
+    checkMap("grid", systems, [(rand.choice(names), rand.choice(names)) for _ in range(args.gridPairs)], args.k, rand, False)
+
+    print("All checks passed")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,48 @@
+"""Compare the time taken to load a directory of per-record JSON files in the calling process, and with pools of worker processes.
+
+Usage, from the repository root:
+    python -m BB.tools.recordLoadBenchmark [--users 20000] [--workers 1 2 4] [--chunkSize 256] [--seed 0]
+
+Users are generated as in tools.snapshotBenchmark, and saved one file per user with lib.jsonHandler.writeJSONRecords, as the bot saves them.
+The records are then loaded with lib.jsonHandler.iterJSONRecords once for each number of workers, and the load time is reported.
+The time to start the worker processes is included, as it is paid on every startup.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+# bbConfig must be imported before lib, to avoid a circular import
+from ..bbConfig import bbConfig
+from ..lib import jsonHandler
+from .snapshotBenchmark import randomUser
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Compare in-process and worker process loading of per-record JSON files.")
+    parser.add_argument("--users", type=int, default=20000, help="the number of users to generate (default 20000)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="the numbers of workers to load with (default 1 2 4)")
+    parser.add_argument("--chunkSize", type=int, default=256, help="the number of record files to send to a worker at a time (default 256)")
+    parser.add_argument("--seed", type=int, default=0, help="the random seed to generate users with (default 0)")
+    args = parser.parse_args(args)
+
+    rand = random.Random(args.seed)
+    print("Generating " + str(args.users) + " users...")
+    db = {str(10**17 + userNum): randomUser(rand) for userNum in range(args.users)}
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        jsonHandler.writeJSONRecords(tempDir, db)
+        print(str(os.cpu_count()) + " CPUs")
+        print("workers".ljust(10) + "load (s)".rjust(12) + "records/s".rjust(12))
+        for workers in args.workers:
+            loadStart = time.perf_counter()
+            loaded = dict(jsonHandler.iterJSONRecords(tempDir, workers=workers, chunkSize=args.chunkSize))
+            loadTime = time.perf_counter() - loadStart
+            if loaded != db:
+                raise ValueError("Loaded records do not match the saved records")
+            print(str(workers).ljust(10) + str(round(loadTime, 2)).rjust(12) + str(round(len(loaded) / loadTime)).rjust(12))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,63 @@
+"""Compare the speed of looking up routes in a lib.pathfinding.RouteTable against searching for them with lib.pathfinding.bbAStar.
+
+Usage, from the repository root:
+    python -m BB.tools.routeTableBenchmark [--repeats 5]
+
+Systems are built from bbData.builtInSystemData. Routes are found between every ordered pair of systems with jump gates, repeats times over,
+first with bbAStar and then with a RouteTable. The time taken to build the table, and the average time per route, are reported in microseconds.
+Routes found by both methods are checked to be valid and of equal length, and any pairs for which bbAStar failed to find a route are counted.
+"""
+import argparse
+import sys
+import time
+# bbConfig must be imported before lib, to avoid a circular import
+from ..bbConfig import bbConfig, bbData
+from ..bbObjects.bounties import bbSystem
+from ..lib import pathfinding
+
+
+def isValidRoute(route : list, start : str, end : str, systems : dict) -> bool:
+    """Decide whether route starts at start, ends at end, and only jumps between neighbouring systems.
+    """
+    return route[0] == start and route[-1] == end and all(route[i + 1] in systems[route[i]].getNeighbours() for i in range(len(route) - 1))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Compare route table lookups against A* searches between every pair of systems.")
+    parser.add_argument("--repeats", type=int, default=5, help="the number of times to find every route (default 5)")
+    args = parser.parse_args(args)
+
+    systems = {systemDict["name"]: bbSystem.System.fromDict(systemDict) for systemDict in bbData.builtInSystemData.values()}
+    pairs = [(start, end) for start in systems for end in systems if systems[start].hasJumpGate() and systems[end].hasJumpGate()]
+
+    startTime = time.perf_counter()
+    routeTable = pathfinding.RouteTable(pathfinding.systemGraph(systems))
+    buildTime = time.perf_counter() - startTime
+    print(str(len(systems)) + " systems, " + str(len(pairs)) + " routes. Route table built in " + str(round(buildTime * 1000000, 1)) + "us")
+
+    startTime = time.perf_counter()
+    for _ in range(args.repeats):
+        aStarRoutes = [pathfinding.bbAStar(start, end, systems) for start, end in pairs]
+    aStarTime = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    for _ in range(args.repeats):
+        tableRoutes = [routeTable.route(start, end) for start, end in pairs]
+    tableTime = time.perf_counter() - startTime
+
+    aStarFailures = 0
+    for (start, end), aStarRoute, tableRoute in zip(pairs, aStarRoutes, tableRoutes):
+        if tableRoute is None or not isValidRoute(tableRoute, start, end, systems):
+            raise RuntimeError("Route table gave an invalid route from " + start + " to " + end + ": " + str(tableRoute))
+        if type(aStarRoute) == str:
+            aStarFailures += 1
+        elif len(aStarRoute) < len(tableRoute):
+            raise RuntimeError("Route table gave a longer route than A* from " + start + " to " + end + ": " + str(tableRoute) + " vs " + str(aStarRoute))
+
+    print("search".ljust(8) + "per route (us)".rjust(16) + "failures".rjust(10))
+    print("a*".ljust(8) + str(round(aStarTime * 1000000 / (args.repeats * len(pairs)), 3)).rjust(16) + str(aStarFailures).rjust(10))
+    print("table".ljust(8) + str(round(tableTime * 1000000 / (args.repeats * len(pairs)), 3)).rjust(16) + "0".rjust(10))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
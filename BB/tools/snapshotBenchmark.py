@@ -0,0 +1,135 @@
+"""Compare the size, save time and load time of JSON and binary snapshot saves of a synthetic users database.
+
+Usage, from the repository root:
+    python -m BB.tools.snapshotBenchmark [--users 100000] [--layout records] [--seed 0]
+
+Users are generated in the same shape as bbUser.toDict, with randomised stats and inventories of builtIn items.
+With the default records layout, each format saves every user to its own file with lib.jsonHandler.writeJSONRecords and loads them
+with lib.jsonHandler.iterJSONRecords, as the bot saves the users and guilds databases. Files are not fsynced.
+With the single layout, each format saves and loads the whole database as a single file, as the bot saves the reaction menus database.
+Files are written to a temporary directory.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+# bbConfig must be imported before lib, to avoid a circular import
+from ..bbConfig import bbConfig
+from ..lib import binarySnapshot, jsonHandler
+
+ITEM_NAMES = {"inactiveWeapons": ["Nirai Impulse EX 1", "Nirai Impulse EX 2", "Vulcan VX-1", "Gauss MK 4", "Berger Converge IV", "Hailstorm"],
+                "inactiveModules": ["Sign Dragon", "Gemini Repair Bot", "Tiger Claw", "Overdrive Hull", "Zeus Shield", "Cryo Trap"],
+                "inactiveTurrets": ["Pulse Turret", "Gauss Turret", "Hellfire Turret", "Maverick Turret"],
+                "inactiveShips": ["Betty", "Nova", "Vol Noor", "Groza Mk II", "Teneta R.E.D.", "Kinzer"]}
+UPGRADE_NAMES = ["Armour Plating", "Cargo Expansion", "Handling Tweak", "Shield Booster"]
+
+
+def randomShip(rand : random.Random) -> dict:
+    """Generate a serialised builtIn ship with a random loadout, in the shape of bbShip.toDict.
+
+    :param random.Random rand: The random number generator to use
+    :return: A serialised ship
+    :rtype: dict
+    """
+    return {"name": rand.choice(ITEM_NAMES["inactiveShips"]), "builtIn": True,
+            "weapons": rand.sample(ITEM_NAMES["inactiveWeapons"], rand.randint(0, 3)),
+            "modules": rand.sample(ITEM_NAMES["inactiveModules"], rand.randint(0, 4)),
+            "turrets": rand.sample(ITEM_NAMES["inactiveTurrets"], rand.randint(0, 2)),
+            "shipUpgrades": rand.sample(UPGRADE_NAMES, rand.randint(0, 2)),
+            "nickname": "", "skin": ""}
+
+
+def randomUser(rand : random.Random) -> dict:
+    """Generate a serialised user with random stats and inventories, in the shape of bbUser.toDict.
+
+    :param random.Random rand: The random number generator to use
+    :return: A serialised user
+    :rtype: dict
+    """
+    userDict = {"credits": rand.randint(0, 500000), "lifetimeCredits": rand.randint(0, 5000000), "bountyCooldownEnd": rand.uniform(1.6e9, 1.7e9),
+                "systemsChecked": rand.randint(0, 2000), "bountyWins": rand.randint(0, 300), "activeShip": randomShip(rand),
+                "lastSeenGuildId": rand.randint(10**17, 10**18), "duelWins": rand.randint(0, 50), "duelLosses": rand.randint(0, 50),
+                "duelCreditsWins": rand.randint(0, 100000), "bountyWinsToday": rand.randint(0, 10), "dailyBountyWinsReset": rand.uniform(1.6e9, 1.7e9),
+                "pollOwned": False, "duelCreditsLosses": rand.randint(0, 100000), "homeGuildID": rand.randint(10**17, 10**18),
+                "guildTransferCooldownEnd": rand.uniform(1.6e9, 1.7e9), "inactiveTools": []}
+    for inventoryName in ITEM_NAMES:
+        if inventoryName == "inactiveShips":
+            userDict[inventoryName] = [{"item": randomShip(rand), "count": 1} for _ in range(rand.randint(0, 3))]
+        else:
+            userDict[inventoryName] = [{"item": itemName, "count": rand.randint(1, 5)} for itemName in rand.sample(ITEM_NAMES[inventoryName], rand.randint(0, 4))]
+    return userDict
+
+
+def timeSaveAndLoad(dbFile : str, db : dict, snapshotCompression) -> dict:
+    """Save the given database in the given format, load it again, and measure the file size and the time taken by each step.
+
+    :param str dbFile: Path to the JSON file to save to
+    :param dict db: The database to save
+    :param str snapshotCompression: None to save as JSON, or the compression method to save a binary snapshot with
+    :return: The saved file's size in bytes, and the time taken in seconds to serialise, write, read and parse the file
+    :rtype: dict
+    """
+    serialiseTime, writeTime = jsonHandler.writeDBFile(dbFile, db, snapshotCompression=snapshotCompression)
+    savedFile = dbFile if snapshotCompression is None else jsonHandler.snapshotPath(dbFile)
+    readStart = time.perf_counter()
+    f = open(savedFile, "rb")
+    data = f.read()
+    f.close()
+    parseStart = time.perf_counter()
+    if snapshotCompression is None:
+        loaded = json.loads(data)
+    else:
+        loaded = binarySnapshot.loads(data)
+    parseTime = time.perf_counter() - parseStart
+    if loaded != db:
+        raise ValueError("Loaded database does not match the saved database")
+    return {"size": os.path.getsize(savedFile), "serialise": serialiseTime, "write": writeTime, "read": parseStart - readStart, "parse": parseTime}
+
+
+def timeSaveAndLoadRecords(recordsDir : str, db : dict, snapshotCompression) -> dict:
+    """Save the given database in the given format with one file per record, load it again, and measure the total file size and the time taken by each step.
+
+    :param str recordsDir: Path to the directory to save records to
+    :param dict db: The database to save
+    :param str snapshotCompression: None to save as JSON, or the compression method to save binary snapshots with
+    :return: The total size in bytes of the saved files, and the time taken in seconds to serialise, write, and load the records
+    :rtype: dict
+    """
+    serialiseTime, writeTime = jsonHandler.writeJSONRecords(recordsDir, db, snapshotCompression=snapshotCompression)
+    loadStart = time.perf_counter()
+    loaded = dict(jsonHandler.iterJSONRecords(recordsDir))
+    loadTime = time.perf_counter() - loadStart
+    if loaded != db:
+        raise ValueError("Loaded database does not match the saved database")
+    size = sum(os.path.getsize(recordsDir + os.sep + fileName) for fileName in os.listdir(recordsDir))
+    return {"size": size, "serialise": serialiseTime, "write": writeTime, "read": loadTime, "parse": 0}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Compare JSON and binary snapshot saves of a synthetic users database.")
+    parser.add_argument("--users", type=int, default=100000, help="the number of users to generate (default 100000)")
+    parser.add_argument("--layout", choices=("records", "single"), default="records",
+                        help="save one file per user as the users database is saved, or a single file for the whole database (default records)")
+    parser.add_argument("--seed", type=int, default=0, help="the random seed to generate users with (default 0)")
+    args = parser.parse_args(args)
+
+    rand = random.Random(args.seed)
+    print("Generating " + str(args.users) + " users...")
+    db = {str(10**17 + userNum): randomUser(rand) for userNum in range(args.users)}
+
+    print("format".ljust(16) + "size (MB)".rjust(12) + "save (s)".rjust(12) + "load (s)".rjust(12))
+    with tempfile.TemporaryDirectory() as tempDir:
+        for formatName, snapshotCompression in (("json", None), ("binary", "none"), ("binary+zlib", "zlib"), ("binary+lzma", "lzma")):
+            if args.layout == "records":
+                times = timeSaveAndLoadRecords(tempDir + os.sep + formatName, db, snapshotCompression)
+            else:
+                times = timeSaveAndLoad(tempDir + os.sep + "users.json", db, snapshotCompression)
+            print(formatName.ljust(16) + str(round(times["size"] / 1048576, 2)).rjust(12) + str(round(times["serialise"] + times["write"], 2)).rjust(12) + \
+                    str(round(times["read"] + times["parse"], 2)).rjust(12))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,66 @@
+"""Convert saved databases between JSON and binary snapshots.
+
+Usage, from the repository root:
+    python -m BB.tools.snapshotConverter <path> [--to json|binary] [--compression none|zlib|lzma]
+
+path may be a JSON database file (e.g saveData/reactionMenus.json), a binary snapshot (e.g saveData/reactionMenus.bbs),
+or a directory of per-record files (e.g saveData/users). Files are converted to the other format, and directories to the format given by --to.
+As when the bot saves, the copy in the old format is deleted once the new one is written.
+The bot should not be running while its save files are converted.
+"""
+import argparse
+import os
+import sys
+# bbConfig must be imported before lib, to avoid a circular import
+from ..bbConfig import bbConfig
+from ..lib import binarySnapshot, jsonHandler
+
+
+def convertFile(dbFile : str, snapshotCompression):
+    """Convert a single database file into the requested format.
+
+    :param str dbFile: Path to the database's JSON file
+    :param str snapshotCompression: None to convert to JSON, or the compression method to write a binary snapshot with
+    """
+    jsonHandler.writeDBFile(dbFile, jsonHandler.readDBFile(dbFile), snapshotCompression=snapshotCompression, fsync=True)
+
+
+def convertRecordsDir(recordsDir : str, snapshotCompression) -> int:
+    """Convert every record file in a directory of per-record files into the requested format.
+
+    :param str recordsDir: Path to the directory of record files
+    :param str snapshotCompression: None to convert to JSON, or the compression method to write binary snapshots with
+    :return: The number of records converted
+    :rtype: int
+    """
+    records = jsonHandler.readJSONRecords(recordsDir)
+    jsonHandler.writeJSONRecords(recordsDir, records, fsync=True, snapshotCompression=snapshotCompression)
+    return len(records)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Convert saved databases between JSON and binary snapshots.")
+    parser.add_argument("path", help="a JSON database file, a binary snapshot, or a directory of per-record files")
+    parser.add_argument("--to", choices=["json", "binary"], help="the format to convert to. Required for directories; files are converted to the other format by default")
+    parser.add_argument("--compression", choices=list(binarySnapshot.COMPRESSION_IDS), default=bbConfig.dbSnapshotCompression,
+                        help="the compression to apply to binary snapshots (default bbConfig.dbSnapshotCompression)")
+    args = parser.parse_args(args)
+
+    if os.path.isdir(args.path):
+        if args.to is None:
+            parser.error("--to is required when converting a directory")
+        numRecords = convertRecordsDir(args.path, args.compression if args.to == "binary" else None)
+        print("Converted " + str(numRecords) + " records in " + args.path + " to " + args.to)
+        return
+
+    if not os.path.isfile(args.path):
+        parser.error("No such file or directory: " + args.path)
+    isSnapshot = args.path.endswith(jsonHandler.SNAPSHOT_EXTENSION)
+    dbFile = os.path.splitext(args.path)[0] + ".json" if isSnapshot else args.path
+    target = args.to if args.to is not None else ("json" if isSnapshot else "binary")
+    convertFile(dbFile, args.compression if target == "binary" else None)
+    print("Converted " + args.path + " to " + (jsonHandler.snapshotPath(dbFile) if target == "binary" else dbFile))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,83 @@
+"""Measure TimedTaskHeap size and task checking cost under heavy reaction menu churn.
+
+Usage, from the repository root:
+    python -m BB.tools.timedTaskHeapBenchmark [--rounds 200] [--menus 500] [--cancelled 0.9]
+
+Each round, a batch of menus is opened with timeout tasks expiring within the next hour, and most of the menus opened so far
+are closed early, as happens when users react to them. The heap is then checked, as in the on_ready task loop.
+Closed menus' tasks are either gravestoned and left for the heap to clean up once they reach its head ("lazy", how tasks
+were unscheduled before the heap was indexed), or removed from the heap immediately with unscheduleTask ("indexed").
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+# bbConfig must be imported before scheduling, to avoid a circular import
+from ..bbConfig import bbConfig
+from ..scheduling import TimedTask, TimedTaskHeap
+
+
+async def runChurn(rounds : int, menusPerRound : int, cancelledFraction : float, lazy : bool, seed : int) -> dict:
+    """Simulate menu churn on a new TimedTaskHeap.
+
+    :param int rounds: The number of rounds of menu churn to simulate
+    :param int menusPerRound: The number of menus opened each round
+    :param float cancelledFraction: The fraction of open menus closed early each round
+    :param bool lazy: When True, gravestone closed menus' tasks without removing them. When False, remove them with unscheduleTask.
+    :param int seed: The random seed to use
+    :return: The heap's final and peak size, and the total time in seconds spent scheduling, closing and checking tasks
+    :rtype: dict
+    """
+    rand = random.Random(seed)
+    heap = TimedTaskHeap.TimedTaskHeap()
+    openTasks = []
+    peakSize = 0
+    scheduleTime, closeTime, checkTime = 0, 0, 0
+    now = datetime.utcnow()
+
+    for _ in range(rounds):
+        newTasks = [TimedTask.TimedTask(expiryTime=now + timedelta(seconds=rand.uniform(60, 3600))) for _ in range(menusPerRound)]
+        start = time.perf_counter()
+        for task in newTasks:
+            heap.scheduleTask(task)
+        scheduleTime += time.perf_counter() - start
+        openTasks += newTasks
+
+        rand.shuffle(openTasks)
+        numClosed = int(len(openTasks) * cancelledFraction)
+        closedTasks, openTasks = openTasks[:numClosed], openTasks[numClosed:]
+        start = time.perf_counter()
+        for task in closedTasks:
+            if lazy:
+                task.gravestone = True
+            else:
+                heap.unscheduleTask(task)
+        closeTime += time.perf_counter() - start
+
+        start = time.perf_counter()
+        await heap.doTaskChecking()
+        checkTime += time.perf_counter() - start
+        peakSize = max(peakSize, len(heap))
+
+    return {"finalSize": len(heap), "peakSize": peakSize, "open": len(openTasks), "schedule": scheduleTime, "close": closeTime, "check": checkTime}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Measure TimedTaskHeap size and task checking cost under heavy reaction menu churn.")
+    parser.add_argument("--rounds", type=int, default=200, help="the number of rounds of churn to simulate (default 200)")
+    parser.add_argument("--menus", type=int, default=500, help="the number of menus opened each round (default 500)")
+    parser.add_argument("--cancelled", type=float, default=0.9, help="the fraction of open menus closed early each round (default 0.9)")
+    parser.add_argument("--seed", type=int, default=0, help="the random seed to use (default 0)")
+    args = parser.parse_args(args)
+
+    print("mode".ljust(10) + "open".rjust(8) + "heap size".rjust(12) + "peak size".rjust(12) + "schedule (ms)".rjust(16) + "close (ms)".rjust(14) + "check (ms)".rjust(14))
+    for mode in ("lazy", "indexed"):
+        results = asyncio.run(runChurn(args.rounds, args.menus, args.cancelled, mode == "lazy", args.seed))
+        print(mode.ljust(10) + str(results["open"]).rjust(8) + str(results["finalSize"]).rjust(12) + str(results["peakSize"]).rjust(12) + \
+                str(round(results["schedule"] * 1000, 1)).rjust(16) + str(round(results["close"] * 1000, 1)).rjust(14) + str(round(results["check"] * 1000, 1)).rjust(14))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
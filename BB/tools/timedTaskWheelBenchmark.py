@@ -0,0 +1,88 @@
+"""Compare the cost of scheduling, cancelling and expiring short-lived timers on a TimedTaskHeap and a TimedTaskWheel.
+
+Usage, from the repository root:
+    python -m BB.tools.timedTaskWheelBenchmark [--sizes 10000 100000 1000000] [--cancelled 0.9]
+
+For each size, that many timers are scheduled with expiry times spread over the next hour, as reaction menu timeouts are.
+Most are then cancelled, as happens when users react to menus, and the clock is advanced through the hour in one minute steps,
+checking for expired tasks at each step as in the on_ready task loop. Times are reported per timer, in microseconds.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+# bbConfig must be imported before scheduling, to avoid a circular import
+from ..bbConfig import bbConfig
+from ..scheduling import TimedTask, TimedTaskHeap, TimedTaskWheel
+
+
+class _SimulatedClock(datetime):
+    """A datetime whose utcnow returns a simulated time, so that an hour of task expiry can be benchmarked in seconds.
+    """
+    now = datetime.utcnow()
+
+    @classmethod
+    def utcnow(cls) -> datetime:
+        return cls.now
+
+
+async def runTimers(store : TimedTaskHeap.TimedTaskHeap, numTimers : int, cancelledFraction : float, seed : int) -> dict:
+    """Schedule, cancel and expire timers on the given heap or wheel.
+
+    :param TimedTaskHeap store: The empty TimedTaskHeap or TimedTaskWheel to benchmark
+    :param int numTimers: The number of timers to schedule
+    :param float cancelledFraction: The fraction of timers to cancel before they expire
+    :param int seed: The random seed to use
+    :return: The total time in seconds spent scheduling, cancelling and checking timers, and the number of timers which expired
+    :rtype: dict
+    """
+    rand = random.Random(seed)
+    start = _SimulatedClock.now
+    tasks = [TimedTask.TimedTask(expiryTime=start + timedelta(seconds=rand.uniform(60, 3600))) for _ in range(numTimers)]
+    cancelledTasks = rand.sample(tasks, int(numTimers * cancelledFraction))
+
+    startTime = time.perf_counter()
+    for task in tasks:
+        store.scheduleTask(task)
+    scheduleTime = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    for task in cancelledTasks:
+        store.unscheduleTask(task)
+    cancelTime = time.perf_counter() - startTime
+
+    remaining = len(store)
+    checkTime = 0
+    for minute in range(1, 62):
+        _SimulatedClock.now = start + timedelta(minutes=minute)
+        startTime = time.perf_counter()
+        await store.doTaskChecking()
+        checkTime += time.perf_counter() - startTime
+
+    return {"schedule": scheduleTime, "cancel": cancelTime, "check": checkTime, "expired": remaining - len(store)}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Compare the cost of short-lived timers on a TimedTaskHeap and a TimedTaskWheel.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="the numbers of timers to benchmark with (default 10000 100000 1000000)")
+    parser.add_argument("--cancelled", type=float, default=0.9, help="the fraction of timers cancelled before expiring (default 0.9)")
+    parser.add_argument("--seed", type=int, default=0, help="the random seed to use (default 0)")
+    args = parser.parse_args(args)
+
+    # Both stores, and the tasks they expire, read the current time from the simulated clock
+    TimedTask.datetime = _SimulatedClock
+    TimedTaskWheel.datetime = _SimulatedClock
+
+    print("timers".rjust(9) + "  " + "store".ljust(7) + "expired".rjust(9) + "schedule (us)".rjust(15) + "cancel (us)".rjust(13) + "check (us)".rjust(12))
+    for numTimers in args.sizes:
+        for storeName, storeType in (("heap", TimedTaskHeap.TimedTaskHeap), ("wheel", TimedTaskWheel.TimedTaskWheel)):
+            _SimulatedClock.now = datetime.utcnow()
+            results = asyncio.run(runTimers(storeType(), numTimers, args.cancelled, args.seed))
+            print(str(numTimers).rjust(9) + "  " + storeName.ljust(7) + str(results["expired"]).rjust(9) + \
+                    "".join(str(round(results[stat] * 1000000 / numTimers, 2)).rjust(width) for stat, width in (("schedule", 15), ("cancel", 13), ("check", 12))))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
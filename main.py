@@ -1 +1,3 @@
-import BB.bountybot
\ No newline at end of file
+# Worker processes started with the spawn method re-import this module, and must not start the bot
+if __name__ == "__main__":
+    import BB.bountybot